@@ -0,0 +1,99 @@
+"""Analiz ekibinde takılan bir dalın diğer dalın sonucunu düşürmediğini çevrimdışı doğrular.
+
+Web dalının LLM'i serbest bırakılana kadar bloklanır (asılı kalan bir scrape / sağlayıcı çağrısı
+gibi), RAG dalı ve doğrulama FakeLLM ile normal çalışır. Analiz çalıştırıcısı kısa bir dal
+süresiyle başlatılır ve şunlar kontrol edilir:
+    - kickoff dal süresi (+ doğrulama) içinde döner, asılı dalı beklemez,
+    - web dalı timed_out_branches içinde ve yer tutucu çıktıyla gelir,
+    - RAG dalının çıktısı korunur ve doğrulama görevine {branch_outputs} ile verilir.
+Kontrollerden biri tutmazsa betik sıfırdan farklı kodla çıkar.
+
+Kullanım (app/ dizininden):
+    python benchmarks/branch_timeout_check.py --timeout 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-check")
+os.environ.setdefault("SERPER_API_KEY", "offline-check")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Takılan web dalında RAG sonucunun korunduğunu doğrular")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Dal bekleme süresi (sn)")
+    parser.add_argument("--documents", type=int, default=50, help="Bellek içi Qdrant'a yüklenecek sentetik chunk sayısı")
+    args = parser.parse_args()
+
+    from benchmarks.offline_stubs import FakeLLM, HashEmbeddings, StubSearchTool, StubWebsiteSearchTool, StubScrapeWebsiteTool, build_local_qdrant
+    from llms import SharedLLM
+    from tools import qdrant_vector_search_tool
+    from tools.embedding_service import EmbeddingService
+    from crews import legal_analysis_crew
+
+    embeddings = HashEmbeddings()
+    collection_name = os.getenv("QDRANT_COLLECTION_NAME", "turkiye_hukuk_dokumanlari_v3")
+    qdrant_vector_search_tool._global_qdrant_client = build_local_qdrant(collection_name, args.documents, embeddings)
+    qdrant_vector_search_tool._global_embedding_model = embeddings
+    qdrant_vector_search_tool._global_embedding_service = EmbeddingService(embeddings, "hash-embeddings")
+
+    release = threading.Event()
+
+    class HangingLLM(FakeLLM):
+        def call(self, messages, *args, **kwargs):
+            release.wait()
+            return super().call(messages, *args, **kwargs)
+
+    fake_llm, hanging_llm = FakeLLM(), HangingLLM()
+
+    def fake_create_gpt(cache: bool = False, task_name: str = "unknown"):
+        llm = hanging_llm if task_name == "legal_web_search_task" else fake_llm
+        return SharedLLM(llm, cache_enabled=False, task_name=task_name)
+
+    legal_analysis_crew._create_gpt = fake_create_gpt
+    legal_analysis_crew.SerperDevTool = lambda **kwargs: StubSearchTool()
+    legal_analysis_crew.WebsiteSearchTool = StubWebsiteSearchTool
+    legal_analysis_crew.ScrapeWebsiteTool = StubScrapeWebsiteTool
+
+    crew = legal_analysis_crew.LegalAnalysisProcessingCrew()
+    runner = legal_analysis_crew.BranchedAnalysis(
+        crew, [legal_analysis_crew.RAG_BRANCH, legal_analysis_crew.WEB_BRANCH], timeout=args.timeout,
+    )
+    inputs = {"topic": "Saklı payımı nasıl talep edebilirim?", "feedback": "", "confidence_threshold": 0.8}
+
+    started = time.perf_counter()
+    try:
+        output = runner.kickoff(inputs)
+        elapsed = time.perf_counter() - started
+    finally:
+        # Asılı dal serbest bırakılır ve bitmesi beklenir; aksi halde yorumlayıcı kapanırken yarıda kalır.
+        release.set()
+        legal_analysis_crew._branch_executor.shutdown(wait=True)
+
+    rag_output, web_output, validation_output = output["tasks_output"]
+    validation_prompt = validation_output.get("description", "")
+    checks = {
+        "returned_without_hung_branch": elapsed < args.timeout + 30,
+        "web_marked_timed_out": output["timed_out_branches"] == [legal_analysis_crew.WEB_BRANCH] and bool(web_output.get("timed_out")),
+        "rag_output_kept": not rag_output.get("timed_out") and fake_llm._expected_outputs["case_law_rag_analysis_task"][:80] in rag_output["raw"],
+        "validation_ran": fake_llm._expected_outputs["legal_validation_task"][:80] in output["raw"],
+        "validation_saw_rag_output": rag_output["raw"][:80] in validation_prompt,
+    }
+    print(json.dumps({
+        "timeout_seconds": args.timeout,
+        "elapsed_seconds": round(elapsed, 3),
+        "timed_out_branches": output["timed_out_branches"],
+        "checks": checks,
+    }, ensure_ascii=False, indent=2))
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
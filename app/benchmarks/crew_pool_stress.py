@@ -0,0 +1,137 @@
+"""Eş zamanlı analiz isteklerinin birbirinin topic/feedback verisini görmediğini doğrulayan stres testi.
+
+Her isteğin vaka metnine benzersiz bir işaret (VAKA-0001, ...) eklenir. FakeLLM, yanıt verdiği
+prompt'taki işareti yanıtın JSON'una ve geri bildirim önerilerine yazar; böylece işaret
+girdi işleme -> analiz -> geri bildirim -> yeniden analiz zinciri boyunca taşınır. Bir
+LLM çağrısının prompt'unda birden fazla işaret görülmesi ya da bir raporda başka bir
+isteğin işaretinin bulunması istekler arası sızıntı demektir.
+
+--shared-crews ile tüm istekler eski davranıştaki gibi tek bir ekip demetini paylaşır;
+karşılaştırma için kullanılabilir. Sızıntı bulunursa veya istek hata verirse betik 1 koduyla çıkar.
+
+Kullanım (app/ dizininden):
+    python benchmarks/crew_pool_stress.py --requests 24 --concurrency 8
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from benchmarks.pipeline_benchmark import SAMPLE_CASES, install_offline_stubs
+
+MARKER_PATTERN = re.compile(r"VAKA-\d{4}")
+FINAL_ANSWER = "Final Answer: "
+
+
+class MarkerRecorder:
+    def __init__(self):
+        self.prompts = 0
+        self.unmarked_prompts = 0
+        self.mixed_prompts: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, response: str) -> str:
+        markers = sorted(set(MARKER_PATTERN.findall(prompt)))
+        with self._lock:
+            self.prompts += 1
+            if not markers:
+                self.unmarked_prompts += 1
+            elif len(markers) > 1:
+                self.mixed_prompts.append(markers)
+        if len(markers) != 1 or FINAL_ANSWER not in response:
+            return response
+
+        head, _, payload = response.partition(FINAL_ANSWER)
+        try:
+            parsed = json.loads(payload)
+        except json.JSONDecodeError:
+            return response
+        if not isinstance(parsed, dict):
+            return response
+        parsed["vaka_kimligi"] = markers[0]
+        if "needs_reanalysis" in parsed:
+            parsed["feedback_suggestions"] = f"{markers[0]} için emsal kararları genişlet."
+        return f"{head}{FINAL_ANSWER}{json.dumps(parsed, ensure_ascii=False)}"
+
+
+def run_request(web_server, index: int) -> Dict[str, Any]:
+    marker = f"VAKA-{index:04d}"
+    case_text = f"[{marker}] {SAMPLE_CASES[index % len(SAMPLE_CASES)]}"
+    started = time.perf_counter()
+    try:
+        report = web_server.run_analysis_pipeline(case_text, session_id=f"stress-{index}")
+    except Exception as e:
+        return {"marker": marker, "error": str(e), "foreign_markers": [], "seconds": time.perf_counter() - started}
+    found = set(MARKER_PATTERN.findall(json.dumps(report, ensure_ascii=False, default=str)))
+    return {
+        "marker": marker,
+        "error": None,
+        "foreign_markers": sorted(found - {marker}),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ekip havuzu istekler arası sızıntı stres testi")
+    parser.add_argument("--requests", type=int, default=24, help="Toplam analiz isteği sayısı")
+    parser.add_argument("--concurrency", type=int, default=8, help="Eş zamanlı istek sayısı")
+    parser.add_argument("--pool-size", type=int, default=None, help="Ekip havuzu boyutu (varsayılan: eşzamanlılık)")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Her LLM çağrısına eklenen gecikme (sn)")
+    parser.add_argument("--shared-crews", action="store_true", help="Tüm istekler tek bir ekip demetini paylaşsın (eski davranış)")
+    args = parser.parse_args()
+
+    os.environ["CREW_POOL_SIZE"] = str(args.pool_size or args.concurrency)
+    args.web_latency = 0.0
+    args.reanalysis_probability = 1.0
+    args.documents = 200
+    args.analysis_cache = False
+    args.llm_cache_size = 0
+    fake_llm, _ = install_offline_stubs(args)
+    recorder = MarkerRecorder()
+    fake_llm.response_hook = recorder
+
+    import web_server
+    from crews.crew_pool import CrewPool, build_crew_bundle
+
+    web_server.lazy_initialize_llm_crews()
+    if not web_server.llm_crews_initialized:
+        raise SystemExit("LLM ekipleri başlatılamadı.")
+    if args.shared_crews:
+        shared_bundle = build_crew_bundle(web_server.max_iterations)
+        web_server.crew_pool = CrewPool(lambda: shared_bundle, size=1, max_size=args.concurrency, max_uses=0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="stress") as executor:
+        results = list(executor.map(lambda index: run_request(web_server, index), range(args.requests)))
+    wall_seconds = time.perf_counter() - started
+
+    leaked = [r for r in results if r["foreign_markers"]]
+    summary = {
+        "mode": "shared" if args.shared_crews else "pooled",
+        "requests": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "wall_seconds": round(wall_seconds, 3),
+        "llm_prompts": recorder.prompts,
+        "prompts_without_marker": recorder.unmarked_prompts,
+        "prompts_with_mixed_markers": len(recorder.mixed_prompts),
+        "reports_with_foreign_markers": len(leaked),
+        "leak_examples": leaked[:3] + [{"mixed_prompt_markers": m} for m in recorder.mixed_prompts[:3]],
+        "crew_pool": web_server.crew_pool.stats(),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    if leaked or recorder.mixed_prompts or summary["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
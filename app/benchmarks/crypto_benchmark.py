@@ -0,0 +1,172 @@
+"""RedisCryptoManager için anahtar değişimi ve AES şifreleme/çözme mikro benchmark'ı.
+
+Aynı testi önbellekli (varsayılan ayarlar) ve önbelleksiz (her anahtar değişiminde PEM
+ayrıştırma, her şifrelemede Redis okuması) yapılandırmayla çalıştırarak karşılaştırır.
+Her yük boyutu için v1 (tek parça AES-CBC) ve v2 (parçalı AES-GCM) protokollerinin
+MB/s değerleri ile tek bir şifrelemenin en yüksek bellek kullanımı raporlanır.
+Çalışan bir Redis gerektirir (REDIS_HOST / REDIS_PORT).
+
+Kullanım (app/ dizininden):
+    python benchmarks/crypto_benchmark.py --exchanges 200 --iterations 20 --sizes 1024,102400,5242880
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import argparse
+import tracemalloc
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from utils.crypto_utils import RedisCryptoManager
+
+
+def _encrypted_session_keys(public_key_pem: str, count: int) -> List[str]:
+    # İstemci tarafındaki RSA şifreleme ölçüme dahil edilmez; anahtarlar önceden hazırlanır.
+    public_key = serialization.load_pem_public_key(public_key_pem.encode('utf-8'))
+    encrypted = []
+    for _ in range(count):
+        key_data = json.dumps({
+            'key': base64.b64encode(os.urandom(32)).decode('utf-8'),
+            'iv': base64.b64encode(os.urandom(16)).decode('utf-8'),
+        }).encode('utf-8')
+        ciphertext = public_key.encrypt(
+            key_data,
+            padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+        )
+        encrypted.append(base64.b64encode(ciphertext).decode('utf-8'))
+    return encrypted
+
+
+def _bench_exchanges(manager: RedisCryptoManager, encrypted_keys: List[str]) -> Dict[str, Any]:
+    session_ids = [str(uuid.uuid4()) for _ in encrypted_keys]
+    started = time.perf_counter()
+    for encrypted_key, session_id in zip(encrypted_keys, session_ids):
+        if not manager.store_and_decrypt_aes_key(encrypted_key, session_id):
+            raise RuntimeError("Anahtar değişimi başarısız oldu.")
+    elapsed = time.perf_counter() - started
+    return {
+        'session_ids': session_ids,
+        'exchanges_per_second': round(len(encrypted_keys) / elapsed, 1),
+        'avg_ms': round(elapsed / len(encrypted_keys) * 1000, 3),
+    }
+
+
+def _encrypt(manager: RedisCryptoManager, protocol: str, payload: Any, session_id: str) -> Any:
+    if protocol == 'v2':
+        return manager.encrypt_data_v2(payload, session_id)
+    return manager.encrypt_data(payload, session_id)
+
+
+def _stream_v2(manager: RedisCryptoManager, payload: Any, session_id: str) -> None:
+    # /api/analyze v2 yanıtında olduğu gibi parçalar üretilip hemen serileştirilir ve bırakılır.
+    for chunk in manager.iter_encrypted_chunks(payload, session_id):
+        json.dumps(chunk)
+
+
+def _peak_memory_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+
+def _bench_payloads(manager: RedisCryptoManager, session_ids: List[str], sizes: List[int], iterations: int, protocols: List[str]) -> Dict[str, Any]:
+    results = {}
+    for size in sizes:
+        payload = {'rapor': 'ş' * (size // 2)}
+        payload_bytes = len(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        megabytes = payload_bytes * iterations / (1024 * 1024)
+
+        for protocol in protocols:
+            # Her çağrı farklı bir oturumla yapılır; önbelleksiz kipte bu, her seferinde Redis okuması demektir.
+            started = time.perf_counter()
+            ciphertexts = [
+                _encrypt(manager, protocol, payload, session_ids[index % len(session_ids)])
+                for index in range(iterations)
+            ]
+            encrypt_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for index, ciphertext in enumerate(ciphertexts):
+                manager.decrypt_data(ciphertext, session_ids[index % len(session_ids)])
+            decrypt_seconds = time.perf_counter() - started
+            del ciphertexts
+
+            if protocol == 'v2':
+                peak_mb = _peak_memory_mb(lambda: _stream_v2(manager, payload, session_ids[0]))
+            else:
+                peak_mb = _peak_memory_mb(lambda: manager.encrypt_data(payload, session_ids[0]))
+
+            results[f"{size}B/{protocol}"] = {
+                'encrypt_mb_per_second': round(megabytes / encrypt_seconds, 2),
+                'decrypt_mb_per_second': round(megabytes / decrypt_seconds, 2),
+                'encrypt_avg_ms': round(encrypt_seconds / iterations * 1000, 3),
+                'decrypt_avg_ms': round(decrypt_seconds / iterations * 1000, 3),
+                'peak_encrypt_memory_mb': peak_mb,
+            }
+    return results
+
+
+def _cleanup(manager: RedisCryptoManager, session_ids: List[str]) -> None:
+    r = manager._get_redis_client()
+    if r and session_ids:
+        r.delete(*[f"{prefix}:{session_id}" for session_id in session_ids for prefix in (manager.AES_KEY_PREFIX, manager.AES_IV_PREFIX)])
+
+
+def run(label: str, manager: RedisCryptoManager, encrypted_keys: List[str], sizes: List[int], iterations: int, protocols: List[str]) -> Dict[str, Any]:
+    exchange = _bench_exchanges(manager, encrypted_keys)
+    try:
+        payloads = _bench_payloads(manager, exchange['session_ids'], sizes, iterations, protocols)
+    finally:
+        _cleanup(manager, exchange['session_ids'])
+    return {
+        'mode': label,
+        'exchanges_per_second': exchange['exchanges_per_second'],
+        'exchange_avg_ms': exchange['avg_ms'],
+        'payloads': payloads,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="RedisCryptoManager mikro benchmark'ı")
+    parser.add_argument("--exchanges", type=int, default=200, help="Ölçülecek anahtar değişimi sayısı")
+    parser.add_argument("--iterations", type=int, default=20, help="Her boyut için şifreleme/çözme tekrarı")
+    parser.add_argument("--sizes", default="1024,102400,5242880", help="Virgülle ayrılmış yük boyutları (bayt)")
+    parser.add_argument("--mode", choices=["cached", "uncached", "both"], default="both")
+    parser.add_argument("--protocol", choices=["v1", "v2", "both"], default="both", help="v1: AES-CBC, v2: parçalı AES-GCM")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    modes = {
+        'uncached': lambda: RedisCryptoManager(key_cache_ttl=0, session_cache_size=0),
+        'cached': lambda: RedisCryptoManager(),
+    }
+    selected = list(modes) if args.mode == "both" else [args.mode]
+    protocols = ["v1", "v2"] if args.protocol == "both" else [args.protocol]
+
+    results = []
+    for label in selected:
+        manager = modes[label]()
+        public_key_pem, _ = manager.get_public_key_and_session()
+        if not public_key_pem:
+            raise SystemExit("Redis'e bağlanılamadı veya RSA anahtarı bulunamadı.")
+        encrypted_keys = _encrypted_session_keys(public_key_pem, args.exchanges)
+        results.append(run(label, manager, encrypted_keys, sizes, args.iterations, protocols))
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Embedding arka uçlarını (torch, torch-int8, onnx) hız, bellek ve vektör uyumu açısından karşılaştırır.
+
+Her arka uç temiz bir alt süreçte yüklenir; böylece yükleme süresi ve bellek (RSS) ölçümleri
+birbirini etkilemez. Tek sorgu (embed_query) için sorgu/sn, toplu kodlama (embed_documents)
+için metin/sn raporlanır. Referans torch (fp32) vektörleridir: diğer arka uçların aynı
+metinler için ürettiği vektörlerin kosinüs benzerliği --tolerance altına düşerse arka uç
+mevcut koleksiyonla (turkiye_hukuk_dokumanlari_v3) uyumsuz sayılır ve betik 1 koduyla çıkar.
+
+--qdrant-sample K verilirse koleksiyondan K nokta vektörleriyle okunur ve payload metinleri her
+arka uçla yeniden kodlanarak kayıtlı vektörlerle karşılaştırılır (QDRANT_URL/QDRANT_API_KEY).
+Bu, koleksiyonun yeniden indekslenmesine gerek olup olmadığını doğrudan gösterir.
+
+Kullanım (app/ dizininden):
+    python benchmarks/embedding_backends.py --backends torch,torch-int8,onnx --threads 4
+    python benchmarks/embedding_backends.py --qdrant-sample 200 --tolerance 0.99
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from typing import Any, Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import numpy as np
+
+from benchmarks.pipeline_benchmark import SAMPLE_CASES
+
+REFERENCE_BACKEND = "torch"
+SAMPLE_QUERIES = [
+    "kira bedelinin ödenmemesi nedeniyle tahliye",
+    "işçinin haklı nedenle fesih hakkı ve kıdem tazminatı",
+    "boşanma davasında velayet ve nafaka",
+    "ayıplı mal nedeniyle tüketicinin seçimlik hakları",
+    "trafik kazası sonrası maddi ve manevi tazminat",
+    "mirasın reddi süresi ve şartları",
+    "icra takibine itiraz ve itirazın iptali davası",
+    "idari işlemin iptali için dava açma süresi",
+]
+
+
+def _rss_mb() -> float:
+    # Anlık RSS (/proc) okunamazsa tepe değere düşülür; Linux'ta ru_maxrss KB cinsindendir.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(backend: str) -> None:
+    # Alt süreç: stdin'den iş tanımını okur, ölçümleri ve vektörleri stdout'a JSON yazar.
+    job = json.loads(sys.stdin.read())
+    from tools.embedding_backends import create_embeddings
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    model = create_embeddings(job["model_name"], backend=backend, threads=job["threads"])
+    load_seconds = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    queries = job["queries"]
+    model.embed_query(queries[0])
+    started = time.perf_counter()
+    for i in range(job["query_rounds"]):
+        model.embed_query(queries[i % len(queries)])
+    query_seconds = time.perf_counter() - started
+
+    documents = job["documents"]
+    started = time.perf_counter()
+    document_vectors = model.embed_documents(documents)
+    document_seconds = time.perf_counter() - started
+
+    result = {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "rss_model_mb": round(rss_loaded - rss_before, 1),
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "queries_per_second": round(job["query_rounds"] / query_seconds, 2),
+        "documents_per_second": round(len(documents) / document_seconds, 2),
+        "query_vectors": model.embed_documents(queries),
+        "document_vectors": document_vectors,
+        "check_vectors": model.embed_documents(job["check_texts"]) if job["check_texts"] else [],
+    }
+    sys.stdout.write(json.dumps(result))
+
+
+def measure_backend(backend: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", backend],
+        cwd=APP_DIR, input=json.dumps(job), capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"backend": backend, "error": lines[-1] if lines else f"çıkış kodu {completed.returncode}"}
+    return json.loads(completed.stdout)
+
+
+def cosine_stats(vectors: List[List[float]], reference: List[List[float]]) -> Optional[Dict[str, float]]:
+    if not vectors or not reference:
+        return None
+    a = np.asarray(vectors, dtype=np.float32)
+    b = np.asarray(reference, dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    cosines = np.sum(a * b, axis=1)
+    return {"min": round(float(cosines.min()), 5), "mean": round(float(cosines.mean()), 5)}
+
+
+def load_qdrant_sample(collection_name: str, limit: int):
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), timeout=20.0)
+    points, _ = client.scroll(collection_name=collection_name, limit=limit, with_payload=True, with_vectors=True)
+    points = [p for p in points if p.payload and p.payload.get("text") and isinstance(p.vector, list)]
+    return [p.payload["text"] for p in points], [p.vector for p in points]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding arka uçları hız/bellek/uyum karşılaştırması")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--backends", default="torch,torch-int8,onnx", help="Virgülle ayrılmış arka uç listesi")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("EMBEDDING_THREADS", 0)),
+                        help="Intra-op thread sayısı (0: kütüphane varsayılanı)")
+    parser.add_argument("--query-rounds", type=int, default=200, help="Tek sorgu ölçümündeki çağrı sayısı")
+    parser.add_argument("--documents", type=int, default=256, help="Toplu kodlama ölçümündeki metin sayısı")
+    parser.add_argument("--tolerance", type=float, default=0.99, help="Referansa göre asgari kosinüs benzerliği")
+    parser.add_argument("--qdrant-sample", type=int, default=0, help="Koleksiyondan karşılaştırılacak nokta sayısı")
+    parser.add_argument("--collection", default=os.getenv("QDRANT_COLLECTION_NAME", "turkiye_hukuk_dokumanlari_v3"))
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    from tools.embedding_backends import EMBEDDING_MODEL_NAME
+
+    check_texts, stored_vectors = [], []
+    if args.qdrant_sample:
+        check_texts, stored_vectors = load_qdrant_sample(args.collection, args.qdrant_sample)
+
+    job = {
+        "model_name": EMBEDDING_MODEL_NAME,
+        "threads": args.threads,
+        "query_rounds": args.query_rounds,
+        "queries": SAMPLE_QUERIES,
+        "documents": [SAMPLE_CASES[i % len(SAMPLE_CASES)] for i in range(args.documents)],
+        "check_texts": check_texts,
+    }
+    backends = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    if REFERENCE_BACKEND not in backends:
+        backends.insert(0, REFERENCE_BACKEND)
+
+    measured = {backend: measure_backend(backend, job) for backend in backends}
+    reference = measured[REFERENCE_BACKEND]
+
+    results, violations = [], []
+    for backend, result in measured.items():
+        row = {key: value for key, value in result.items() if not key.endswith("_vectors")}
+        if "error" not in result:
+            if "error" not in reference:
+                row["cosine_vs_reference"] = cosine_stats(
+                    result["query_vectors"] + result["document_vectors"],
+                    reference["query_vectors"] + reference["document_vectors"],
+                )
+            row["cosine_vs_collection"] = cosine_stats(result["check_vectors"], stored_vectors)
+            for label in ("cosine_vs_reference", "cosine_vs_collection"):
+                stats = row.get(label)
+                if stats and stats["min"] < args.tolerance:
+                    violations.append(f"{backend}: {label} min {stats['min']} < {args.tolerance}")
+        else:
+            violations.append(f"{backend} yüklenemedi: {result['error']}")
+        results.append(row)
+
+    summary = {
+        "model": EMBEDDING_MODEL_NAME,
+        "threads": args.threads or "varsayılan",
+        "tolerance": args.tolerance,
+        "qdrant_sample": len(check_texts),
+        "results": results,
+        "violations": violations,
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
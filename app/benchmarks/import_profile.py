@@ -0,0 +1,125 @@
+"""Modül import sürelerini `python -X importtime` ile ölçer ve soğuk başlangıç bütçesini denetler.
+
+Her hedef modül temiz bir alt süreçte içe aktarılır. Toplam süre, en pahalı üst düzey paketler
+ve ağır bağımlılıkların (torch, crewai_tools, qdrant_client vb.) bu yolda yüklenip
+yüklenmediği raporlanır. `web_server`, `run.py`'nin sunucuyu açmadan önce yaptığı tek
+işlemdir; süresi --budget değerini aşarsa ya da ağır bağımlılıklardan biri yüklenirse betik 1
+koduyla çıkar. Ekipler ve model bu bütçeye dahil değildir; ilk istekte ya da EAGER_WARMUP ile
+arka planda yüklenirler.
+
+Kullanım (app/ dizininden):
+    python benchmarks/import_profile.py --budget 2.5 --top 15
+    python benchmarks/import_profile.py --modules web_server,crews.crew_pool,tools.web_tools
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sunucu açılırken yüklenmemesi gereken, saniyeler süren bağımlılıklar.
+HEAVY_PACKAGES = [
+    "torch", "sentence_transformers", "transformers", "langchain_huggingface",
+    "crewai", "crewai_tools", "embedchain", "chromadb", "litellm", "qdrant_client",
+]
+COLD_START_MODULE = "web_server"
+
+
+def profile_import(module: str) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_seconds = time.perf_counter() - started
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # Biçim: "import time:  self | cumulative | <girinti><modül>"; girinti iç içe importu gösterir.
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name.rstrip()
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    loaded = {entry["module"] for entry in entries}
+    return {
+        "module": module,
+        "ok": completed.returncode == 0,
+        "error": completed.stderr.strip().splitlines()[-1] if completed.returncode else None,
+        "wall_seconds": round(wall_seconds, 3),
+        "import_seconds": round(sum(e["cumulative_ms"] for e in entries if e["depth"] == 0) / 1000, 3),
+        "heavy_packages": [package for package in HEAVY_PACKAGES if package in loaded],
+        "entries": entries,
+    }
+
+
+def top_packages(entries: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    # Süre, kök paket adına göre (ör. "crewai.tools.base_tool" -> "crewai") modüllerin kendi
+    # sürelerinin toplamıdır; böylece her paketin import süresine katkısı çift sayılmadan görülür.
+    totals: Dict[str, float] = {}
+    for entry in entries:
+        root = entry["module"].split(".")[0]
+        totals[root] = totals.get(root, 0.0) + entry["self_ms"]
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"package": package, "self_ms": round(self_ms, 1)} for package, self_ms in ranked]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import süresi profili ve soğuk başlangıç bütçesi")
+    parser.add_argument("--modules", default="web_server,tools.qdrant_vector_search_tool,tools.web_tools,crews.legal_analysis_crew",
+                        help="Virgülle ayrılmış modül listesi")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("COLD_START_BUDGET_SECONDS", 2.5)),
+                        help=f"{COLD_START_MODULE} importu için azami süre (sn)")
+    parser.add_argument("--top", type=int, default=10, help="Raporlanacak en pahalı paket sayısı")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    modules = [module.strip() for module in args.modules.split(",") if module.strip()]
+    if COLD_START_MODULE not in modules:
+        modules.insert(0, COLD_START_MODULE)
+
+    results = []
+    for module in modules:
+        profile = profile_import(module)
+        results.append({
+            "module": module,
+            "ok": profile["ok"],
+            "error": profile["error"],
+            "wall_seconds": profile["wall_seconds"],
+            "import_seconds": profile["import_seconds"],
+            "heavy_packages": profile["heavy_packages"],
+            "top_packages": top_packages(profile["entries"], args.top),
+        })
+
+    cold_start = next(r for r in results if r["module"] == COLD_START_MODULE)
+    violations = []
+    if not cold_start["ok"]:
+        violations.append(f"{COLD_START_MODULE} içe aktarılamadı: {cold_start['error']}")
+    if cold_start["wall_seconds"] > args.budget:
+        violations.append(f"{COLD_START_MODULE} importu {cold_start['wall_seconds']} sn, bütçe {args.budget} sn")
+    if cold_start["heavy_packages"]:
+        violations.append(f"{COLD_START_MODULE} ağır bağımlılık yüklüyor: {', '.join(cold_start['heavy_packages'])}")
+
+    summary = {"budget_seconds": args.budget, "results": results, "violations": violations}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Yerel vektör indeksini (QDRANT_LOCAL_INDEX) uzak Qdrant koleksiyonuyla karşılaştırır.
+
+Koleksiyon geçici bir dizine senkronize edilir. Koleksiyondan örneklenen noktaların kayıtlı
+vektörleri sorgu olarak kullanılır; bu yüzden embedding modeli gerekmez. Her sorgu filtresiz ve
+`ana_hukuk_alani`, `dokuman_tipi`, `madde_no` filtreleriyle hem uzak Qdrant'ta hem yerel indekste
+çalıştırılır. Skor dizileri ve (sınırdaki eşit skorlar dışında) nokta kimlikleri aynı olmalıdır;
+fark bulunursa betik 1 koduyla çıkar. Her iki yolun sorgu başına gecikmesi de raporlanır.
+
+QDRANT_URL tanımlı değilse sentetik verili bellek içi bir koleksiyon kullanılır.
+
+Kullanım (app/ dizininden):
+    python benchmarks/local_index_benchmark.py --queries 100 --limit 8
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from tools.local_vector_index import INDEXED_PAYLOAD_FIELDS, LocalVectorIndex
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+    }
+
+
+def _same_hits(remote: List[Any], local: List[Any]) -> bool:
+    remote_scores = [round(h.score, 4) for h in remote]
+    if remote_scores != [round(h.score, 4) for h in local]:
+        return False
+    # Limit sınırındaki eşit skorlu noktalardan hangisinin döneceği belirsizdir.
+    cutoff = remote_scores[-1] if remote_scores else None
+    return (
+        {str(h.id) for h in remote if round(h.score, 4) != cutoff}
+        == {str(h.id) for h in local if round(h.score, 4) != cutoff}
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Yerel vektör indeksi / uzak Qdrant karşılaştırması")
+    parser.add_argument("--collection", default=os.getenv("QDRANT_COLLECTION_NAME", "turkiye_hukuk_dokumanlari_v3"))
+    parser.add_argument("--queries", type=int, default=100, help="Örneklenecek sorgu vektörü sayısı")
+    parser.add_argument("--limit", type=int, default=8, help="Sorgu başına sonuç sayısı")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Skor eşiği")
+    parser.add_argument("--documents", type=int, default=2500, help="Bellek içi koleksiyon için sentetik chunk sayısı")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+    if os.getenv("QDRANT_URL"):
+        client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), prefer_grpc=True, timeout=20.0)
+        collection = args.collection
+    else:
+        from benchmarks.offline_stubs import HashEmbeddings, build_local_qdrant
+        collection = "local_index_benchmark"
+        client = build_local_qdrant(collection, args.documents, HashEmbeddings())
+
+    index = LocalVectorIndex(collection, lambda: client, directory=tempfile.mkdtemp(prefix="local_index_"), sync_interval=0)
+    sync = index.sync(full=True)
+
+    points, _ = client.scroll(collection_name=collection, limit=max(args.queries * 4, 256), with_payload=True, with_vectors=True)
+    points = [p for p in points if isinstance(p.vector, list)]
+    random.Random(42).shuffle(points)
+    points = points[:args.queries]
+
+    remote_seconds, local_seconds, mismatches = [], [], []
+    for point in points:
+        filters = [None] + [
+            Filter(must=[FieldCondition(key=field, match=MatchValue(value=point.payload[field]))])
+            for field in INDEXED_PAYLOAD_FIELDS
+            if isinstance((point.payload or {}).get(field), (str, int)) and point.payload[field] != ""
+        ]
+        for query_filter in filters:
+            started = time.perf_counter()
+            remote = client.query_points(
+                collection_name=collection, query=point.vector, query_filter=query_filter,
+                limit=args.limit, with_payload=True, score_threshold=args.threshold,
+            ).points
+            remote_seconds.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            local = index.search_batch([point.vector], query_filter, args.limit, args.threshold)[0]
+            local_seconds.append(time.perf_counter() - started)
+
+            if not _same_hits(remote, local):
+                mismatches.append({
+                    "point": str(point.id),
+                    "filter": query_filter.model_dump(exclude_none=True) if query_filter else None,
+                    "remote": [(str(h.id), round(h.score, 4)) for h in remote],
+                    "local": [(str(h.id), round(h.score, 4)) for h in local],
+                })
+
+    summary = {
+        "collection": collection,
+        "remote": bool(os.getenv("QDRANT_URL")),
+        "sync": sync,
+        "searches": len(remote_seconds),
+        "remote_latency": _latency(remote_seconds) if remote_seconds else None,
+        "local_latency": _latency(local_seconds) if local_seconds else None,
+        "mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:3],
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
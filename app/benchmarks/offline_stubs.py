@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+import numpy as np
+from crewai import BaseLLM
+from crewai.tools import BaseTool
+from crewai.utilities.string_utils import sanitize_tool_name
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TASKS_CONFIG_PATH = os.path.join(APP_DIR, "config", "tasks.yaml")
+
+RAG_TOOL_NAME = "Gelişmiş Hukuki Bilgi Arama Aracı"
+
+LEGAL_AREAS = ["medeni_hukuk", "ceza_hukuku", "is_hukuku", "ticaret_hukuku", "icra_iflas_hukuku"]
+DOCUMENT_TYPES = ["kanun", "yargitay_karari", "yonetmelik"]
+SYNTHETIC_SENTENCES = [
+    "Mirasçıların saklı pay oranları Türk Medeni Kanunu madde 506 uyarınca belirlenir.",
+    "Tenkis davası, saklı payı zedelenen mirasçı tarafından açılır ve bir yıllık hak düşürücü süreye tabidir.",
+    "Kıdem tazminatı, işçinin her tam hizmet yılı için otuz günlük brüt ücreti üzerinden hesaplanır.",
+    "Kasten yaralama suçu Türk Ceza Kanunu madde 86 kapsamında düzenlenmiştir.",
+    "Haksız fiilden doğan tazminat talepleri Türk Borçlar Kanunu madde 49 çerçevesinde değerlendirilir.",
+    "İcra takibine itiraz, ödeme emrinin tebliğinden itibaren yedi gün içinde yapılmalıdır.",
+    "Anonim şirket yönetim kurulu üyelerinin sorumluluğu Türk Ticaret Kanunu madde 553 ile düzenlenir.",
+    "Boşanma davasında nafaka miktarı tarafların ekonomik durumu gözetilerek belirlenir.",
+]
+
+
+class HashEmbeddings:
+    # MiniLM yerine geçen, model indirmeyen deterministik embedding: kelimeler sabit boyutlu
+    # bir vektöre hash'lenir ve normalize edilir. Aynı kelimeleri paylaşan metinler benzer çıkar.
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def build_local_qdrant(collection_name: str, document_count: int, embeddings: HashEmbeddings, seed: int = 42):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+    rng = random.Random(seed)
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(size=embeddings.dimension, distance=Distance.COSINE),
+    )
+
+    points = []
+    for index in range(document_count):
+        text = " ".join(rng.sample(SYNTHETIC_SENTENCES, 3))
+        article = re.search(r"madde (\d+)", text)
+        points.append(PointStruct(
+            id=str(uuid.UUID(int=index)),
+            vector=embeddings.embed_query(text),
+            payload={
+                "text": text,
+                "dosya_adi": f"sentetik_belge_{index // 4}.pdf",
+                "chunk_index": index % 4,
+                "dokuman_tipi": rng.choice(DOCUMENT_TYPES),
+                "ana_hukuk_alani": rng.choice(LEGAL_AREAS),
+                "madde_no": article.group(1) if article else "",
+            },
+        ))
+    client.upsert(collection_name=collection_name, points=points)
+    return client
+
+
+def _load_expected_outputs() -> Dict[str, str]:
+    with open(TASKS_CONFIG_PATH, encoding="utf-8") as f:
+        tasks = yaml.safe_load(f)
+    return {name: str(config.get("expected_output", "")).strip() for name, config in tasks.items()}
+
+
+class FakeLLM(BaseLLM):
+    # tasks.yaml'daki expected_output şablonlarını yanıt olarak döndüren, gecikmesi ayarlanabilir
+    # deterministik LLM. Araçlı ajanlarda önce bir araç çağrısı yapar, böylece Qdrant ve web
+    # araçları da gerçek ekip akışında çalışır.
+    def __init__(self, latency_seconds: float = 0.0, reanalysis_probability: float = 0.0, seed: int = 42, tool_inputs: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(model="fake-gpt", temperature=0.0)
+        self.latency_seconds = latency_seconds
+        self.reanalysis_probability = reanalysis_probability
+        self.tool_inputs = tool_inputs or {}
+        self.calls = 0
+        # İsteğe bağlı (prompt, yanıt) -> yanıt kancası; stres testleri yanıtlara işaret eklemek için kullanır.
+        self.response_hook: Optional[Callable[[str, str], str]] = None
+        self._expected_outputs = _load_expected_outputs()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _match_task(self, prompt: str) -> Optional[str]:
+        # crewai görevin beklenen çıktısını prompt'un sonuna ekler; önceki görevlerin çıktıları
+        # (ör. geri bildirim ekibine verilen doğrulama metni) daha önce geçtiği için son eşleşme alınır.
+        best_name, best_position = None, -1
+        for name, expected in self._expected_outputs.items():
+            position = prompt.rfind(expected[:120]) if expected else -1
+            if position > best_position:
+                best_name, best_position = name, position
+        return best_name
+
+    def _final_answer(self, task_name: Optional[str]) -> str:
+        expected = self._expected_outputs.get(task_name or "", "{}")
+        if task_name == "legal_feedback_task":
+            with self._lock:
+                needs_reanalysis = self._random.random() < self.reanalysis_probability
+                quality = round(self._random.uniform(0.5, 0.95), 2)
+            try:
+                parsed = json.loads(expected)
+                parsed["needs_reanalysis"] = needs_reanalysis
+                parsed.setdefault("kalite_değerlendirmesi", {})["genel_kalite_skoru"] = quality
+                expected = json.dumps(parsed, ensure_ascii=False)
+            except json.JSONDecodeError:
+                pass
+        return f"Thought: Gerekli bilgiler toplandı.\nFinal Answer: {expected}"
+
+    def call(self, messages, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        prompt = messages if isinstance(messages, str) else "\n".join(str(m.get("content", "")) for m in messages)
+        response = self._respond(prompt)
+        return self.response_hook(prompt, response) if self.response_hook else response
+
+    def _respond(self, prompt: str) -> str:
+        for tool_name, tool_input in self.tool_inputs.items():
+            # crewai araç adlarını prompt'a sanitize_tool_name ile yazar (ör. gelismis_hukuki_bilgi_arama_arac).
+            # Format talimatı da "Observation:" içerdiğinden, aracın çağrılıp çağrılmadığı bu yanıtın
+            # kendi Action satırının konuşmada geçmesinden anlaşılır.
+            prompt_name = sanitize_tool_name(tool_name)
+            action = f"Action: {prompt_name}\nAction Input: {json.dumps(tool_input, ensure_ascii=False)}"
+            if f"Tool Name: {prompt_name}" in prompt and action not in prompt:
+                return f"Thought: Önce kaynaklara bakmalıyım.\n{action}"
+        return self._final_answer(self._match_task(prompt))
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+
+class ToolRunCounter:
+    # Araçların gerçekten çalıştırıldığını (yalnızca LLM'in istemesini değil) sayar; benchmark
+    # beklenen araçlar hiç çalışmadıysa başarısız sayılır.
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tool_name: str) -> None:
+        with self._lock:
+            self.counts[tool_name] = self.counts.get(tool_name, 0) + 1
+
+    def wrap(self, tool_class):
+        counter = self
+
+        def _run(self, *args, **kwargs):
+            counter.record(self.name)
+            return tool_class._run(self, *args, **kwargs)
+
+        return type(tool_class.__name__, (tool_class,), {"_run": _run})
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class StubSearchTool(BaseTool):
+    name: str = "Search the internet with Serper"
+    description: str = "Web araması için çevrimdışı yer tutucu; sabit sonuçlar döndürür."
+    latency_seconds: float = 0.0
+
+    def _run(self, search_query: str = "", **kwargs) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return json.dumps({
+            "organic": [
+                {"title": "Yargıtay Kararı", "link": "https://karararama.yargitay.gov.tr/ornek", "snippet": SYNTHETIC_SENTENCES[1]},
+                {"title": "Mevzuat", "link": "https://www.mevzuat.gov.tr/ornek", "snippet": SYNTHETIC_SENTENCES[0]},
+            ]
+        }, ensure_ascii=False)
+
+
+class StubWebsiteSearchTool(BaseTool):
+    name: str = "Search in a specific website"
+    description: str = "Belirli bir sitede arama için çevrimdışı yer tutucu."
+
+    def _run(self, search_query: str = "", website: str = "", **kwargs) -> str:
+        return SYNTHETIC_SENTENCES[2]
+
+
+class StubScrapeWebsiteTool(BaseTool):
+    name: str = "Read website content"
+    description: str = "Web sayfası okumak için çevrimdışı yer tutucu."
+    latency_seconds: float = 0.0
+
+    def _run(self, website_url: str = "", **kwargs) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return " ".join(SYNTHETIC_SENTENCES)
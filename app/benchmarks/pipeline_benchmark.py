@@ -0,0 +1,211 @@
+"""Tüm analiz pipeline'ını OpenAI, Serper ve uzak Qdrant olmadan uçtan uca ölçer.
+
+LLM yerine tasks.yaml şablonlarını döndüren gecikmesi ayarlanabilir bir FakeLLM, Qdrant yerine
+sentetik belgelerle doldurulmuş bellek içi bir koleksiyon, MiniLM yerine hash tabanlı bir
+embedding ve web araçları yerine sabit yanıtlar kullanılır. Böylece ekip/araç/pipeline
+katmanlarının kendi yükü tekrarlanabilir şekilde ölçülür. RAG ve web arama araçları ölçüm
+boyunca hiç çalıştırılmadıysa betik sıfırdan farklı kodla çıkar.
+
+Kullanım (app/ dizininden):
+    python benchmarks/pipeline_benchmark.py --requests 20 --concurrency 4 --llm-latency 0.2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+SAMPLE_CASES = [
+    "Babam vefat etti ve tüm mirasını tek bir kardeşime bağışlamış. Saklı payımı nasıl talep edebilirim?",
+    "İşverenim beni 8 yıl çalıştıktan sonra haklı bir sebep göstermeden işten çıkardı. Kıdem tazminatı alabilir miyim?",
+    "Komşumla çıkan kavgada yaralandım, darp raporum var. Hangi suçtan şikayetçi olabilirim?",
+    "Aleyhime başlatılan icra takibindeki borcu kabul etmiyorum. İtiraz süresi ne kadar?",
+]
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(_percentile(values, 50), 4),
+        "p95": round(_percentile(values, 95), 4),
+        "p99": round(_percentile(values, 99), 4),
+        "mean": round(statistics.fmean(values), 4) if values else 0.0,
+    }
+
+
+def install_offline_stubs(args) -> Any:
+    # Uygulama modülleri import edilmeden önce ortam ayarlanır; ardından LLM, embedding,
+    # Qdrant istemcisi ve web araçları modül düzeyinde yer tutucularla değiştirilir.
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("SERPER_API_KEY", "offline-benchmark")
+    os.environ["ANALYSIS_CACHE_ENABLED"] = "true" if args.analysis_cache else "false"
+    os.environ["LLM_CACHE_SIZE"] = str(args.llm_cache_size)
+
+    from benchmarks.offline_stubs import (
+        RAG_TOOL_NAME, FakeLLM, HashEmbeddings, StubSearchTool, StubWebsiteSearchTool,
+        StubScrapeWebsiteTool, ToolRunCounter, build_local_qdrant,
+    )
+    from llms import SharedLLM
+    from tools import qdrant_vector_search_tool
+    from tools.embedding_service import EmbeddingService
+    from crews import legal_analysis_crew, legal_feedback_crew, legal_input_processing_crew
+
+    embeddings = HashEmbeddings()
+    collection_name = os.getenv("QDRANT_COLLECTION_NAME", "turkiye_hukuk_dokumanlari_v3")
+    qdrant_vector_search_tool._global_qdrant_client = build_local_qdrant(collection_name, args.documents, embeddings)
+    qdrant_vector_search_tool._global_embedding_model = embeddings
+    qdrant_vector_search_tool._global_embedding_service = EmbeddingService(embeddings, "hash-embeddings")
+
+    fake_llm = FakeLLM(
+        latency_seconds=args.llm_latency,
+        reanalysis_probability=args.reanalysis_probability,
+        tool_inputs={
+            RAG_TOOL_NAME: {"query": "saklı pay tenkis davası"},
+            StubSearchTool.model_fields["name"].default: {"search_query": "yargıtay saklı pay kararı"},
+        },
+    )
+
+    def fake_create_gpt(cache: bool = False, task_name: str = "unknown"):
+        # Gerçek sarmalayıcı korunur; böylece önbellek ve tekilleştirme katmanı da ölçüme dahil olur.
+        return SharedLLM(fake_llm, cache_enabled=cache, task_name=task_name)
+
+    for module in (legal_analysis_crew, legal_feedback_crew, legal_input_processing_crew):
+        module._create_gpt = fake_create_gpt
+    class ScrapeTool(StubScrapeWebsiteTool):
+        latency_seconds: float = args.web_latency
+
+    class RagTool(legal_analysis_crew.QdrantLegalSearchTool):
+        # Hash embedding skorları MiniLM'den düşüktür; varsayılan eşikle (0.6) hiç sonuç dönmez.
+        base_similarity_threshold: float = 0.3
+
+    tool_runs = ToolRunCounter()
+    search_tool_class = tool_runs.wrap(StubSearchTool)
+    legal_analysis_crew.QdrantLegalSearchTool = tool_runs.wrap(RagTool)
+    legal_analysis_crew.SerperDevTool = lambda **kwargs: search_tool_class(latency_seconds=args.web_latency)
+    legal_analysis_crew.WebsiteSearchTool = StubWebsiteSearchTool
+    legal_analysis_crew.ScrapeWebsiteTool = ScrapeTool
+    return fake_llm, tool_runs
+
+
+def run_single_request(web_server, case_text: str) -> Dict[str, Any]:
+    from utils.progress import progress_listener
+
+    events: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    with progress_listener(lambda event_type, data: events.append({
+        "type": event_type, "data": data, "at": time.perf_counter() - started,
+    })):
+        error = None
+        try:
+            web_server.run_analysis_pipeline(case_text, session_id="benchmark")
+        except Exception as e:
+            error = str(e)
+    total = time.perf_counter() - started
+
+    # Her aşamanın süresi, kendi "stage" olayından bir sonraki aşamaya (ya da bitişe) kadardır.
+    stage_marks = [(e["data"].get("stage"), e["at"]) for e in events if e["type"] in ("stage", "cache_hit")]
+    stages: Dict[str, float] = {}
+    for index, (stage, at) in enumerate(stage_marks):
+        end = stage_marks[index + 1][1] if index + 1 < len(stage_marks) else total
+        stages[stage] = stages.get(stage, 0.0) + (end - at)
+
+    return {
+        "seconds": total,
+        "stages": stages,
+        "feedback_iterations": sum(1 for e in events if e["type"] == "feedback_iteration"),
+        "cache_hit": any(e["type"] == "cache_hit" for e in events),
+        "error": error,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Çevrimdışı uçtan uca pipeline benchmark'ı")
+    parser.add_argument("--requests", type=int, default=8, help="Toplam analiz isteği sayısı")
+    parser.add_argument("--concurrency", type=int, default=2, help="Eş zamanlı istek sayısı")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Her LLM çağrısına eklenen gecikme (sn)")
+    parser.add_argument("--web-latency", type=float, default=0.0, help="Web arama/scrape yer tutucularının gecikmesi (sn)")
+    parser.add_argument("--reanalysis-probability", type=float, default=0.3, help="Geri bildirim ajanının yeniden analiz isteme olasılığı")
+    parser.add_argument("--documents", type=int, default=500, help="Bellek içi Qdrant'a yüklenecek sentetik chunk sayısı")
+    parser.add_argument("--analysis-cache", action="store_true", help="Analiz sonuç önbelleğini (Redis) etkinleştirir")
+    parser.add_argument("--llm-cache-size", type=int, default=512, help="LLM çağrı önbelleği kapasitesi")
+    parser.add_argument("--warmup", type=int, default=1, help="Ölçüme dahil edilmeyen ısınma isteği sayısı")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    fake_llm, tool_runs = install_offline_stubs(args)
+
+    import web_server
+    from utils.llm_cache import llm_call_layer
+    from utils.context_budget import context_budget
+
+    web_server.lazy_initialize_llm_crews()
+    if not web_server.llm_crews_initialized:
+        raise SystemExit("LLM ekipleri başlatılamadı.")
+    report_dir = tempfile.mkdtemp(prefix="legal_benchmark_reports_")
+    web_server.report_generator.output_dir = report_dir
+
+    for index in range(args.warmup):
+        run_single_request(web_server, SAMPLE_CASES[index % len(SAMPLE_CASES)])
+    calls_before = fake_llm.calls
+
+    cases = [SAMPLE_CASES[index % len(SAMPLE_CASES)] for index in range(args.requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="benchmark") as executor:
+        results = list(executor.map(lambda case: run_single_request(web_server, case), cases))
+    wall_seconds = time.perf_counter() - started
+
+    succeeded = [r for r in results if not r["error"]]
+    stage_names = sorted({stage for r in succeeded for stage in r["stages"]})
+    summary = {
+        "config": vars(args),
+        "requests": len(results),
+        "errors": len(results) - len(succeeded),
+        "wall_seconds": round(wall_seconds, 3),
+        "requests_per_second": round(len(succeeded) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_seconds": _summarize([r["seconds"] for r in succeeded]),
+        "stages_seconds": {
+            stage: _summarize([r["stages"][stage] for r in succeeded if stage in r["stages"]])
+            for stage in stage_names
+        },
+        "feedback_iterations_mean": round(statistics.fmean(r["feedback_iterations"] for r in succeeded), 2) if succeeded else 0.0,
+        "analysis_cache_hits": sum(1 for r in succeeded if r["cache_hit"]),
+        "llm_calls": fake_llm.calls - calls_before,
+        "llm_layer": llm_call_layer.stats(),
+        "context_budget": context_budget.stats(),
+        "crew_pool": web_server.crew_pool.stats(),
+        "report_dir": report_dir,
+        "threads_alive": threading.active_count(),
+        "tool_runs": tool_runs.snapshot(),
+    }
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    # Araçlar hiç çalışmadıysa ölçülen akış gerçek ekip akışı değildir; sonuç geçersiz sayılır.
+    missing_tools = [name for name in fake_llm.tool_inputs if not summary["tool_runs"].get(name)]
+    if missing_tools:
+        print(f"Beklenen araçlar çalıştırılmadı: {missing_tools}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Arama sonrası aşamanın (tools/result_postprocess.py) eklediği gecikmeyi ve kazandırdığı tokeni ölçer.
+
+Sentetik uzun belgeler içe aktarma komutuyla aynı ayırıcıyla (512 karakter, 64 örtüşme)
+bölünür ve bellek içi Qdrant'a yüklenir. Belgelerin bir kısmı farklı dosya adıyla ikinci kez
+yüklenir (aynı kararın iki kaynaktan indirilmesi gibi). Her sorgu için aday sonuçlar vektörleriyle
+alınır ve şu üç çıktı karşılaştırılır:
+    - raw: ilk `limit` sonuç (aşama kapalıyken ajanın gördüğü),
+    - same_candidates: aşama yalnızca bu `limit` sonuca uygulanır; tekrarlar ve örtüşmeler
+      atıldığı için aynı bilgi daha az tokenle verilir (kazanılan token),
+    - backfilled: aşama tüm adaylara uygulanır; atılan tekrarların yerini yeni belgeler alır
+      (aynı sonuç sayısında daha geniş kapsam).
+Ajana giden token, sonuç sayısı, kapsanan farklı belge sayısı ve aşamanın sorgu başına
+gecikmesi (arama gecikmesiyle birlikte) raporlanır.
+
+Kullanım (app/ dizininden):
+    python benchmarks/result_postprocess_benchmark.py --documents 200 --queries 200 --limit 5
+    python benchmarks/result_postprocess_benchmark.py --mmr-lambda 0.7 --candidates 20
+    python benchmarks/result_postprocess_benchmark.py --rerank-model cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import statistics
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from benchmarks.offline_stubs import SYNTHETIC_SENTENCES, HashEmbeddings
+from tools.result_postprocess import CrossEncoderReranker, ResultPostprocessor
+from utils.token_counter import count_tokens
+
+COLLECTION_NAME = "postprocess_benchmark"
+FILLER_SENTENCES = [
+    "Mahkeme, dosyadaki delilleri ve bilirkişi raporunu birlikte değerlendirmiştir.",
+    "Taraflar arasındaki uyuşmazlık sözleşmenin yorumlanmasına ilişkindir.",
+    "İlk derece mahkemesinin kararı usul ve yasaya uygun bulunmuştur.",
+    "Davalı vekili süresi içinde istinaf yoluna başvurmuştur.",
+    "Hükmün gerekçesinde ilgili içtihatlara ayrıntılı olarak yer verilmiştir.",
+]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+    }
+
+
+def build_collection(document_count: int, duplicate_ratio: float, embeddings: HashEmbeddings, seed: int):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+    from vector_db.ingest import CHUNK_SEPARATORS
+
+    rng = random.Random(seed)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=64, separators=CHUNK_SEPARATORS)
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=VectorParams(size=embeddings.dimension, distance=Distance.COSINE),
+    )
+
+    documents = []
+    for index in range(document_count):
+        # Her belge tek bir konu etrafında döner (komşu chunk'lar aynı sorguda birlikte gelir); cümlelere
+        # eklenen paragraf numaraları chunk'ları birbirinden ayırır, birebir tekrarlar yalnızca kopyalardan gelir.
+        topic = rng.choice(SYNTHETIC_SENTENCES)
+        sentences = [
+            f"{paragraph}. paragraf ({index}/{paragraph * 7 + index}): "
+            + (topic if rng.random() < 0.4 else rng.choice(FILLER_SENTENCES))
+            for paragraph in range(1, 41)
+        ]
+        documents.append((f"belge_{index}.pdf", " ".join(sentences)))
+    for index in rng.sample(range(document_count), int(document_count * duplicate_ratio)):
+        documents.append((f"belge_{index}_kopya.pdf", documents[index][1]))
+
+    points = []
+    for file_name, text in documents:
+        for chunk_index, chunk in enumerate(splitter.split_text(text)):
+            points.append(PointStruct(
+                id=str(uuid.uuid4()),
+                vector=embeddings.embed_query(chunk),
+                payload={"text": chunk, "dosya_adi": file_name, "chunk_index": chunk_index},
+            ))
+    client.upsert(collection_name=COLLECTION_NAME, points=points)
+    return client, len(points)
+
+
+def _measure(results: List[Any]) -> Dict[str, int]:
+    # Qdrant sonucu (payload sözlüğü) ve RetrievedChunk aynı alanlarla ölçülür; kopya dosyalar
+    # kaynak belgeyle aynı sayılır.
+    texts = [getattr(result, "text", None) or result.payload["text"] for result in results]
+    documents = {result.payload["dosya_adi"].replace("_kopya", "") for result in results}
+    return {"tokens": sum(count_tokens(text) for text in texts), "hits": len(results), "documents": len(documents)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Arama sonrası tekilleştirme / birleştirme aşamasının gecikme ve token ölçümü")
+    parser.add_argument("--documents", type=int, default=200, help="Sentetik belge sayısı")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="Farklı dosya adıyla tekrar yüklenen belge oranı")
+    parser.add_argument("--queries", type=int, default=200, help="Ölçülen sorgu sayısı")
+    parser.add_argument("--limit", type=int, default=5, help="Ajana döndürülen sonuç sayısı")
+    parser.add_argument("--candidates", type=int, default=8, help="Aramada alınan aday sayısı (araçta limit + fallback_overfetch)")
+    parser.add_argument("--dedup-threshold", type=float, default=0.97)
+    parser.add_argument("--mmr-lambda", type=float, default=1.0)
+    parser.add_argument("--rerank-model", help="Cross-encoder modeli (sentence_transformers gerekir)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    embeddings = HashEmbeddings()
+    client, point_count = build_collection(args.documents, args.duplicate_ratio, embeddings, args.seed)
+    reranker = CrossEncoderReranker(args.rerank_model) if args.rerank_model else None
+    postprocessor = ResultPostprocessor(dedup_threshold=args.dedup_threshold, mmr_lambda=args.mmr_lambda, reranker=reranker)
+    same_candidates = ResultPostprocessor(dedup_threshold=args.dedup_threshold, mmr_lambda=args.mmr_lambda, reranker=reranker)
+
+    rng = random.Random(args.seed)
+    variants = {"raw": [], "same_candidates": [], "backfilled": []}
+    search_seconds, stage_seconds = [], []
+    for _ in range(args.queries):
+        query = rng.choice(SYNTHETIC_SENTENCES)
+        started = time.perf_counter()
+        hits = client.query_points(
+            collection_name=COLLECTION_NAME,
+            query=embeddings.embed_query(query),
+            limit=args.candidates,
+            with_payload=True,
+            with_vectors=True,
+        ).points
+        search_seconds.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        selected = postprocessor.process(query, hits, args.limit)
+        stage_seconds.append(time.perf_counter() - started)
+
+        variants["raw"].append(_measure(hits[:args.limit]))
+        variants["same_candidates"].append(_measure(same_candidates.process(query, hits[:args.limit], args.limit)))
+        variants["backfilled"].append(_measure(selected))
+
+    raw_tokens = sum(row["tokens"] for row in variants["raw"])
+    same_tokens = sum(row["tokens"] for row in variants["same_candidates"])
+    summary = {
+        "config": vars(args),
+        "points": point_count,
+        "search_latency": _latency(search_seconds),
+        "postprocess_latency": _latency(stage_seconds),
+        "per_query": {
+            name: {key: round(statistics.fmean(row[key] for row in rows), 2) for key in ("tokens", "hits", "documents")}
+            for name, rows in variants.items()
+        },
+        "tokens_saved_percent": round((1 - same_tokens / raw_tokens) * 100, 2) if raw_tokens else 0.0,
+        "stage": postprocessor.stats(),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
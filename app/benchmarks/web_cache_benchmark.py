@@ -0,0 +1,244 @@
+"""Web arama / sayfa okuma önbelleğini (tools/web_cache.py) Serper ve gerçek siteler olmadan ölçer.
+
+Yerel bir HTTP sunucusu hem Serper API'sinin (POST /search) hem de mevzuat / karar sayfalarının
+(GET /karar/<n>) yerine geçer. Sayfalar ETag ve Last-Modified döndürür, koşullu isteklere 304 ile
+yanıt verir. Sunucu gelen istek sayısını, aynı anda açık istek sayısını ve açılan TCP bağlantı
+sayısını sayar. Gerçek araç sınıfları (tools/web_tools.py) kullanılır ve her "analiz" aynı
+sorguları ve sayfaları yeni araç örnekleriyle çağırır (her istek ve iterasyonda ekibin araçları
+yeniden kurulduğu gibi). Aşamalar:
+    cold       : önbellek boş, tüm istekler sunucuya gider,
+    warm       : önbellek taze, sunucuya istek gitmez,
+    revalidate : tazelik süresi dolmuş, sayfalar koşullu istekle 304 alır,
+    changed    : sayfaların bir kısmı sunucuda değişmiş, yalnızca onlar yeniden okunur.
+Yerel sunucu loopback adresinde çalıştığından betik crewai_tools'un SSRF kontrolünü yalnızca
+kendi süreci için kapatır (CREWAI_TOOLS_ALLOW_UNSAFE_PATHS).
+
+Kullanım (app/ dizininden):
+    python benchmarks/web_cache_benchmark.py --analyses 20 --concurrency 8 --pages 10 --latency 0.05
+    python benchmarks/web_cache_benchmark.py --fetch-concurrency 2 --output /tmp/web_cache.json
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+os.environ["CREWAI_TOOLS_ALLOW_UNSAFE_PATHS"] = "true"
+os.environ.setdefault("SERPER_API_KEY", "benchmark")
+
+from benchmarks.offline_stubs import SYNTHETIC_SENTENCES
+
+
+class StandInState:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.versions: Dict[int, int] = {}
+        self.lock = threading.Lock()
+        self.counts = {"search": 0, "page_200": 0, "page_304": 0}
+        self.active = 0
+        self.max_active = 0
+        self.connections = 0
+
+    def page(self, number: int) -> bytes:
+        version = self.versions.get(number, 1)
+        sentences = " ".join(SYNTHETIC_SENTENCES[(number + i) % len(SYNTHETIC_SENTENCES)] for i in range(40))
+        return (
+            f"<html><head><title>Karar {number}</title></head><body><h1>Karar {number} (sürüm {version})</h1>"
+            f"<p>{sentences}</p></body></html>"
+        ).encode("utf-8")
+
+
+def make_handler(state: StandInState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def log_message(self, *args):
+            pass
+
+        def _enter(self):
+            with state.lock:
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+            time.sleep(state.latency)
+
+        def _leave(self):
+            with state.lock:
+                state.active -= 1
+
+        def _send(self, status: int, body: bytes, headers: Dict[str, str]):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self._enter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                query = json.loads(self.rfile.read(length) or b"{}").get("q", "")
+                with state.lock:
+                    state.counts["search"] += 1
+                organic = [
+                    {"title": f"{query} - sonuç {i}", "link": f"http://{self.headers['Host']}/karar/{i}", "snippet": query, "position": i}
+                    for i in range(1, 6)
+                ]
+                self._send(200, json.dumps({"searchParameters": {"q": query}, "organic": organic}).encode("utf-8"),
+                           {"Content-Type": "application/json"})
+            finally:
+                self._leave()
+
+        def do_GET(self):
+            self._enter()
+            try:
+                number = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+                body = state.page(number)
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                last_modified = formatdate(1700000000 + state.versions.get(number, 1) * 3600, usegmt=True)
+                headers = {"ETag": etag, "Last-Modified": last_modified}
+                if self.headers.get("If-None-Match") == etag:
+                    with state.lock:
+                        state.counts["page_304"] += 1
+                    self._send(304, b"", headers)
+                    return
+                with state.lock:
+                    state.counts["page_200"] += 1
+                self._send(200, body, {**headers, "Content-Type": "text/html; charset=utf-8"})
+            finally:
+                self._leave()
+
+    return Handler
+
+
+def run_analysis(base_url: str, queries: List[str], page_urls: List[str]) -> List[str]:
+    # Her analiz, ekibin yaptığı gibi araçları yeniden kurar.
+    from tools.web_tools import ScrapeWebsiteTool, SerperDevTool
+
+    search_tool = SerperDevTool(base_url=base_url, n_results=5, search_type="search")
+    scrape_tool = ScrapeWebsiteTool()
+    outputs = [json.dumps(search_tool.run(search_query=query), ensure_ascii=False, sort_keys=True) for query in queries]
+    outputs.extend(scrape_tool.run(website_url=url) for url in page_urls)
+    return outputs
+
+
+def run_phase(name: str, state: StandInState, base_url: str, queries: List[str], page_urls: List[str], analyses: int, concurrency: int) -> Dict[str, Any]:
+    from tools.web_cache import web_fetcher
+
+    with state.lock:
+        before = dict(state.counts)
+    outcomes_before = web_fetcher.stats()["outcomes"]
+    latencies, outputs = [], []
+
+    def _timed_analysis(index: int):
+        # Analizler aynı sorguları farklı yazımlarla (normalize anahtar), aynı sayfaları farklı
+        # sırayla ister; böylece farklı sayfaların okumaları eşzamanlılık sınırına takılır.
+        variant = [query.upper() if index % 2 else f"  {query} " for query in queries]
+        shift = index % len(page_urls)
+        started = time.perf_counter()
+        result = run_analysis(base_url, variant, page_urls[shift:] + page_urls[:shift])
+        latencies.append(time.perf_counter() - started)
+        return sorted(result[len(queries):])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outputs = list(pool.map(_timed_analysis, range(analyses)))
+    elapsed = time.perf_counter() - started
+
+    with state.lock:
+        upstream = {key: state.counts[key] - before[key] for key in state.counts}
+    outcomes = web_fetcher.stats()["outcomes"]
+    delta = {
+        kind: {outcome: count - outcomes_before[kind].get(outcome, 0) for outcome, count in values.items() if count - outcomes_before[kind].get(outcome, 0)}
+        for kind, values in outcomes.items()
+    }
+    return {
+        "phase": name,
+        "elapsed_seconds": round(elapsed, 3),
+        "analysis_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "analysis_max_ms": round(max(latencies) * 1000, 2),
+        "upstream_requests": upstream,
+        "cache_outcomes": delta,
+        "consistent_page_texts": all(output == outputs[0] for output in outputs),
+        "_outputs": outputs[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Web arama / sayfa önbelleğinin yerel HTTP sunucusuyla ölçümü")
+    parser.add_argument("--analyses", type=int, default=20, help="Aşama başına analiz (araç demeti) sayısı")
+    parser.add_argument("--concurrency", type=int, default=8, help="Eş zamanlı analiz sayısı")
+    parser.add_argument("--queries", type=int, default=3, help="Analiz başına web araması")
+    parser.add_argument("--pages", type=int, default=10, help="Analiz başına okunan sayfa")
+    parser.add_argument("--changed-pages", type=int, default=3, help="changed aşamasında sunucuda değişen sayfa sayısı")
+    parser.add_argument("--latency", type=float, default=0.05, help="Sunucunun yapay yanıt gecikmesi (sn)")
+    parser.add_argument("--fetch-concurrency", type=int, default=4, help="WEB_FETCH_CONCURRENCY")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="web-cache-benchmark-")
+    os.environ["WEB_CACHE_DIR"] = cache_dir
+    os.environ["WEB_FETCH_CONCURRENCY"] = str(args.fetch_concurrency)
+    from tools.web_cache import WebCache, web_fetcher
+    from tools.web_tools import ScrapeWebsiteTool, SerperDevTool  # crewai_tools importu ölçüme girmesin
+
+    state = StandInState(args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    queries = SYNTHETIC_SENTENCES[:args.queries]
+    page_urls = [f"{base_url}/karar/{number}" for number in range(1, args.pages + 1)]
+
+    phases = [run_phase("cold", state, base_url, queries, page_urls, args.analyses, args.concurrency)]
+    phases.append(run_phase("warm", state, base_url, queries, page_urls, args.analyses, args.concurrency))
+
+    # Tazelik süresi dolmuş gibi: süreç içi katman boşaltılır ve kayıtlar diskten (yeniden
+    # başlatılmış bir süreçteki gibi) sıfır tazelik süresiyle okunur.
+    web_fetcher.cache = WebCache(directory=cache_dir)
+    web_fetcher.page_ttl = 0
+    phases.append(run_phase("revalidate", state, base_url, queries, page_urls, args.analyses, args.concurrency))
+
+    for number in range(1, args.changed_pages + 1):
+        state.versions[number] = 2
+    phases.append(run_phase("changed", state, base_url, queries, page_urls, args.analyses, args.concurrency))
+    server.shutdown()
+
+    warm_matches_cold = phases[1]["_outputs"] == phases[0]["_outputs"]
+    changed_seen = sum("(sürüm 2)" in text for text in phases[3]["_outputs"])
+    for phase in phases:
+        phase.pop("_outputs")
+    summary = {
+        "config": vars(args),
+        "phases": phases,
+        "warm_matches_cold": warm_matches_cold,
+        "changed_pages_seen": changed_seen,
+        "server_max_concurrent_requests": state.max_active,
+        "server_tcp_connections": state.connections,
+        "fetcher": web_fetcher.stats(),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
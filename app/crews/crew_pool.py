@@ -0,0 +1,201 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.rate_limit import BATCH, current_priority
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", os.getenv("ANALYSIS_WORKERS", 2)))
+RESERVED_INTERACTIVE = int(os.getenv("CREW_POOL_RESERVED_INTERACTIVE", 1))
+
+
+class CrewPoolExhaustedError(Exception):
+    pass
+
+
+class CrewBundle:
+    # Tek bir analiz isteğinin kullandığı ekiplerin tamamı. crewai Crew/Task nesneleri kickoff
+    # sırasında girdileri görev açıklamalarına yazar, görev çıktılarını ve araç önbelleğini
+    # üzerinde tutar; bu yüzden bir demet aynı anda yalnızca bir istek tarafından kullanılır.
+    def __init__(self, input_processor, analysis_processor, feedback_processor, feedback):
+        self.input_processor = input_processor
+        self.analysis_processor = analysis_processor
+        self.feedback_processor = feedback_processor
+        self.feedback = feedback
+        self.uses = 0
+        self.created_at = time.time()
+
+
+def build_crew_bundle(max_iterations: int) -> CrewBundle:
+    from crews.legal_input_processing_crew import LegalInputProcessingCrew
+    from crews.legal_analysis_crew import LegalAnalysisProcessingCrew
+    from crews.legal_feedback_crew import LegalFeedbackCrew
+    from crews.feedback import Feedback
+
+    input_processor = LegalInputProcessingCrew().crew()
+    legal_analysis_crew = LegalAnalysisProcessingCrew()
+    analysis_processor = legal_analysis_crew.crew()
+    feedback_processor = LegalFeedbackCrew().crew()
+    feedback = Feedback(
+        analysis_processor,
+        feedback_processor,
+        max_iterations,
+        partial_search_builder=legal_analysis_crew.partial_crew,
+    )
+    return CrewBundle(input_processor, analysis_processor, feedback_processor, feedback)
+
+
+class CrewPool:
+    # İsteklere yalıtılmış ekip demetleri dağıtır. size kadar demet önceden kurulur, gerekirse
+    # max_size'a kadar büyür; havuz doluysa acquire_timeout kadar boşalan bir demet beklenir.
+    # Hata ile biten isteğin demeti yarım kalmış durum taşıyabileceği için havuza geri konmaz,
+    # max_uses kullanıma ulaşan demetler de (araç önbelleği vb. birikmesin diye) yenilenir.
+    # Toplu analiz vakaları ("batch" önceliği) en fazla max_size - reserved_interactive demet
+    # kullanır; kalan demetler etkileşimli isteklere ayrılır ki gece çalışan bir toplu iş
+    # /api/analyze, /stream ve /jobs isteklerini havuz kapısında bekletmesin. Demet bekleyen
+    # etkileşimli bir istek varken boşalan demet toplu vakaya verilmez (LLMScheduler'daki öncelik
+    # sırası demet dağıtımında da uygulanır).
+    def __init__(
+        self,
+        factory: Callable[[], CrewBundle],
+        size: int = DEFAULT_POOL_SIZE,
+        max_size: Optional[int] = int(os.getenv("CREW_POOL_MAX_SIZE", 0)) or None,
+        acquire_timeout: float = float(os.getenv("CREW_POOL_ACQUIRE_TIMEOUT", 300)),
+        max_uses: int = int(os.getenv("CREW_POOL_MAX_USES", 50)),
+        reserved_interactive: int = RESERVED_INTERACTIVE,
+    ):
+        self.factory = factory
+        self.size = max(1, size)
+        self.reserved_interactive = max(0, reserved_interactive)
+        # Ayrılan demetlere ek olarak toplu vakalara en az bir demet kalacak kadar büyünebilir.
+        self.max_size = max(self.size, max_size or self.size, self.reserved_interactive + 1)
+        self.batch_slots = self.max_size - self.reserved_interactive
+        self.acquire_timeout = acquire_timeout
+        self.max_uses = max_uses
+
+        self._idle: List[CrewBundle] = []
+        self._created = 0
+        self._in_use = 0
+        self._batch_in_use = 0
+        self._interactive_waiting = 0
+        self._built = 0
+        self._discarded = 0
+        self._waits = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+    def prefill(self) -> None:
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            bundle = self._build()
+            with self._available:
+                self._idle.append(bundle)
+                self._available.notify()
+
+    def _build(self) -> CrewBundle:
+        started = time.perf_counter()
+        try:
+            bundle = self.factory()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify_all()
+            raise
+        with self._lock:
+            self._built += 1
+        logger.info(f"[CREW_POOL] Yeni ekip demeti kuruldu ({time.perf_counter() - started:.2f} sn, toplam: {self._created}).")
+        return bundle
+
+    def _checkout(self, batch: bool) -> CrewBundle:
+        deadline = time.monotonic() + self.acquire_timeout
+        waited = False
+        with self._available:
+            try:
+                while True:
+                    # Bekleyen etkileşimli istek varken toplu vakalar boşalan demeti almaz, önce onlar çalışır.
+                    if not batch or (self._batch_in_use < self.batch_slots and not self._interactive_waiting):
+                        if self._idle:
+                            self._batch_in_use += batch
+                            return self._idle.pop()
+                        if self._created < self.max_size:
+                            self._created += 1
+                            self._batch_in_use += batch
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise CrewPoolExhaustedError(f"{self.acquire_timeout:.0f} sn içinde boşta ekip bulunamadı.")
+                    if not waited:
+                        self._waits += 1
+                        self._interactive_waiting += not batch
+                        waited = True
+                    self._available.wait(remaining)
+            finally:
+                if waited and not batch:
+                    self._interactive_waiting -= 1
+                    self._available.notify_all()
+        # Kurulum uzun sürebilir; kilit dışında yapılır ki diğer istekler boşalan demetleri alabilsin.
+        try:
+            return self._build()
+        except Exception:
+            with self._available:
+                self._batch_in_use -= batch
+            raise
+
+    def _checkin(self, bundle: CrewBundle, failed: bool, batch: bool) -> None:
+        bundle.uses += 1
+        discard = failed or (self.max_uses and bundle.uses >= self.max_uses)
+        with self._available:
+            self._in_use -= 1
+            self._batch_in_use -= batch
+            if discard:
+                self._created -= 1
+                self._discarded += 1
+            else:
+                self._idle.append(bundle)
+            # Bekleyen bir istek ya boşalan demeti alır ya da açılan yere yenisini kurar. Bekleyenlerin
+            # bir kısmı toplu vaka sınırına takılı olabileceğinden hepsi uyandırılır.
+            self._available.notify_all()
+        if discard:
+            reason = "hata" if failed else f"{bundle.uses} kullanım"
+            logger.info(f"[CREW_POOL] Ekip demeti havuzdan çıkarıldı ({reason}); gerektiğinde yenisi kurulacak.")
+
+    @contextmanager
+    def acquire(self) -> Iterator[CrewBundle]:
+        batch = current_priority() == BATCH
+        bundle = self._checkout(batch)
+        with self._lock:
+            self._in_use += 1
+        failed = False
+        try:
+            yield bundle
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._checkin(bundle, failed, batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'batch_in_use': self._batch_in_use,
+                'batch_slots': self.batch_slots,
+                'interactive_waiting': self._interactive_waiting,
+                'reserved_interactive': self.reserved_interactive,
+                'idle': len(self._idle),
+                'built_total': self._built,
+                'discarded_total': self._discarded,
+                'waits_total': self._waits,
+                'max_uses': self.max_uses,
+            }
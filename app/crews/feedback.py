@@ -1,28 +1,136 @@
+import os
+import re
 import json
+import time
+import logging
 from traceback import format_exc
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 from litellm.exceptions import RateLimitError
+from utils.progress import emit_progress
+from utils.rate_limit import openai_rate_limit
+from utils.context_budget import context_budget as default_context_budget
+from utils.metrics import FEEDBACK_ITERATION_SECONDS, FEEDBACK_ITERATIONS, kickoff_with_metrics
+from crews.legal_analysis_crew import RAG_BRANCH, WEB_BRANCH, VALIDATION_STEP
+
+FULL_ANALYSIS_STEPS = [RAG_BRANCH, WEB_BRANCH, VALIDATION_STEP]
+
+logger = logging.getLogger(__name__)
+
+# Geri bildirim ajanı hedef_dallar alanını vermediğinde hangi dalın hedeflendiğini anlamak için
+# kullanılan ipuçları; öneri listelerinin öğelerinde tam kelime olarak aranır.
+BRANCH_KEYWORDS = {
+    RAG_BRANCH: ['emsal', 'içtihat', 'yargıtay', 'danıştay', 'anayasa mahkemesi', 'karar', 'rag', 'veritabanı', 'precedent'],
+    WEB_BRANCH: ['güncel', 'web', 'değişiklik', 'şablon', 'dilekçe', 'formül', 'hesaplama', 'oran', 'başvuru', 'belge', 'süre', 'maliyet'],
+}
+_BRANCH_PATTERNS = {
+    branch: re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in keywords) + r")\b")
+    for branch, keywords in BRANCH_KEYWORDS.items()
+}
+HINT_FIELDS = ("kritik_eksikler", "iyileştirme_önerileri", "ek_araştırma_önerileri")
+
+
+def _hint_items(value):
+    # Öneri alanları liste, sözlük listesi ({"alan": ..., "öneri": ...}) ya da düz metin olabilir.
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _hint_items(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _hint_items(item)
+    elif value:
+        yield str(value).lower().replace("i\u0307", "i")
+
 
 class Feedback():
-    def __init__(self, search_processor, causal_processor, max_iterations):
+    def __init__(self, search_processor, causal_processor, max_iterations, partial_search_builder=None, min_confidence_delta=None, context_budget=None):
           self.search_processor = search_processor 
           self.causal_processor = causal_processor
           self.max_iterations = max_iterations
+          self.partial_search_builder = partial_search_builder
+          self.min_confidence_delta = (
+              min_confidence_delta if min_confidence_delta is not None
+              else float(os.getenv("FEEDBACK_MIN_CONFIDENCE_DELTA", 0.02))
+          )
+          # Ekipler arası aktarılan metinler her iterasyonda büyümesin diye token bütçesine sığdırılır.
+          self.context_budget = context_budget or default_context_budget
     
+    # Çağrılar LLMScheduler ile kotaya göre aralıklandırıldığından 429 istisnadır; alınırsa asıl
+    # bekleme ortak kapıda (Retry-After) yapılır, buradaki geri çekilme kısa tutulur.
     @retry(
-        wait=wait_exponential(multiplier=1, min=4, max=60),
+        wait=wait_exponential(multiplier=1, min=1, max=8),
         stop=stop_after_attempt(5),
         retry=retry_if_exception_type(RateLimitError)
     )
     def _execute_with_retry(self, processor, inputs):
-        return processor.kickoff(inputs=inputs)
+        # Tekrar, süreç genelindeki hız sınırı beklemesi bitmeden başlamaz (bkz. utils/rate_limit.py).
+        openai_rate_limit.wait()
+        return kickoff_with_metrics(processor, inputs)
     
+    def _target_branches(self, causal_data_dict):
+        # Öncelik geri bildirim ajanının açıkça verdiği hedef_dallar alanındadır.
+        declared = causal_data_dict.get("hedef_dallar")
+        if isinstance(declared, str):
+            declared = [declared]
+        if isinstance(declared, list):
+            targeted = [branch for branch in (RAG_BRANCH, WEB_BRANCH) if branch in {str(item).strip().lower() for item in declared}]
+            if targeted:
+                return targeted
+
+        hints = [item for field in HINT_FIELDS for item in _hint_items(causal_data_dict.get(field))]
+        targeted = [
+            branch for branch, pattern in _BRANCH_PATTERNS.items()
+            if any(pattern.search(item) for item in hints)
+        ]
+        # Tek bir dal net olarak hedeflenmediyse tam analiz tekrarlanır.
+        if len(targeted) != 1:
+            return [RAG_BRANCH, WEB_BRANCH]
+        return targeted
+
+    def _extract_confidence(self, causal_data_dict):
+        quality = causal_data_dict.get("kalite_değerlendirmesi")
+        if isinstance(quality, dict):
+            try:
+                return float(quality.get("genel_kalite_skoru"))
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def _total_tokens(self, crew_output):
+        usage = crew_output.get("token_usage") if isinstance(crew_output, dict) else None
+        if isinstance(usage, dict):
+            return usage.get("total_tokens", 0) or 0
+        return 0
+
+    def _merge_search_data(self, search_data, steps, previous_outputs):
+        task_outputs = search_data.get("tasks_output") or []
+        for step, task_output in zip(steps, task_outputs):
+            # Süresi dolan dalın yer tutucusu, önceki iterasyondaki gerçek çıktının yerine geçmez.
+            if isinstance(task_output, dict) and task_output.get("timed_out") and step in previous_outputs:
+                continue
+            previous_outputs[step] = task_output
+
+        merged = dict(search_data)
+        merged["tasks_output"] = [previous_outputs[step] for step in FULL_ANALYSIS_STEPS if step in previous_outputs]
+        return merged
+
+    def _reused_branch_context(self, branches, previous_outputs):
+        reused = []
+        for step in (RAG_BRANCH, WEB_BRANCH):
+            if step not in branches and step in previous_outputs:
+                raw = self.context_budget.compact_reused_branch(previous_outputs[step].get('raw', ''))
+                reused.append(f"Önceki iterasyondaki {step} çıktısı (değişmedi):\n{raw}")
+        return "\n\n".join(reused)
+
     def process_feedback(self, processed_data, confidence_threshold):   
         feedback_suggestions = ""
         current_iteration = 0
         needs_reanalysis = True
         search_data = "Hata"
         causal_data_dict = {}
+        branches = [RAG_BRANCH, WEB_BRANCH]
+        previous_outputs = {}
+        previous_confidence = None
+        iteration_stats = []
         
         original_text = ""
         if isinstance(processed_data, dict) and "analiz_için_hazir_metin" in processed_data:
@@ -38,24 +146,42 @@ class Feedback():
 
         while current_iteration < self.max_iterations:
             print(f"\n= Analiz Döngüsü: {current_iteration + 1} =")
+            iteration_started = time.perf_counter()
             
             try:
+                partial = self.partial_search_builder is not None and len(branches) < 2 and bool(previous_outputs)
+                search_feedback = feedback_suggestions
+                if partial:
+                    reused_context = self._reused_branch_context(branches, previous_outputs)
+                    search_feedback = f"{feedback_suggestions}\n\n{reused_context}" if reused_context else feedback_suggestions
+                    logger.info(f"[FEEDBACK] Yalnızca hedeflenen dallar yeniden çalıştırılıyor: {branches}")
+
                 search_inputs = {
                     'topic': original_text if original_text else processed_data,
                     'confidence_threshold': confidence_threshold,
-                    'feedback': feedback_suggestions 
+                    'feedback': search_feedback 
                 }
 
-                search_data = self._execute_with_retry(self.search_processor, search_inputs)
+                if partial:
+                    search_processor = self.partial_search_builder(branches)
+                    steps = branches + [VALIDATION_STEP]
+                else:
+                    search_processor = self.search_processor
+                    steps = FULL_ANALYSIS_STEPS
+
+                search_data = self._execute_with_retry(search_processor, search_inputs)
 
                 if hasattr(search_data, "model_dump"):
                     search_data = search_data.model_dump()
+
+                if isinstance(search_data, dict):
+                    search_data = self._merge_search_data(search_data, steps, previous_outputs)
                 
                 causal_data = self._execute_with_retry(
                     self.causal_processor, 
                     {
                         'topic': original_text if original_text else processed_data,
-                        'feedback': search_data,
+                        'feedback': self.context_budget.compact_search_output(search_data),
                         'confidence_threshold': confidence_threshold
                     }
                 )
@@ -97,14 +223,49 @@ class Feedback():
                             feedback_suggestions += f" Kritik eksikler: {kritik_eksikler}"
                         else:
                             feedback_suggestions = f"Kritik eksikler: {kritik_eksikler}"
+                feedback_suggestions = self.context_budget.compact_suggestions(str(feedback_suggestions))
                     
+                confidence = self._extract_confidence(causal_data_dict)
+                stats = {
+                    "iteration": current_iteration + 1,
+                    "rerun_steps": steps,
+                    "seconds": round(time.perf_counter() - iteration_started, 2),
+                    "tokens": self._total_tokens(search_data) + self._total_tokens(causal_data_dict),
+                    "confidence": confidence,
+                }
+                iteration_stats.append(stats)
+                FEEDBACK_ITERATION_SECONDS.labels(mode="partial" if partial else "full").observe(stats["seconds"])
+                if isinstance(search_data, dict):
+                    search_data["iteration_stats"] = iteration_stats
+
+                emit_progress("feedback_iteration", {
+                    "iteration": current_iteration + 1,
+                    "max_iterations": self.max_iterations,
+                    "needs_reanalysis": needs_reanalysis,
+                    "feedback_suggestions": feedback_suggestions,
+                    "cost": stats,
+                })
+
                 print(f"\nİterasyon {current_iteration + 1} Sonuçları:")
                 print(f"needs_reanalysis: {needs_reanalysis} (tip: {type(needs_reanalysis)})")
                 print(f"feedback_suggestions: {feedback_suggestions}")
+                logger.info(f"[FEEDBACK] İterasyon maliyeti: {stats['seconds']} sn, {stats['tokens']} token, güven: {confidence}")
                 
                 if not needs_reanalysis:
                     print(f"\n= İterasyon Başarılı! Analiz tamamlandı. =")
+                    FEEDBACK_ITERATIONS.observe(current_iteration + 1)
                     return search_data
+
+                if (
+                    confidence is not None and previous_confidence is not None
+                    and abs(confidence - previous_confidence) < self.min_confidence_delta
+                ):
+                    logger.info(f"[FEEDBACK] Güven skoru değişimi ({previous_confidence} -> {confidence}) eşiğin altında. Erken sonlandırılıyor.")
+                    FEEDBACK_ITERATIONS.observe(current_iteration + 1)
+                    return search_data
+                previous_confidence = confidence
+
+                branches = self._target_branches(causal_data_dict)
                 
                 print(f"\n= Yetersiz Tanı Güveni. Feedback ile Yeniden Analiz Başlatılıyor =")
                 print(f"İterasyon: {current_iteration + 1}/{self.max_iterations}")
@@ -121,4 +282,5 @@ class Feedback():
             print(f"Final needs_reanalysis: {needs_reanalysis}")
             print(f"Final iteration: {current_iteration}/{self.max_iterations}")
         
+        FEEDBACK_ITERATIONS.observe(current_iteration)
         return search_data
\ No newline at end of file
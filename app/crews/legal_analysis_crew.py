@@ -1,16 +1,116 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase
 import sys
 import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from llms import _create_gpt
+from utils.progress import emit_progress, emit_task_output
 from tools.qdrant_vector_search_tool import QdrantLegalSearchTool
-from crewai_tools import SerperDevTool, WebsiteSearchTool, ScrapeWebsiteTool
+from tools.web_tools import LazyTool, SerperDevTool, WebsiteSearchTool, ScrapeWebsiteTool
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# RAG ve web dalları kendi iş parçacığı havuzumuzda paralel çalışır ve en fazla bu kadar
+# beklenir. Süreyi aşan dal (ör. asılı kalan scrape) beklenmez; doğrulamaya onun yerine bir
+# yer tutucu verilir, biten dalın sonucu korunur. Agent.max_execution_time bunu sağlamaz:
+# kendi havuzunu kapatırken asılı iş parçacığını bekler ve tüm kickoff'u hatayla bitirir.
+BRANCH_TIMEOUT_SECONDS = int(os.getenv("ANALYSIS_BRANCH_TIMEOUT", 240))
+# Süresi dolan dallar arka planda bitene kadar bir işçi tutar; havuz bu yüzden dal sayısından geniştir.
+_branch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ANALYSIS_BRANCH_WORKERS", 8)),
+    thread_name_prefix="analysis-branch",
+)
+
+RAG_BRANCH = "rag"
+WEB_BRANCH = "web"
+VALIDATION_STEP = "validation"
+
+BRANCH_TASKS = {
+    RAG_BRANCH: "case_law_rag_analysis_task",
+    WEB_BRANCH: "legal_web_search_task",
+}
+BRANCH_OUTPUTS_SECTION = "\n\nParalel çalışan analiz dallarının çıktıları:\n{branch_outputs}"
+
+
+def _timed_out_output(branch: str, timeout: float) -> Dict[str, Any]:
+    return {
+        "name": BRANCH_TASKS[branch],
+        "raw": f"Bu dal {timeout:.0f} sn içinde tamamlanamadı; daldan sonuç alınamadı.",
+        "timed_out": True,
+    }
+
+
+def _sum_token_usage(outputs) -> Dict[str, int]:
+    total: Dict[str, int] = {}
+    for output in outputs:
+        usage = getattr(output, "token_usage", None)
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else usage
+        for key, value in (usage or {}).items():
+            if isinstance(value, (int, float)):
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+class BranchedAnalysis:
+    # Feedback döngüsünün Crew yerine kullandığı çalıştırıcı: her dal ayrı bir tek görevli ekiple
+    # _branch_executor'da çalışır, wait(timeout) ile beklenir, ardından doğrulama ekibi dalların
+    # çıktılarıyla çalıştırılır. Her kickoff ajan / görev nesnelerini yeniden kurar; böylece arka
+    # planda süren bir dal sonraki iterasyonun nesnelerine dokunmaz.
+    def __init__(self, owner: "LegalAnalysisProcessingCrew", branches, timeout: Optional[float] = None):
+        self.owner = owner
+        self.branches = [branch for branch in (RAG_BRANCH, WEB_BRANCH) if branch in branches]
+        self.timeout = BRANCH_TIMEOUT_SECONDS if timeout is None else timeout
+        self.name = "Legal Analysis Crew" if len(self.branches) == 2 else "Legal Analysis Crew (partial)"
+        self.tasks = []
+
+    def kickoff(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        branch_crews = {branch: self.owner.branch_crew(branch) for branch in self.branches}
+        futures = {
+            branch: _branch_executor.submit(contextvars.copy_context().run, crew.kickoff, inputs=dict(inputs))
+            for branch, crew in branch_crews.items()
+        }
+        done, _ = wait(futures.values(), timeout=self.timeout)
+
+        branch_outputs, tasks_output, timed_out = [], [], []
+        for branch, future in futures.items():
+            if future in done:
+                # Dalın kendi hatası (ör. RateLimitError) önceki gibi kickoff'u bitirir; yeniden deneme üst katmandadır.
+                output = future.result()
+                branch_outputs.append(output)
+                tasks_output.extend(task_output.model_dump() for task_output in output.tasks_output)
+            else:
+                timed_out.append(branch)
+                tasks_output.append(_timed_out_output(branch, self.timeout))
+                logger.warning(f"[ANALYSIS] {branch} dalı {self.timeout:.0f} sn içinde bitmedi; diğer dalın sonucuyla devam ediliyor.")
+                emit_progress("branch_timeout", {"branch": branch, "timeout_seconds": self.timeout})
+
+        branch_text = "\n\n".join(
+            f"### {task_output['name']}\n{task_output['raw']}" for task_output in tasks_output
+        )
+        validation_crew = self.owner.validation_crew()
+        validation_output = validation_crew.kickoff(inputs={**inputs, "branch_outputs": branch_text})
+        tasks_output.extend(task_output.model_dump() for task_output in validation_output.tasks_output)
+
+        self.tasks = [
+            task for branch, crew in branch_crews.items() if branch not in timed_out for task in crew.tasks
+        ] + list(validation_crew.tasks)
+        return {
+            "raw": validation_output.raw,
+            "json_dict": validation_output.json_dict,
+            "tasks_output": tasks_output,
+            "token_usage": _sum_token_usage(branch_outputs + [validation_output]),
+            "timed_out_branches": timed_out,
+        }
+
+
 @CrewBase
 class LegalAnalysisProcessingCrew:
     agents_config = '../config/agents.yaml'
@@ -24,75 +124,74 @@ class LegalAnalysisProcessingCrew:
             n_results=5,
             search_type="search",
         )
-        self.website_tool = WebsiteSearchTool()
-        self.scrape_tool = ScrapeWebsiteTool()
-        self.llm = _create_gpt()
+        # Site içi arama ve sayfa okuma araçları ajan onları ilk kullandığında kurulur.
+        self.website_tool = LazyTool.of(WebsiteSearchTool)
+        self.scrape_tool = LazyTool.of(ScrapeWebsiteTool)
 
-    @agent
     def _case_law_rag_analyzer_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["case_law_rag_analyzer"],
-            llm=self.llm,
+            llm=_create_gpt(cache=self.tasks_config["case_law_rag_analysis_task"].get("llm_cache", False), task_name="case_law_rag_analysis_task"),
             verbose=True,
             tools=[QdrantLegalSearchTool()]
         )
     
-    @agent
     def _legal_precedent_web_scanner_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["legal_precedent_web_scanner"],
-            llm=self.llm,
+            llm=_create_gpt(cache=self.tasks_config["legal_web_search_task"].get("llm_cache", False), task_name="legal_web_search_task"),
             verbose=True,
             tools=[self.serper_tool, self.website_tool, self.scrape_tool]
         )
     
-    @agent
     def _contradiction_detector_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["contradiction_detector"],
-            llm=self.llm,
+            llm=_create_gpt(cache=self.tasks_config["legal_validation_task"].get("llm_cache", False), task_name="legal_validation_task"),
             verbose=True,
             tools=[]
         )
-    
-    @task
-    def _analyze_case_law_rag(self) -> Task:
-        return Task(
-            config=self.tasks_config["case_law_rag_analysis_task"],
-            agent=self._case_law_rag_analyzer_agent(),
-        )
-    
-    @task
-    def _search_legal_web_sources(self) -> Task:           
-        return Task(
-            config=self.tasks_config["legal_web_search_task"],
-            agent=self._legal_precedent_web_scanner_agent(),
-        )
 
-    @task
-    def _validate_legal_findings(self) -> Task:
-        validation_task = Task(
-            config=self.tasks_config["legal_validation_task"],
-            agent=self._contradiction_detector_agent(),
-            context=[
-                self._analyze_case_law_rag(),
-                self._search_legal_web_sources()
-            ],
+    def branch_crew(self, branch) -> Crew:
+        if branch == RAG_BRANCH:
+            branch_agent = self._case_law_rag_analyzer_agent()
+        else:
+            branch_agent = self._legal_precedent_web_scanner_agent()
+        branch_task = Task(config=self.tasks_config[BRANCH_TASKS[branch]], agent=branch_agent)
+        return Crew(
+            agents=[branch_agent],
+            tasks=[branch_task],
+            name=f"Legal Analysis Crew ({branch})",
+            process=Process.sequential,
+            verbose=True,
+            memory=False,
+            task_callback=emit_task_output,
+            cache=True,
         )
-        
-        if hasattr(self, 'topic') and self.topic:
+
+    def validation_crew(self) -> Crew:
+        # Dal çıktıları görev bağlamı (context) yerine {branch_outputs} girdisiyle verilir; böylece
+        # süresi dolan dalın yerine yer tutucu konabilir.
+        config = dict(self.tasks_config["legal_validation_task"])
+        config["description"] = config["description"] + BRANCH_OUTPUTS_SECTION
+        validation_agent = self._contradiction_detector_agent()
+        validation_task = Task(config=config, agent=validation_agent)
+        if self.topic:
             validation_task.context_kwargs = {"topic": self.topic}
-        
-        return validation_task
-    
-    @crew
-    def crew(self) -> Crew:
         return Crew(
-            agents=self.agents,
-            tasks=self.tasks,
-            name="Legal Analysis Crew",
+            agents=[validation_agent],
+            tasks=[validation_task],
+            name="Legal Analysis Crew (validation)",
             process=Process.sequential,
             verbose=True,
             memory=False,
+            task_callback=emit_task_output,
             cache=True,
-        )
\ No newline at end of file
+        )
+
+    def partial_crew(self, branches) -> BranchedAnalysis:
+        # Geri bildirim yalnızca bir dalı hedeflediğinde sadece o dal ve doğrulama yeniden çalıştırılır.
+        return BranchedAnalysis(self, branches)
+
+    def crew(self) -> BranchedAnalysis:
+        return BranchedAnalysis(self, [RAG_BRANCH, WEB_BRANCH])
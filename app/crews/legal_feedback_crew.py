@@ -4,6 +4,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from llms import _create_gpt
+from utils.progress import emit_task_output
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,13 +16,12 @@ class LegalFeedbackCrew:
     
     def __init__(self):
         self.topic = None 
-        self.llm = _create_gpt()
 
     @agent
     def _adaptive_legal_optimizer_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["adaptive_legal_optimizer"],
-            llm=self.llm,
+            llm=_create_gpt(cache=self.tasks_config["legal_feedback_task"].get("llm_cache", False), task_name="legal_feedback_task"),
             verbose=True,
             tools=[]
         )
@@ -45,5 +45,6 @@ class LegalFeedbackCrew:
             tasks=self.tasks,
             name="Legal Feedback Crew",
             process=Process.sequential,
-            verbose=True
+            verbose=True,
+            task_callback=emit_task_output,
         )
\ No newline at end of file
@@ -4,20 +4,18 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from llms import _create_gpt
+from utils.progress import emit_task_output
 
 @CrewBase
 class LegalInputProcessingCrew:
     agents_config = '../config/agents.yaml'
     tasks_config = '../config/tasks.yaml'
     
-    def __init__(self):
-        self.llm = _create_gpt()
-        
     @agent
     def _legal_text_clarifier_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['legal_text_clarifier'],
-            llm=self.llm,
+            llm=_create_gpt(cache=self.tasks_config["legal_text_clarifier"].get("llm_cache", False), task_name="legal_text_clarifier"),
             tools=[],
             verbose=True,
         )
@@ -36,8 +34,8 @@ class LegalInputProcessingCrew:
             tasks=self.tasks,
             name="Legal Input Processing Crew",
             process=Process.sequential,
-            max_rpm=10,
             verbose=True,
             memory=False,
+            task_callback=emit_task_output,
             cache=True,
         )
\ No newline at end of file
@@ -1,15 +1,52 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from crewai import LLM, BaseLLM
+
+from utils.llm_cache import LLM_MODEL, llm_call_layer
 
 
 load_dotenv()
 
-def _create_gpt():
+class SharedLLM(BaseLLM):
+    # CrewAI LLM'ini sarar; tüm çağrılar ortak llm_call_layer üzerinden geçer.
+    def __init__(self, llm: LLM, cache_enabled: bool = False, task_name: str = "unknown"):
+        super().__init__(model=llm.model, temperature=llm.temperature)
+        self._llm = llm
+        self.cache_enabled = cache_enabled
+        self.task_name = task_name
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        # Ajan yürütücüsü stop kelimelerini sarmalayıcıya yazar; asıl LLM'e aktarılır.
+        self._llm.stop = self.stop
+        tool_names = llm_call_layer.tool_names(tools, available_functions)
+        key = llm_call_layer.make_key(self.model, self.temperature, self.stop, messages, tool_names)
+        return llm_call_layer.call(
+            self.model,
+            key,
+            messages,
+            self.cache_enabled,
+            lambda: self._llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs),
+            task=self.task_name,
+        )
+
+    def supports_function_calling(self) -> bool:
+        return self._llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self._llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self._llm.get_context_window_size()
+
+def _create_gpt(cache: bool = False, task_name: str = "unknown"):
     api_key = os.getenv("OPENAI_API_KEY")
-    return ChatOpenAI(
-        model_name="gpt-4o-mini",
-        openai_api_key=api_key,
-        temperature=0.4,
-        request_timeout=60
+    return SharedLLM(
+        LLM(
+            model=LLM_MODEL,
+            api_key=api_key,
+            temperature=0.4,
+            timeout=60
+        ),
+        cache_enabled=cache,
+        task_name=task_name,
     )
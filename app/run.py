@@ -1,5 +1,5 @@
 import os
-from web_server import app
+from web_server import app, start_background_warmup
 from waitress import serve
 import logging
 
@@ -9,8 +9,12 @@ logger = logging.getLogger(__name__)
 if __name__ == '__main__':
     host = os.getenv('HOST', '0.0.0.0')
     port = int(os.getenv('PORT', 5000))
+    threads = int(os.getenv('WAITRESS_THREADS', 8))
     
     logger.info(f"Waitress üretim sunucusu başlatılıyor...")
     logger.info(f"Uygulama http://{host}:{port} adresinde hizmet verecek.")
+    logger.info(f"Waitress thread sayısı: {threads}, analiz worker sayısı: {os.getenv('ANALYSIS_WORKERS', 2)}")
     
-    serve(app, host=host, port=port, threads=2) 
\ No newline at end of file
+    # EAGER_WARMUP=true ise model, ekipler ve bağlantılar arka planda hazırlanır; /api/ready hazır olunca 200 döner.
+    start_background_warmup()
+    serve(app, host=host, port=port, threads=threads) 
\ No newline at end of file
@@ -0,0 +1,86 @@
+import re
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Türkçe büyük/küçük harf dönüşümü: str.lower() "I" -> "i", "İ" -> "i̇" üretir.
+_TURKISH_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+_TOKEN_PATTERN = re.compile(r"\d+(?:[./]\d+)*|[a-zçğıöşüâîû]+")
+# "madde 506", "md. 506", "m. 506", "506. maddesi" ve "506'ncı madde" -> "madde_506"; numara tek başına da eşleşir.
+_ARTICLE_PATTERN = re.compile(r"\b(?:madde\w*|md\.?|m\.)\s*(\d+)|\b(\d+)\s*(?:[.'’]\w*)?\s*madde")
+# Türkçe sondan eklemeli olduğu için kelimeler ilk 5 harfe kırpılır (F5 kök bulma); "kanunu",
+# "kanununa" -> "kanun". Kısaltmalar (tck, hmk, iik) ve sayılar zaten kısa/sayısal olduğundan aynen kalır.
+STEM_LENGTH = 5
+STOPWORDS = frozenset("""
+    acaba ama ancak bazı bana ben beni bu bunu bunun da daha de defa diye en gibi hem hep her
+    hiç için ile ise kez ki kim mı mi mu mü na ne neden nerede nasıl niye o olan olarak ona onu
+    onun sen siz şu şey tüm ve veya ya yani çok çünkü ayrıca göre kadar olup olduğu
+""".split())
+
+
+def _lower(text: str) -> str:
+    return text.translate(_TURKISH_LOWER).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    text = _lower(text or "")
+    tokens = [f"madde_{after or before}" for after, before in _ARTICLE_PATTERN.findall(text)]
+    for token in _TOKEN_PATTERN.findall(text):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token if token[0].isdigit() else token[:STEM_LENGTH])
+    return tokens
+
+
+class BM25Index:
+    # Chunk metinleri üzerinde ters indeks. Her terim için (satır, ağırlık) dizileri önceden
+    # hesaplanır; sorgu skoru yalnızca sorgu terimlerinin posting listelerinin toplamıdır.
+    # Ağırlık Lucene BM25 formülüdür: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)).
+    def __init__(self, texts: Sequence[str], k1: float = 1.2, b: float = 0.75):
+        self.size = len(texts)
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[row] = counts.get(row, 0) + 1
+
+        average_length = float(lengths.mean()) if self.size and lengths.mean() > 0 else 1.0
+        norms = k1 * (1 - b + b * lengths / average_length)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for token, counts in postings.items():
+            rows = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            idf = math.log(1 + (self.size - len(counts) + 0.5) / (len(counts) + 0.5))
+            self._postings[token] = (rows, (idf * tf * (k1 + 1) / (tf + norms[rows])).astype(np.float32))
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+        return scores
+
+    def search(self, query: str, limit: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        # rows verilirse yalnızca o satırlar (ör. payload filtresinden geçenler) sıralanır.
+        scores = self.scores(query)
+        if rows is not None:
+            candidates = rows[scores[rows] > 0]
+        else:
+            candidates = np.flatnonzero(scores > 0)
+        if not len(candidates) or limit <= 0:
+            return []
+        candidate_scores = scores[candidates]
+        k = min(limit, len(candidates))
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        top = top[np.argsort(-candidate_scores[top], kind="stable")]
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in top]
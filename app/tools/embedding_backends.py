@@ -0,0 +1,124 @@
+import os
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# torch: mevcut davranış (HuggingFaceEmbeddings, CUDA varsa GPU), referans vektörler bununla üretilir.
+# torch-int8: Linear katmanları dinamik int8 kuantize edilmiş PyTorch modeli (yalnızca CPU).
+# onnx: ONNX Runtime ile çalışan aynı model (CPU).
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx")
+DEFAULT_EMBEDDING_BACKEND = "torch"
+DEFAULT_ONNX_FILE = "onnx/model.onnx"
+
+
+def embedding_backend_name(backend: Optional[str] = None) -> str:
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", DEFAULT_EMBEDDING_BACKEND)).strip().lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Geçersiz EMBEDDING_BACKEND: '{backend}'. Seçenekler: {', '.join(EMBEDDING_BACKENDS)}")
+    return backend
+
+
+def embedding_cache_namespace(model_name: str, backend: Optional[str] = None) -> str:
+    # Farklı arka uçların vektörleri tolerans içinde olsa da bire bir aynı değildir; embedding
+    # önbelleği (bellek/Redis) arka uçlar arasında karışmasın diye varsayılan dışındakiler ayrılır.
+    backend = embedding_backend_name(backend)
+    return model_name if backend == DEFAULT_EMBEDDING_BACKEND else f"{model_name}@{backend}"
+
+
+class SentenceTransformerEmbeddings:
+    # HuggingFaceEmbeddings ile aynı arayüz (embed_documents / embed_query) ve aynı normalizasyon.
+    def __init__(self, model, batch_size: int = 32):
+        self.model = model
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _set_torch_threads(threads: int) -> None:
+    import torch
+    if threads > 0:
+        torch.set_num_threads(threads)
+    logger.info(f"PyTorch intra-op thread sayısı: {torch.get_num_threads()}")
+
+
+def _create_torch(model_name: str, threads: int):
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if device == 'cpu':
+        _set_torch_threads(threads)
+    logger.info(f"Embedding modeli için '{device}' cihazı kullanılacak. Bu işlem biraz zaman alabilir...")
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': device},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def _create_torch_int8(model_name: str, threads: int):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    _set_torch_threads(threads)
+    model = SentenceTransformer(model_name, device="cpu")
+    # Yalnızca Linear ağırlıkları int8'e çevrilir; aktivasyonlar çalışma anında kuantize edilir.
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return SentenceTransformerEmbeddings(model)
+
+
+def _create_onnx(model_name: str, threads: int, onnx_file: str):
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer
+
+    session_options = onnxruntime.SessionOptions()
+    if threads > 0:
+        session_options.intra_op_num_threads = threads
+    session_options.inter_op_num_threads = 1
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    logger.info(f"ONNX Runtime modeli yükleniyor: {onnx_file} (intra-op thread: {threads or 'varsayılan'})")
+    model = SentenceTransformer(
+        model_name,
+        device="cpu",
+        backend="onnx",
+        model_kwargs={
+            "file_name": onnx_file,
+            "provider": "CPUExecutionProvider",
+            "session_options": session_options,
+        },
+    )
+    return SentenceTransformerEmbeddings(model)
+
+
+def create_embeddings(
+    model_name: str,
+    backend: Optional[str] = None,
+    threads: Optional[int] = None,
+    onnx_file: Optional[str] = None,
+):
+    backend = embedding_backend_name(backend)
+    threads = int(os.getenv("EMBEDDING_THREADS", 0)) if threads is None else threads
+
+    if backend == "torch":
+        embeddings = _create_torch(model_name, threads)
+    elif backend == "torch-int8":
+        embeddings = _create_torch_int8(model_name, threads)
+    else:
+        embeddings = _create_onnx(model_name, threads, onnx_file or os.getenv("EMBEDDING_ONNX_FILE", DEFAULT_ONNX_FILE))
+
+    logger.info(f"Embedding arka ucu: {backend} ({model_name})")
+    return embeddings
@@ -0,0 +1,156 @@
+import os
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from array import array
+from typing import Dict, List
+
+from utils.lru_cache import LRUCache
+from utils.micro_batcher import MicroBatcher
+from utils.metrics import TOOL_CALL_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    # Global embedding modelinin önünde durur: normalize edilmiş sorguların vektörlerini
+    # LRU (isteğe bağlı olarak Redis) üzerinde saklar ve farklı isteklerden eş zamanlı gelen
+    # embed_query çağrılarını tek bir embed_documents çağrısında birleştirir.
+    REDIS_KEY_PREFIX = "emb"
+
+    def __init__(
+        self,
+        model,
+        model_name: str,
+        cache_size: int = int(os.getenv("EMBEDDING_CACHE_SIZE", 2048)),
+        use_redis: bool = os.getenv("EMBEDDING_CACHE_REDIS", "false").lower() == "true",
+        redis_ttl: int = int(os.getenv("EMBEDDING_CACHE_TTL", 86400)),
+        max_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 32)),
+        max_wait_ms: float = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5)),
+    ):
+        self.model = model
+        self.model_name = model_name
+        self.redis_ttl = redis_ttl
+        self._cache = LRUCache(maxsize=cache_size)
+        self._batcher = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="embedding-batcher",
+        )
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.use_redis = use_redis
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        with timed(TOOL_CALL_SECONDS, tool="embedding_model"):
+            return self.model.embed_documents(texts)
+
+    @property
+    def _redis(self):
+        if not self.use_redis:
+            return None
+        from utils.redis_client import create_redis_client
+        return create_redis_client(decode_responses=False)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def _cache_key(self, normalized_text: str) -> str:
+        digest = hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+        return f"{self.REDIS_KEY_PREFIX}:{self.model_name}:{digest}"
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        normalized = [self.normalize(text) for text in texts]
+        keys = [self._cache_key(text) for text in normalized]
+        vectors: Dict[str, List[float]] = {}
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, normalized):
+            if key in vectors or key in missing:
+                continue
+            cached = self._cache.get(key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                missing[key] = text
+
+        if missing and self._redis:
+            vectors.update(self._load_from_redis(list(missing)))
+            missing = {key: text for key, text in missing.items() if key not in vectors}
+
+        if missing:
+            vectors.update(self._compute(missing))
+
+        return [vectors[key] for key in keys]
+
+    def _compute(self, missing: Dict[str, str]) -> Dict[str, List[float]]:
+        # Aynı sorgu başka bir istek tarafından hesaplanıyorsa onun sonucu beklenir.
+        owned: Dict[str, Future] = {}
+        waiting: Dict[str, Future] = {}
+        with self._inflight_lock:
+            for key, text in missing.items():
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    owned[key] = self._batcher.submit(text)
+                    self._inflight[key] = owned[key]
+
+        computed: Dict[str, List[float]] = {}
+        try:
+            for key, future in owned.items():
+                computed[key] = list(future.result())
+                self._cache.set(key, computed[key])
+        finally:
+            with self._inflight_lock:
+                for key in owned:
+                    self._inflight.pop(key, None)
+
+        if self._redis and computed:
+            self._store_in_redis(computed)
+
+        for key, future in waiting.items():
+            computed[key] = list(future.result())
+        return computed
+
+    def _load_from_redis(self, keys: List[str]) -> Dict[str, List[float]]:
+        try:
+            raw_values = self._redis.mget(keys)
+        except Exception as e:
+            from utils.redis_client import report_redis_error
+            report_redis_error(e, decode_responses=False)
+            logger.warning(f"Embedding önbelleği Redis'ten okunamadı: {e}")
+            return {}
+
+        found = {}
+        for key, raw in zip(keys, raw_values):
+            if raw:
+                vector = array("f")
+                vector.frombytes(raw)
+                found[key] = vector.tolist()
+                self._cache.set(key, found[key])
+        return found
+
+    def _store_in_redis(self, vectors: Dict[str, List[float]]) -> None:
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, vector in vectors.items():
+                pipe.set(key, array("f", vector).tobytes(), ex=self.redis_ttl)
+            pipe.execute()
+        except Exception as e:
+            from utils.redis_client import report_redis_error
+            report_redis_error(e, decode_responses=False)
+            logger.warning(f"Embedding önbelleği Redis'e yazılamadı: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "cache": self._cache.stats(),
+            "batches": self._batcher.batches,
+            "batched_queries": self._batcher.items,
+            "redis": self._redis is not None,
+        }
@@ -0,0 +1,15 @@
+from typing import Dict, List
+
+# Hukuk alanı -> anahtar kelimeler. Arama aracı sorgudan alan çıkarırken, içe aktarma hattı
+# dokümanın ana_hukuk_alani alanını belirlerken kullanır; ikisinin aynı listeyi kullanması
+# filtre değerlerinin tutarlı kalmasını sağlar.
+LEGAL_AREA_KEYWORDS: Dict[str, List[str]] = {
+    'ticaret_hukuku': ['ticaret', 'şirket', 'anonim', 'limited', 'ortaklık', 'tacir', 'ttk'],
+    'medeni_hukuk': ['medeni', 'aile', 'miras', 'eşya', 'kişiler', 'mk', 'boşanma', 'velayet', 'tenkis'],
+    'ceza_hukuku': ['ceza', 'suç', 'mahkumiyet', 'beraat', 'sanık', 'tck', 'hapis', 'kaza'],
+    'idare_hukuku': ['idare', 'kamu', 'devlet', 'memur', 'disiplin', 'atama'],
+    'is_hukuku': ['iş', 'çalışma', 'işçi', 'işveren', 'sendika', 'iş sözleşmesi'],
+    'vergi_hukuku': ['vergi', 'gelir', 'kurumlar', 'kdv', 'stopaj', 'beyanname', 'matrah'],
+    'icra_iflas_hukuku': ['icra', 'iflas', 'konkordato', 'haciz', 'alacak', 'borçlu'],
+    'anayasa_hukuku': ['anayasa', 'temel hak', 'özgürlük', 'cumhurbaşkanı', 'meclis']
+}
@@ -0,0 +1,433 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from tools.bm25_index import BM25Index
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Filter
+
+logger = logging.getLogger(__name__)
+
+# Sık filtrelenen payload alanları için değer -> satır indeksi tabloları tutulur; diğer alanlarda
+# aday satırların payload'ları taranır.
+INDEXED_PAYLOAD_FIELDS = ("ana_hukuk_alani", "dokuman_tipi", "madde_no")
+SCROLL_BATCH_SIZE = 256
+
+
+class LocalHit:
+    # _format_hit'in beklediği ScoredPoint alanları (id, score, payload). Hibrit aramada score
+    # yine kosinüs benzerliğidir; BM25 ve birleşik (RRF) skorlar ayrı alanlarda taşınır.
+    # vector, mmap'teki satırın görünümüdür (kopyalanmaz); arama sonrası tekilleştirmede kullanılır.
+    __slots__ = ("id", "score", "payload", "lexical_score", "fused_score", "vector")
+
+    def __init__(self, id, score: float, payload: Dict[str, Any], lexical_score: Optional[float] = None, fused_score: Optional[float] = None, vector=None):
+        self.id = id
+        self.score = score
+        self.payload = payload
+        self.lexical_score = lexical_score
+        self.fused_score = fused_score
+        self.vector = vector
+
+
+class _Snapshot:
+    # Diskteki bir anlık görüntünün salt okunur hali. Senkronizasyon yeni bir nesne kurup
+    # referansı değiştirir; aramalar kilitsiz olarak o anki nesne üzerinde çalışır.
+    def __init__(self, vectors: np.ndarray, ids: List[Any], payloads: List[Dict[str, Any]], synced_at: float):
+        self.vectors = vectors
+        self.ids = ids
+        self.payloads = payloads
+        self.synced_at = synced_at
+        self.field_index: Dict[str, Dict[Any, np.ndarray]] = {}
+        for field in INDEXED_PAYLOAD_FIELDS:
+            rows: Dict[Any, List[int]] = {}
+            for row, payload in enumerate(payloads):
+                for value in _as_values(payload.get(field)):
+                    rows.setdefault(value, []).append(row)
+            self.field_index[field] = {value: np.asarray(r, dtype=np.int64) for value, r in rows.items()}
+        self._bm25: Optional[BM25Index] = None
+        self._bm25_lock = threading.Lock()
+
+    @property
+    def bm25(self) -> BM25Index:
+        # Yalnızca hibrit arama kullanılırsa, anlık görüntü başına bir kez kurulur.
+        with self._bm25_lock:
+            if self._bm25 is None:
+                self._bm25 = BM25Index([payload.get("text", "") for payload in self.payloads])
+            return self._bm25
+
+
+def _as_values(value: Any) -> List[Any]:
+    # Qdrant'ta liste payload'lar, elemanlarından biri eşleşirse eşleşmiş sayılır.
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, (str, int, float, bool))]
+    return [value] if isinstance(value, (str, int, float, bool)) else []
+
+
+def _match_values(condition: Any) -> List[Any]:
+    # Yalnızca _parse_filter_dict'in ürettiği eşleşmeler (MatchValue / MatchAny) desteklenir.
+    match = condition.match
+    if hasattr(match, "any"):
+        return list(match.any)
+    if hasattr(match, "value"):
+        return [match.value]
+    raise ValueError(f"Yerel indeks bu eşleşme türünü desteklemiyor: {match!r}")
+
+
+def _condition_matches(payload: Dict[str, Any], condition: Any) -> bool:
+    values = _as_values(payload.get(condition.key))
+    if getattr(condition, "match", None) is not None:
+        expected = _match_values(condition)
+        return any(v in expected for v in values)
+    value_range = getattr(condition, "range", None)
+    if value_range is not None:
+        numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        return any(
+            (value_range.gte is None or v >= value_range.gte)
+            and (value_range.gt is None or v > value_range.gt)
+            and (value_range.lte is None or v <= value_range.lte)
+            and (value_range.lt is None or v < value_range.lt)
+            for v in numbers
+        )
+    raise ValueError(f"Yerel indeks bu filtre koşulunu desteklemiyor: {condition!r}")
+
+
+class LocalVectorIndex:
+    # Qdrant koleksiyonunun (vektörler + payload) diskte tutulan bir kopyası. Vektörler normalize
+    # edilmiş float32 matris olarak .npy dosyasında saklanır ve bellek eşlemeli (mmap) açılır;
+    # ~2.500 dokümanlık derlemde tam tarama, ağ gidiş-dönüşünden çok daha ucuzdur. Koleksiyon
+    # Cosine mesafesi kullandığından skorlar Qdrant'ın döndürdüğü skorlarla aynıdır.
+    #
+    # Senkronizasyon artımlıdır: uzak koleksiyondaki nokta kimlikleri listelenir, yalnızca yeni
+    # noktalar vektörleriyle çekilir, silinenler çıkarılır. Yerinde güncellenen noktalar kimlikten
+    # anlaşılamadığı için full_sync_interval aralıklarla tam senkronizasyon yapılır.
+    def __init__(
+        self,
+        collection_name: str,
+        client_provider: Callable[[], Optional["QdrantClient"]],
+        directory: str = os.getenv("QDRANT_LOCAL_INDEX_DIR", "db/local_index"),
+        sync_interval: float = float(os.getenv("QDRANT_LOCAL_INDEX_SYNC_SECONDS", 300)),
+        full_sync_interval: float = float(os.getenv("QDRANT_LOCAL_INDEX_FULL_SYNC_SECONDS", 86400)),
+    ):
+        self.collection_name = collection_name
+        self.client_provider = client_provider
+        self.directory = os.path.join(directory, collection_name)
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+
+        self._snapshot: Optional[_Snapshot] = None
+        self._last_full_sync = 0.0
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._syncs = 0
+        self._sync_errors = 0
+        self._last_error: Optional[str] = None
+        self._load()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def _load(self) -> None:
+        meta_path = os.path.join(self.directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r")
+            with open(os.path.join(self.directory, "payloads.json"), encoding="utf-8") as f:
+                records = json.load(f)
+            if len(records) != vectors.shape[0]:
+                raise ValueError(f"vektör ({vectors.shape[0]}) ve payload ({len(records)}) sayıları uyuşmuyor")
+            self._snapshot = _Snapshot(vectors, [r["id"] for r in records], [r["payload"] for r in records], meta["synced_at"])
+            self._last_full_sync = meta.get("full_synced_at", 0.0)
+            logger.info(f"[LOCAL_INDEX] '{self.collection_name}' yerel kopyası yüklendi ({len(records)} nokta).")
+        except Exception as e:
+            logger.error(f"[LOCAL_INDEX] Yerel kopya okunamadı, yeniden senkronize edilecek: {e}")
+            self._snapshot = None
+
+    def _write(self, vectors: np.ndarray, ids: List[Any], payloads: List[Dict[str, Any]], full: bool) -> _Snapshot:
+        # Önce geçici dizine yazılır, sonra dizin değiştirilir; yarım kalan yazım mevcut kopyayı bozmaz.
+        synced_at = time.time()
+        if full:
+            self._last_full_sync = synced_at
+        staging = f"{self.directory}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, "vectors.npy"), vectors)
+        with open(os.path.join(staging, "payloads.json"), "w", encoding="utf-8") as f:
+            json.dump([{"id": i, "payload": p} for i, p in zip(ids, payloads)], f, ensure_ascii=False)
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "collection": self.collection_name,
+                "count": len(ids),
+                "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                "synced_at": synced_at,
+                "full_synced_at": self._last_full_sync,
+            }, f)
+
+        previous = f"{self.directory}.old"
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(self.directory):
+            os.replace(self.directory, previous)
+        os.replace(staging, self.directory)
+        shutil.rmtree(previous, ignore_errors=True)
+
+        mapped = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r")
+        return _Snapshot(mapped, ids, payloads, synced_at)
+
+    def _fetch_points(self, client: "QdrantClient", ids: Optional[Sequence[Any]] = None):
+        points = []
+        if ids is None:
+            offset = None
+            while True:
+                batch, offset = client.scroll(
+                    collection_name=self.collection_name, limit=SCROLL_BATCH_SIZE,
+                    offset=offset, with_payload=True, with_vectors=True,
+                )
+                points.extend(batch)
+                if offset is None:
+                    break
+        else:
+            for start in range(0, len(ids), SCROLL_BATCH_SIZE):
+                points.extend(client.retrieve(
+                    collection_name=self.collection_name, ids=list(ids[start:start + SCROLL_BATCH_SIZE]),
+                    with_payload=True, with_vectors=True,
+                ))
+        # Yerel indeks tek, isimsiz vektör bekler. İsimli vektörlü bir koleksiyonun noktaları atlanırsa
+        # kopya boş kalır ama hazır görünür; bu yüzden senkronizasyon hata ile durdurulur.
+        unsupported = next((p for p in points if not isinstance(p.vector, list)), None)
+        if unsupported is not None:
+            kind = f"isimli vektörler ({', '.join(sorted(unsupported.vector))})" if isinstance(unsupported.vector, dict) else type(unsupported.vector).__name__
+            raise ValueError(
+                f"'{self.collection_name}' koleksiyonunda tek, isimsiz vektör beklenirken {kind} bulundu "
+                f"(nokta: {unsupported.id}); yerel indeks bu koleksiyonu sunamaz."
+            )
+        return points
+
+    def _remote_ids(self, client: "QdrantClient") -> List[Any]:
+        ids, offset = [], None
+        while True:
+            batch, offset = client.scroll(
+                collection_name=self.collection_name, limit=SCROLL_BATCH_SIZE * 8,
+                offset=offset, with_payload=False, with_vectors=False,
+            )
+            ids.extend(p.id for p in batch)
+            if offset is None:
+                return ids
+
+    @staticmethod
+    def _normalize(vectors: Iterable[List[float]]) -> np.ndarray:
+        matrix = np.asarray(list(vectors), dtype=np.float32)
+        if matrix.size == 0:
+            return matrix.reshape(0, 0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def sync(self, full: bool = False) -> Dict[str, Any]:
+        client = self.client_provider()
+        if client is None:
+            raise RuntimeError("Qdrant istemcisi yok; yerel indeks senkronize edilemiyor.")
+
+        with self._sync_lock:
+            started = time.perf_counter()
+            current = self._snapshot
+            full = full or current is None or (time.time() - self._last_full_sync) >= self.full_sync_interval
+
+            if full:
+                points = self._fetch_points(client)
+                ids = [p.id for p in points]
+                payloads = [p.payload or {} for p in points]
+                vectors = self._normalize(p.vector for p in points)
+                added, removed = len(ids), 0
+            else:
+                remote_ids = self._remote_ids(client)
+                remote_set = set(remote_ids)
+                local_set = set(current.ids)
+                new_ids = [i for i in remote_ids if i not in local_set]
+                keep = [row for row, i in enumerate(current.ids) if i in remote_set]
+                added, removed = len(new_ids), len(current.ids) - len(keep)
+                if not added and not removed:
+                    self._syncs += 1
+                    return {"full": False, "added": 0, "removed": 0, "count": len(current.ids), "seconds": round(time.perf_counter() - started, 3)}
+
+                new_points = self._fetch_points(client, new_ids) if new_ids else []
+                ids = [current.ids[row] for row in keep] + [p.id for p in new_points]
+                payloads = [current.payloads[row] for row in keep] + [p.payload or {} for p in new_points]
+                kept_vectors = np.asarray(current.vectors[keep], dtype=np.float32)
+                if new_points:
+                    new_vectors = self._normalize(p.vector for p in new_points)
+                    vectors = np.vstack([kept_vectors, new_vectors]) if len(keep) else new_vectors
+                else:
+                    vectors = kept_vectors
+
+            self._snapshot = self._write(vectors, ids, payloads, full)
+            self._syncs += 1
+            result = {"full": full, "added": added, "removed": removed, "count": len(ids), "seconds": round(time.perf_counter() - started, 3)}
+            logger.info(f"[LOCAL_INDEX] Senkronizasyon tamamlandı: {result}")
+            return result
+
+    def start(self) -> None:
+        if self._thread is not None or self.sync_interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._sync_loop, name="local-index-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _sync_loop(self) -> None:
+        # Kopya yoksa hemen, varsa bir aralık sonra senkronize edilir; uzak Qdrant erişilemezse
+        # mevcut kopyadan hizmet verilmeye devam edilir.
+        delay = 0.0 if self._snapshot is None else self.sync_interval
+        while not self._stop.wait(delay):
+            try:
+                self.sync()
+                self._last_error = None
+            except Exception as e:
+                self._sync_errors += 1
+                self._last_error = str(e)
+                logger.warning(f"[LOCAL_INDEX] Senkronizasyon başarısız: {e}")
+            delay = self.sync_interval
+
+    def _candidate_rows(self, snapshot: _Snapshot, query_filter: Optional["Filter"]) -> Optional[np.ndarray]:
+        # None: filtre yok, tüm satırlar aday.
+        if query_filter is None:
+            return None
+        must = list(query_filter.must or [])
+        should = list(query_filter.should or [])
+        must_not = list(query_filter.must_not or [])
+        if query_filter.min_should is not None:
+            raise ValueError("Yerel indeks min_should filtresini desteklemiyor.")
+        for condition in must + should + must_not:
+            if not hasattr(condition, "key") or (condition.match is None and condition.range is None):
+                raise ValueError(f"Yerel indeks bu filtre koşulunu desteklemiyor: {condition!r}")
+
+        rows: Optional[np.ndarray] = None
+        scanned = []
+        for condition in must:
+            if condition.key in snapshot.field_index and condition.match is not None:
+                index = snapshot.field_index[condition.key]
+                values = _match_values(condition)
+                matched = [index[v] for v in values if v in index]
+                condition_rows = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+                rows = condition_rows if rows is None else np.intersect1d(rows, condition_rows, assume_unique=True)
+            else:
+                scanned.append(condition)
+
+        if rows is None:
+            rows = np.arange(len(snapshot.ids), dtype=np.int64)
+        if not (scanned or should or must_not):
+            return rows
+
+        def keep(row: int) -> bool:
+            payload = snapshot.payloads[row]
+            return (
+                all(_condition_matches(payload, c) for c in scanned)
+                and (not should or any(_condition_matches(payload, c) for c in should))
+                and not any(_condition_matches(payload, c) for c in must_not)
+            )
+        return np.asarray([row for row in rows if keep(int(row))], dtype=np.int64)
+
+    def _dense_scores(self, snapshot: _Snapshot, query_vectors: Sequence[Sequence[float]], rows: Optional[np.ndarray]) -> np.ndarray:
+        matrix = snapshot.vectors if rows is None else snapshot.vectors[rows]
+        return self._normalize(query_vectors) @ np.asarray(matrix).T
+
+    def hybrid_search(
+        self,
+        query_vector: Sequence[float],
+        query_text: str,
+        query_filter: Optional["Filter"],
+        limit: int,
+        score_threshold: Optional[float] = None,
+        candidates: int = 20,
+        rrf_k: int = 60,
+    ) -> List[LocalHit]:
+        # Yoğun (kosinüs) ve sözcüksel (BM25) sıralamalar tek geçişte, aynı filtreyle üretilir ve
+        # reciprocal rank fusion ile birleştirilir: skor = Σ 1 / (rrf_k + sıra). Eşik yalnızca
+        # yoğun adaylara uygulanır; "madde 506" gibi birebir eşleşen bir chunk düşük kosinüsle de gelebilir.
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("Yerel indeks henüz senkronize edilmedi.")
+        rows = self._candidate_rows(snapshot, query_filter)
+        if (rows is not None and not len(rows)) or not snapshot.ids:
+            return []
+
+        dense = self._dense_scores(snapshot, [query_vector], rows)[0]
+        eligible = np.flatnonzero(dense >= score_threshold) if score_threshold is not None else np.arange(len(dense))
+        dense_top = eligible[np.argsort(-dense[eligible], kind="stable")[:candidates]]
+        # Satır numaraları koleksiyon geneline çevrilir; filtre varsa dense dizisi aday satırlara göredir.
+        position_of = None if rows is None else {int(row): position for position, row in enumerate(rows)}
+        dense_rows = [int(p if rows is None else rows[p]) for p in dense_top]
+
+        lexical = snapshot.bm25.search(query_text, candidates, rows)
+        fused: Dict[int, float] = {}
+        for rank, row in enumerate(dense_rows, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (rrf_k + rank)
+        for rank, (row, _) in enumerate(lexical, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (rrf_k + rank)
+        lexical_scores = dict(lexical)
+
+        hits = []
+        for row in sorted(fused, key=lambda r: fused[r], reverse=True)[:limit]:
+            cosine = float(dense[row if position_of is None else position_of[row]])
+            hits.append(LocalHit(snapshot.ids[row], cosine, snapshot.payloads[row], lexical_scores.get(row, 0.0), fused[row], snapshot.vectors[row]))
+        return hits
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        query_filter: Optional["Filter"],
+        limit: int,
+        score_threshold: Optional[float] = None,
+    ) -> List[List[LocalHit]]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("Yerel indeks henüz senkronize edilmedi.")
+        if not query_vectors:
+            return []
+
+        rows = self._candidate_rows(snapshot, query_filter)
+        if (rows is not None and not len(rows)) or not snapshot.ids:
+            return [[] for _ in query_vectors]
+
+        scores = self._dense_scores(snapshot, query_vectors, rows)
+
+        results = []
+        for query_scores in scores:
+            k = min(limit, len(query_scores))
+            top = np.argpartition(-query_scores, k - 1)[:k]
+            top = top[np.argsort(-query_scores[top], kind="stable")]
+            hits = []
+            for position in top:
+                score = float(query_scores[position])
+                if score_threshold is not None and score < score_threshold:
+                    break
+                row = int(position if rows is None else rows[position])
+                hits.append(LocalHit(snapshot.ids[row], score, snapshot.payloads[row], vector=snapshot.vectors[row]))
+            results.append(hits)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'collection': self.collection_name,
+            'ready': snapshot is not None,
+            'points': len(snapshot.ids) if snapshot else 0,
+            'bm25_terms': snapshot._bm25.vocabulary_size if snapshot and snapshot._bm25 else None,
+            'synced_at': snapshot.synced_at if snapshot else None,
+            'syncs_total': self._syncs,
+            'sync_errors_total': self._sync_errors,
+            'last_error': self._last_error,
+        }
@@ -1,36 +1,105 @@
 import os
 import re
 import logging
-from typing import Optional, List, Dict, Any, Union
+import threading
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Type, Union
 from datetime import datetime
 
-import torch
 from dotenv import load_dotenv
-from pydantic import Field, PrivateAttr
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchAny, Range
-from qdrant_client.http.exceptions import UnexpectedResponse
-from langchain_huggingface import HuggingFaceEmbeddings
-from crewai_tools import RagTool
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
+from pydantic import BaseModel, Field, PrivateAttr
+from crewai.tools import BaseTool
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception
+from tools.embedding_service import EmbeddingService
+from tools.embedding_backends import EMBEDDING_MODEL_NAME, create_embeddings, embedding_cache_namespace
+from tools.legal_terms import LEGAL_AREA_KEYWORDS
+from tools.local_vector_index import LocalVectorIndex
+from tools.result_postprocess import ResultPostprocessor, create_result_postprocessor
+from utils.context_budget import context_budget
+from utils.metrics import TOOL_CALL_SECONDS, timed
+from utils.micro_batcher import MicroBatcher
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# torch, sentence_transformers ve qdrant_client içe aktarması saniyeler sürer; modül import
+# edilirken değil, istemci/model ilk kurulurken yüklenir. Tip ipuçları için yalnızca tip denetiminde alınır.
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Filter
+
 load_dotenv()
 
-_global_embedding_model: Optional[HuggingFaceEmbeddings] = None
-_global_qdrant_client: Optional[QdrantClient] = None
+# Aramaları koleksiyonun diskteki yerel kopyasından süreç içinde yanıtla (bkz. tools/local_vector_index.py).
+LOCAL_INDEX_ENABLED = os.getenv("QDRANT_LOCAL_INDEX", "false").lower() == "true"
+# BM25 + yoğun arama (RRF). Chunk metinleri yerel kopyadan okunduğu için yerel kopyayı da açar.
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH", "false").lower() == "true"
+
+_global_embedding_model: Optional[Any] = None
+_global_embedding_service: Optional[EmbeddingService] = None
+_global_qdrant_client: Optional["QdrantClient"] = None
+_global_local_index: Optional[LocalVectorIndex] = None
+_local_index_lock = threading.Lock()
+# Arama sonrası tekilleştirme / komşu chunk birleştirme / yeniden sıralama (bkz. tools/result_postprocess.py).
+_result_postprocessor: Optional[ResultPostprocessor] = create_result_postprocessor()
+POSTPROCESS_CANDIDATES = int(os.getenv("RAG_POSTPROCESS_CANDIDATES", 20))
+
+def get_shared_embedding_service() -> Optional[EmbeddingService]:
+    return _global_embedding_service
+
+def get_shared_qdrant_client() -> Optional["QdrantClient"]:
+    return _global_qdrant_client
+
+def get_shared_local_index() -> Optional[LocalVectorIndex]:
+    return _global_local_index
+
+def get_result_postprocessor() -> Optional[ResultPostprocessor]:
+    return _result_postprocessor
+
+def _remote_search_batch(items: List[tuple]) -> List[Any]:
+    # Farklı araç örneklerinden (eş zamanlı analizler, toplu analiz vakaları) gelen
+    # (koleksiyon, QueryRequest) çiftleri koleksiyon başına tek query_batch_points çağrısında gönderilir.
+    results: List[Any] = [None] * len(items)
+    groups: Dict[str, List[int]] = {}
+    for row, (collection_name, _) in enumerate(items):
+        groups.setdefault(collection_name, []).append(row)
+    for collection_name, rows in groups.items():
+        with timed(TOOL_CALL_SECONDS, tool="qdrant_search"):
+            batch_result = _global_qdrant_client.query_batch_points(
+                collection_name=collection_name,
+                requests=[items[row][1] for row in rows],
+            )
+        for row, response in zip(rows, batch_result):
+            results[row] = response.points
+    return results
+
+_search_batcher = MicroBatcher(
+    _remote_search_batch,
+    max_batch_size=int(os.getenv("QDRANT_SEARCH_BATCH_SIZE", 64)),
+    max_wait_ms=float(os.getenv("QDRANT_SEARCH_BATCH_WAIT_MS", 3)),
+    name="qdrant-search-batcher",
+)
+
+def _is_retryable_error(error: BaseException) -> bool:
+    from qdrant_client.http.exceptions import UnexpectedResponse
+    return isinstance(error, (UnexpectedResponse, ConnectionError))
+
+class QdrantLegalSearchInput(BaseModel):
+    query: str = Field(..., description="Aranacak hukuki soru, kavram veya ifade.")
 
-class QdrantLegalSearchTool(RagTool):
+# RagTool yerine doğrudan BaseTool kullanılır: RagTool her örnekte kullanılmayan bir embedchain
+# uygulaması (ve ayrı bir embedding yığını) kurar. Ajana görünen ad, açıklama ve şema aynıdır.
+class QdrantLegalSearchTool(BaseTool):
     #Burada ajanın bu toolsu kullanmadan önce ne olduğunu, ne işe yaradığını, nasıl kullanılacağını, ne gibi sonuçlar döndüreceğini yazıyoruz.
     #Ajan bu sayede toolsu öğrenmiş olacak.
     name: str = "Gelişmiş Hukuki Bilgi Arama Aracı"
     description: str = "Anlamsal embedding'ler ve metadata filtreleri kullanarak Qdrant üzerinde gelişmiş hukuki belge araması yapar."
+    args_schema: Type[BaseModel] = QdrantLegalSearchInput
     
     _embedding_model: PrivateAttr
+    _embedding_service: PrivateAttr
     _client: PrivateAttr
+    _local_index: PrivateAttr = None
     _connection_initialized: PrivateAttr = False
     
     collection_name: str = Field(
@@ -53,17 +122,24 @@ class QdrantLegalSearchTool(RagTool):
         default=True,
         description="Sonuç bulunamazsa otomatik olarak geri çekilme stratejilerinin denenip denenmeyeceği."
     )
+    fallback_overfetch: int = Field(
+        default=3,
+        description="Metni boş kayıtlar elendiğinde limitin dolması için tek istekte fazladan çekilecek sonuç sayısı."
+    )
+    hybrid_candidates: int = Field(
+        default=int(os.getenv("HYBRID_CANDIDATES", 20)),
+        description="Hibrit aramada yoğun ve BM25 sıralamalarının her birinden birleştirmeye alınacak aday sayısı."
+    )
+    context_token_budget: int = Field(
+        default=int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", 1500)),
+        description="Ajana döndürülen chunk metinlerinin toplam token bütçesi; sıralamada sonda kalan sonuçlar kırpılır veya atılır (0: sınırsız)."
+    )
+    rrf_k: int = Field(
+        default=int(os.getenv("HYBRID_RRF_K", 60)),
+        description="Reciprocal rank fusion sabiti; büyüdükçe alt sıralardaki adayların ağırlığı artar."
+    )
     
-    _legal_areas_mapping: Dict[str, List[str]] = {
-        'ticaret_hukuku': ['ticaret', 'şirket', 'anonim', 'limited', 'ortaklık', 'tacir', 'ttk'],
-        'medeni_hukuk': ['medeni', 'aile', 'miras', 'eşya', 'kişiler', 'mk', 'boşanma', 'velayet', 'tenkis'],
-        'ceza_hukuku': ['ceza', 'suç', 'mahkumiyet', 'beraat', 'sanık', 'tck', 'hapis', 'kaza'],
-        'idare_hukuku': ['idare', 'kamu', 'devlet', 'memur', 'disiplin', 'atama'],
-        'is_hukuku': ['iş', 'çalışma', 'işçi', 'işveren', 'sendika', 'iş sözleşmesi'],
-        'vergi_hukuku': ['vergi', 'gelir', 'kurumlar', 'kdv', 'stopaj', 'beyanname', 'matrah'],
-        'icra_iflas_hukuku': ['icra', 'iflas', 'konkordato', 'haciz', 'alacak', 'borçlu'],
-        'anayasa_hukuku': ['anayasa', 'temel hak', 'özgürlük', 'cumhurbaşkanı', 'meclis']
-    }
+    _legal_areas_mapping: Dict[str, List[str]] = LEGAL_AREA_KEYWORDS
     
     _common_legal_keywords: List[str] = [
         'madde', 'kanun', 'yönetmelik', 'tüzük', 'kararnâme', 'genelge', 'hüküm', 'fıkra',
@@ -76,11 +152,15 @@ class QdrantLegalSearchTool(RagTool):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._initialize_client()
+        if LOCAL_INDEX_ENABLED or HYBRID_SEARCH_ENABLED:
+            self._initialize_local_index()
         self._initialize_embedding_model()
 
     def _initialize_client(self) -> None:
         global _global_qdrant_client
-        if _global_qdrant_client and self._client_is_healthy(_global_qdrant_client):
+        # Yerel kopya kullanılıyorsa uzak istemci yalnızca senkronizasyonda kullanılır; her araç
+        # kurulumunda get_collections() ile yoklanmaz, hatalar senkronizasyonda raporlanır.
+        if _global_qdrant_client and (LOCAL_INDEX_ENABLED or self._client_is_healthy(_global_qdrant_client)):
             self._client = _global_qdrant_client
             self._connection_initialized = True
             logger.info("Mevcut Qdrant istemcisi yeniden kullanılıyor.")
@@ -94,6 +174,7 @@ class QdrantLegalSearchTool(RagTool):
                 self._connection_initialized = False
                 return
 
+            from qdrant_client import QdrantClient
             self._client = QdrantClient(
                 url=qdrant_url,
                 api_key=qdrant_api_key,
@@ -109,7 +190,25 @@ class QdrantLegalSearchTool(RagTool):
             self._connection_initialized = False
             _global_qdrant_client = None
 
-    def _client_is_healthy(self, client: QdrantClient) -> bool:
+    def _initialize_local_index(self) -> None:
+        global _global_local_index
+        # Ekip havuzu araçları paralel kurabilir; aynı dizine yazan ikinci bir senkronizasyon
+        # iş parçacığı açılmaması için indeks kilit altında bir kez oluşturulur.
+        with _local_index_lock:
+            if _global_local_index is None or _global_local_index.collection_name != self.collection_name:
+                index = LocalVectorIndex(self.collection_name, get_shared_qdrant_client)
+                if not index.ready and self._connection_initialized:
+                    try:
+                        index.sync(full=True)
+                    except Exception as e:
+                        logger.error(f"Yerel indeks oluşturulamadı, uzak Qdrant kullanılacak: {e}", exc_info=True)
+                if _global_local_index is not None:
+                    _global_local_index.stop()
+                index.start()
+                _global_local_index = index
+            self._local_index = _global_local_index
+
+    def _client_is_healthy(self, client: "QdrantClient") -> bool:
         try:
             client.get_collections()
             return True
@@ -118,21 +217,19 @@ class QdrantLegalSearchTool(RagTool):
             return False
 
     def _initialize_embedding_model(self) -> None:
-        global _global_embedding_model
+        global _global_embedding_model, _global_embedding_service
         if _global_embedding_model:
             self._embedding_model = _global_embedding_model
+            self._embedding_service = _global_embedding_service
             logger.info("Mevcut embedding modeli yeniden kullanılıyor.")
             return
 
         try:
-            device = 'cuda' if torch.cuda.is_available() else 'cpu'
-            logger.info(f"Embedding modeli için '{device}' cihazı kullanılacak. Bu işlem biraz zaman alabilir...")
-            self._embedding_model = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-                model_kwargs={'device': device},
-                encode_kwargs={'normalize_embeddings': True}
-            )
+            # Arka uç EMBEDDING_BACKEND ile seçilir (torch / torch-int8 / onnx); bkz. tools/embedding_backends.py
+            self._embedding_model = create_embeddings(EMBEDDING_MODEL_NAME)
+            self._embedding_service = EmbeddingService(self._embedding_model, embedding_cache_namespace(EMBEDDING_MODEL_NAME))
             _global_embedding_model = self._embedding_model
+            _global_embedding_service = self._embedding_service
             logger.info("Çok dilli embedding modeli başarıyla yüklendi ve global olarak ayarlandı.")
         except Exception as e:
             logger.error(f"Embedding modeli başlatılamadı: {e}", exc_info=True)
@@ -143,17 +240,17 @@ class QdrantLegalSearchTool(RagTool):
     @retry(
         wait=wait_exponential(multiplier=1, min=2, max=10), 
         stop=stop_after_attempt(3),
-        retry=retry_if_exception_type((UnexpectedResponse, ConnectionError)),
+        retry=retry_if_exception(_is_retryable_error),
         reraise=True
     )
     def _run(
         self, 
         query: str, 
-        filter: Optional[Union[Filter, Dict[str, Any]]] = None, 
+        filter: Optional[Union["Filter", Dict[str, Any]]] = None, 
         limit: Optional[int] = None,
         score_threshold: Optional[float] = None
     ) -> List[Dict]:
-        if not self._connection_initialized:
+        if not self._connection_initialized and not (self._local_index and self._local_index.ready):
             logger.warning("Qdrant bağlantısı hazır değil. Servis çağrılamıyor.")
             return [{"error": "Qdrant bağlantısı kurulamadı.", "query": query}]
         
@@ -161,11 +258,29 @@ class QdrantLegalSearchTool(RagTool):
             filter = self._parse_filter_dict(filter)
         
         search_limit = limit if limit is not None else self.max_results
-        
-        # 1. Ana Arama
         threshold = score_threshold if score_threshold is not None else self.base_similarity_threshold
-        results = self._execute_search(query, filter, threshold, search_limit)
-        
+        lower_threshold = max(threshold - 0.1, self.min_similarity_threshold)
+
+        if HYBRID_SEARCH_ENABLED and self._local_index and self._local_index.ready:
+            return self._run_hybrid(query, filter, search_limit, lower_threshold if self.auto_fallback else threshold)
+
+        # Eşik kademeleri istemci tarafında uygulanır: tek istekte en düşük eşikle, biraz daha
+        # yüksek limitle çekilir. Anahtar kelime varyantı gerekiyorsa aynı batch çağrısına eklenir.
+        queries = [query]
+        keyword_query = ""
+        if self.auto_fallback:
+            keyword_query = self._extract_keywords_for_fallback(query)
+            if keyword_query.strip() and keyword_query != query:
+                queries.append(keyword_query)
+
+        fetch_threshold = min(threshold, lower_threshold) if self.auto_fallback else threshold
+        batch_hits = self._execute_search_batch(queries, filter, fetch_threshold, self._candidate_limit(search_limit))
+        if not batch_hits:
+            return []
+
+        # 1. Ana Arama
+        results = self._select_hits(query, batch_hits[0], threshold, search_limit)
+        logger.info(f"Sorgu '{query[:50]}...' için {threshold} eşiğiyle {len(results)} sonuç bulundu.")
         if results or not self.auto_fallback:
             return results
 
@@ -173,54 +288,119 @@ class QdrantLegalSearchTool(RagTool):
         logger.info(f"'{query}' için '{threshold}' eşiğiyle sonuç bulunamadı. Fallback stratejileri deneniyor.")
         
         # Fallback 1: Eşik değerini düşür
-        lower_threshold = max(threshold - 0.1, self.min_similarity_threshold) 
         logger.info(f"Fallback 1: Benzerlik eşiği {lower_threshold}'e düşürülüyor.")
-        results = self._execute_search(query, filter, lower_threshold, search_limit)
+        results = self._select_hits(query, batch_hits[0], lower_threshold, search_limit)
         if results:
             return results
         
         # Fallback 2: Sorgudan anahtar kelimeler çıkararak ara
-        keyword_query = self._extract_keywords_for_fallback(query)
-        if keyword_query.strip() and keyword_query != query:
+        if len(batch_hits) > 1:
             logger.info(f"Fallback 2: Sorgu anahtar kelimelere indirgendi -> '{keyword_query}'")
-            results = self._execute_search(keyword_query, filter, threshold, search_limit)
+            results = self._select_hits(keyword_query, batch_hits[1], threshold, search_limit)
             if results:
                 return results
         
         logger.info(f"Tüm fallback stratejileri denendi ancak '{query}' için sonuç bulunamadı.")
         return []
 
-    def _execute_search(
+    def _run_hybrid(self, query: str, filter: Optional["Filter"], limit: int, threshold: float) -> List[Dict]:
+        # Eşik düşürme ve anahtar kelimeyle yeniden arama kademelerinin yerine tek sıralı geçiş:
+        # anahtar kelime eşleşmesini BM25, anlamsal eşleşmeyi embedding sağlar.
+        cleaned_query = self._preprocess_query(query)
+        if not cleaned_query:
+            logger.warning(f"Ön işleme sonrası sorgu boş. Orijinal sorgu: '{query}'")
+            return []
+        try:
+            with timed(TOOL_CALL_SECONDS, tool="embedding"):
+                query_embedding = self._embedding_service.embed_queries([cleaned_query])[0]
+            # Kısaltmalar (tck, hmk) hem kendisiyle hem açılımıyla eşleşsin diye iki metin birlikte verilir.
+            with timed(TOOL_CALL_SECONDS, tool="hybrid_search"):
+                hits = self._local_index.hybrid_search(
+                    query_embedding, f"{query} {cleaned_query}", filter,
+                    self._candidate_limit(limit), threshold, self.hybrid_candidates, self.rrf_k,
+                )
+        except ValueError as e:
+            logger.info(f"Hibrit arama bu filtreyle yapılamadı, yoğun aramaya dönülüyor: {e}")
+            hits = (self._execute_search_batch([query], filter, threshold, self._candidate_limit(limit)) or [[]])[0]
+        except Exception as e:
+            logger.error(f"Hibrit arama sırasında hata oluştu. Sorgu: '{query}'. Hata: {str(e)}", exc_info=True)
+            return []
+        results = self._finalize_hits(query, [hit for hit in hits if hit.payload and hit.payload.get("text")], limit)
+        logger.info(f"Sorgu '{query[:50]}...' için hibrit aramada {len(results)} sonuç bulundu.")
+        return results
+
+    def _candidate_limit(self, limit: int) -> int:
+        # Yeniden sıralama / MMR açıksa seçim daha geniş bir aday kümesinden yapılır.
+        candidates = limit + self.fallback_overfetch
+        if _result_postprocessor and _result_postprocessor.wants_more_candidates:
+            return max(candidates, POSTPROCESS_CANDIDATES)
+        return candidates
+
+    def _select_hits(self, query: str, hits: List[Any], threshold: float, limit: int) -> List[Dict]:
+        return self._finalize_hits(query, [hit for hit in hits if hit.score >= threshold], limit)
+
+    def _finalize_hits(self, query: str, hits: List[Any], limit: int) -> List[Dict]:
+        if _result_postprocessor and hits:
+            with timed(TOOL_CALL_SECONDS, tool="result_postprocess"):
+                hits = _result_postprocessor.process(query, hits, limit)
+        results = [self._format_hit(hit) for hit in hits[:limit]]
+        return context_budget.fit_hits(results, self.context_token_budget)
+
+    def _execute_search_batch(
         self, 
-        query: str, 
-        filter: Optional[Filter], 
+        queries: List[str], 
+        filter: Optional["Filter"], 
         threshold: float,
         limit: int
-    ) -> List[Dict]:
+    ) -> List[List[Any]]:
         try:
-            cleaned_query = self._preprocess_query(query)
-            if not cleaned_query:
-                logger.warning(f"Ön işleme sonrası sorgu boş. Orijinal sorgu: '{query}'")
+            cleaned_queries = [self._preprocess_query(query) for query in queries]
+            if not cleaned_queries[0]:
+                logger.warning(f"Ön işleme sonrası sorgu boş. Orijinal sorgu: '{queries[0]}'")
                 return []
+            cleaned_queries = [cleaned for cleaned in cleaned_queries if cleaned]
 
-            query_embedding = self._embedding_model.embed_query(cleaned_query)
+            with timed(TOOL_CALL_SECONDS, tool="embedding"):
+                query_embeddings = self._embedding_service.embed_queries(cleaned_queries)
+
+            if self._local_index and self._local_index.ready:
+                try:
+                    with timed(TOOL_CALL_SECONDS, tool="local_index_search"):
+                        batch_result = self._local_index.search_batch(query_embeddings, filter, limit, threshold)
+                    return [
+                        [hit for hit in search_result if hit.payload and hit.payload.get("text")]
+                        for search_result in batch_result
+                    ]
+                except ValueError as e:
+                    # Yerel indeksin desteklemediği filtreler uzak Qdrant'a yönlendirilir.
+                    logger.info(f"Yerel indeks kullanılamadı, uzak Qdrant'a gidiliyor: {e}")
        
-            search_result = self._client.search(
-                collection_name=self.collection_name,
-                query_vector=query_embedding,
-                query_filter=filter,
-                limit=limit,
-                with_payload=True,
-                score_threshold=threshold
-            )
-            
-            results = [self._format_hit(hit) for hit in search_result if hit.payload and hit.payload.get("text")]
-            
-            logger.info(f"Sorgu '{cleaned_query[:50]}...' için {threshold} eşiğiyle {len(results)} sonuç bulundu.")
-            return results
+            from qdrant_client.http.models import QueryRequest
+            batch_result = _search_batcher.submit_many([
+                (
+                    self.collection_name,
+                    QueryRequest(
+                        query=embedding,
+                        filter=filter,
+                        limit=limit,
+                        with_payload=True,
+                        with_vector=bool(_result_postprocessor and _result_postprocessor.needs_vectors),
+                        score_threshold=threshold
+                    ),
+                )
+                for embedding in query_embeddings
+            ])
 
+            return [
+                [hit for hit in search_result if hit.payload and hit.payload.get("text")]
+                for search_result in batch_result
+            ]
+
+        except (ImportError, TypeError, AttributeError):
+            # Kod / kütüphane sürümü uyumsuzlukları boş sonuç gibi yutulmaz; RAG dalı kaynaksız çalışmasın.
+            raise
         except Exception as e:
-            logger.error(f"Arama sırasında hata oluştu. Sorgu: '{query}'. Hata: {str(e)}", exc_info=True)
+            logger.error(f"Arama sırasında hata oluştu. Sorgu: '{queries[0]}'. Hata: {str(e)}", exc_info=True)
             return []
 
     def _format_hit(self, hit) -> Dict:
@@ -236,6 +416,13 @@ class QdrantLegalSearchTool(RagTool):
             "chunk_index": payload.get("chunk_index", -1),
             "qdrant_id": str(hit.id)
         }
+        if getattr(hit, "fused_score", None) is not None:
+            metadata["bm25_skoru"] = round(hit.lexical_score, 4)
+            metadata["hibrit_skoru"] = round(hit.fused_score, 5)
+        if getattr(hit, "chunk_indices", None):
+            metadata["birlesik_chunklar"] = hit.chunk_indices
+        if getattr(hit, "rerank_score", None) is not None:
+            metadata["yeniden_siralama_skoru"] = round(hit.rerank_score, 4)
         return {
             "text": payload.get("text", ""),
             "score": hit.score,
@@ -280,7 +467,8 @@ class QdrantLegalSearchTool(RagTool):
 
         return " ".join(sorted(list(concepts), key=len, reverse=True))
 
-    def _parse_filter_dict(self, filter_dict: Dict[str, Any]) -> Filter:
+    def _parse_filter_dict(self, filter_dict: Dict[str, Any]) -> "Filter":
+        from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchAny, Range
         must_conditions = []
         for key, value in filter_dict.items():
             if isinstance(value, list):
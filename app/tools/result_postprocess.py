@@ -0,0 +1,290 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bölünmüş chunk'lar arasındaki örtüşme (vector_db/ingest.py --chunk-overlap varsayılanı 64 karakter) birleştirmede bir kez yazılır.
+DEFAULT_OVERLAP_CHARS = 64
+MIN_OVERLAP_CHARS = 16
+
+
+class RetrievedChunk:
+    # _format_hit'in okuduğu ScoredPoint alanlarını taşır; birleştirilen komşu chunk'lar için
+    # payload kopyalanır ve metin birleşik metinle değiştirilir.
+    __slots__ = ("id", "score", "payload", "vector", "lexical_score", "fused_score", "rerank_score", "chunk_indices", "rank")
+
+    def __init__(self, hit: Any, rank: int):
+        self.id = hit.id
+        self.score = hit.score
+        self.payload = hit.payload
+        self.vector = _vector_of(hit)
+        self.lexical_score = getattr(hit, "lexical_score", None)
+        self.fused_score = getattr(hit, "fused_score", None)
+        self.rerank_score: Optional[float] = None
+        self.chunk_indices: Optional[List[int]] = None
+        self.rank = rank
+
+    @property
+    def text(self) -> str:
+        return self.payload.get("text", "")
+
+
+def _vector_of(hit: Any) -> Optional[np.ndarray]:
+    vector = getattr(hit, "vector", None)
+    if isinstance(vector, dict):
+        # İsimli vektörlü koleksiyonlarda tek vektör varsa o kullanılır.
+        vector = next(iter(vector.values()), None) if len(vector) == 1 else None
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def _chunk_index(chunk: RetrievedChunk) -> Optional[int]:
+    try:
+        return int(chunk.payload.get("chunk_index"))
+    except (TypeError, ValueError):
+        return None
+
+
+def join_overlapping(left: str, right: str, max_overlap: int = DEFAULT_OVERLAP_CHARS) -> str:
+    # Sağdaki chunk'ın başı soldakinin sonunda tekrar ediyorsa tekrar eden kısım bir kez yazılır.
+    limit = min(max_overlap, len(left), len(right))
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left.rstrip()} {right.lstrip()}"
+
+
+def drop_near_duplicates(chunks: List[RetrievedChunk], threshold: float) -> List[RetrievedChunk]:
+    # Sıralamada önde olan korunur; kendisinden önce tutulan bir chunk'a kosinüs benzerliği
+    # threshold'u aşan chunk atılır. Vektörü olmayan chunk'lar yalnızca birebir aynı metinle elenir.
+    with_vectors = [chunk for chunk in chunks if chunk.vector is not None]
+    similarity = None
+    position = {}
+    if len(with_vectors) > 1:
+        matrix = np.stack([chunk.vector for chunk in with_vectors])
+        similarity = matrix @ matrix.T
+        position = {id(chunk): row for row, chunk in enumerate(with_vectors)}
+
+    kept: List[RetrievedChunk] = []
+    kept_rows: List[int] = []
+    seen_texts = set()
+    for chunk in chunks:
+        normalized = " ".join(chunk.text.split())
+        if normalized in seen_texts:
+            continue
+        row = position.get(id(chunk))
+        if row is not None and kept_rows and float(similarity[row, kept_rows].max()) >= threshold:
+            continue
+        kept.append(chunk)
+        seen_texts.add(normalized)
+        if row is not None:
+            kept_rows.append(row)
+    return kept
+
+
+def merge_adjacent_chunks(chunks: List[RetrievedChunk], max_overlap: int = DEFAULT_OVERLAP_CHARS, max_span: int = 4) -> List[RetrievedChunk]:
+    # Aynı dosyadan ardışık chunk_index'e sahip sonuçlar tek sonuçta birleştirilir. Birleşik sonuç
+    # grubun en iyi sıradaki üyesinin yerini ve skorunu alır; vektörü üyelerin ortalamasıdır.
+    groups: Dict[str, List[RetrievedChunk]] = {}
+    for chunk in chunks:
+        if _chunk_index(chunk) is not None and chunk.payload.get("dosya_adi"):
+            groups.setdefault(chunk.payload["dosya_adi"], []).append(chunk)
+
+    replaced: Dict[int, Optional[RetrievedChunk]] = {}
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=_chunk_index)
+        runs, current = [], [members[0]]
+        for chunk in members[1:]:
+            if _chunk_index(chunk) - _chunk_index(current[-1]) == 1 and len(current) < max_span:
+                current.append(chunk)
+            else:
+                runs.append(current)
+                current = [chunk]
+        runs.append(current)
+        for run in runs:
+            if len(run) < 2:
+                continue
+            merged = _merge_run(run, max_overlap)
+            best = min(run, key=lambda chunk: chunk.rank)
+            for chunk in run:
+                replaced[id(chunk)] = merged if chunk is best else None
+
+    result = []
+    for chunk in chunks:
+        if id(chunk) not in replaced:
+            result.append(chunk)
+        elif replaced[id(chunk)] is not None:
+            result.append(replaced[id(chunk)])
+    return result
+
+
+def _merge_run(run: List[RetrievedChunk], max_overlap: int) -> RetrievedChunk:
+    best = min(run, key=lambda chunk: chunk.rank)
+    text = run[0].text
+    for chunk in run[1:]:
+        text = join_overlapping(text, chunk.text, max_overlap)
+
+    merged = RetrievedChunk.__new__(RetrievedChunk)
+    merged.id = best.id
+    merged.score = max(chunk.score for chunk in run)
+    merged.lexical_score = best.lexical_score
+    merged.fused_score = best.fused_score
+    merged.rerank_score = None
+    merged.rank = best.rank
+    merged.chunk_indices = [_chunk_index(chunk) for chunk in run]
+    merged.payload = {**run[0].payload, "text": text}
+    articles = []
+    for chunk in run:
+        value = chunk.payload.get("madde_no")
+        for article in (value if isinstance(value, list) else [value]):
+            if article not in ("", None) and article not in articles:
+                articles.append(article)
+    merged.payload["madde_no"] = articles
+    vectors = [chunk.vector for chunk in run if chunk.vector is not None]
+    if vectors:
+        mean = np.mean(vectors, axis=0)
+        norm = np.linalg.norm(mean)
+        merged.vector = mean / norm if norm else None
+    else:
+        merged.vector = None
+    return merged
+
+
+def mmr_select(chunks: List[RetrievedChunk], relevance: Sequence[float], limit: int, diversity_lambda: float) -> List[RetrievedChunk]:
+    # Maximal marginal relevance: lambda * alaka - (1 - lambda) * seçilmişlere en yüksek benzerlik.
+    if diversity_lambda >= 1.0 or len(chunks) <= 1 or any(chunk.vector is None for chunk in chunks):
+        order = np.argsort(-np.asarray(relevance, dtype=np.float32), kind="stable")
+        return [chunks[row] for row in order[:limit]]
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    spread = float(relevance.max() - relevance.min())
+    # Cross-encoder logit'leri ile kosinüs benzerliği aynı ölçekte olsun diye alaka [0, 1]'e çekilir.
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+    matrix = np.stack([chunk.vector for chunk in chunks])
+    similarity = matrix @ matrix.T
+
+    selected: List[int] = []
+    remaining = list(range(len(chunks)))
+    while remaining and len(selected) < limit:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        scores = diversity_lambda * relevance[remaining] - (1 - diversity_lambda) * redundancy
+        choice = remaining[int(np.argmax(scores))]
+        selected.append(choice)
+        remaining.remove(choice)
+    return [chunks[row] for row in selected]
+
+
+class CrossEncoderReranker:
+    # Küçük, çok dilli bir cross-encoder (sorgu, metin) çiftlerini puanlar. Model ilk kullanımda
+    # yüklenir; sentence_transformers kurulu değilse veya model yüklenemezse yeniden sıralama atlanır.
+    def __init__(self, model_name: str, max_length: int = 512):
+        self.model_name = model_name
+        self.max_length = max_length
+        self._model = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None and not self._failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                    logger.info(f"Yeniden sıralama modeli yüklendi: {self.model_name}")
+                except Exception as e:
+                    self._failed = True
+                    logger.error(f"Yeniden sıralama modeli yüklenemedi, retrieval sıralaması kullanılacak: {e}", exc_info=True)
+            return self._model
+
+    def score(self, query: str, texts: List[str]) -> Optional[List[float]]:
+        model = self._get_model()
+        if model is None:
+            return None
+        return [float(score) for score in model.predict([(query, text) for text in texts])]
+
+
+class ResultPostprocessor:
+    # Arama sonrası aşama: yakın kopyaları eler, aynı dosyanın komşu chunk'larını birleştirir,
+    # isteğe bağlı olarak cross-encoder ile yeniden sıralar ve MMR ile çeşitlilik gözeterek limit kadar seçer.
+    def __init__(
+        self,
+        dedup_threshold: float = 0.97,
+        merge_adjacent: bool = True,
+        max_overlap: int = DEFAULT_OVERLAP_CHARS,
+        mmr_lambda: float = 1.0,
+        reranker: Optional[CrossEncoderReranker] = None,
+    ):
+        self.dedup_threshold = dedup_threshold
+        self.merge_adjacent = merge_adjacent
+        self.max_overlap = max_overlap
+        self.mmr_lambda = mmr_lambda
+        self.reranker = reranker
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "input_hits": 0, "output_hits": 0, "duplicates_dropped": 0, "chunks_merged": 0, "seconds": 0.0}
+
+    @property
+    def needs_vectors(self) -> bool:
+        # Vektörler yalnızca yakın kopya eleme ve MMR'de kullanılır; ikisi de kapalıysa aramadan istenmez.
+        return self.dedup_threshold < 1.0 or self.mmr_lambda < 1.0
+
+    @property
+    def wants_more_candidates(self) -> bool:
+        return self.reranker is not None or self.mmr_lambda < 1.0
+
+    def process(self, query: str, hits: Sequence[Any], limit: int) -> List[RetrievedChunk]:
+        started = time.perf_counter()
+        chunks = [RetrievedChunk(hit, rank) for rank, hit in enumerate(hits)]
+        deduplicated = drop_near_duplicates(chunks, self.dedup_threshold) if self.dedup_threshold < 1.0 else chunks
+        merged = merge_adjacent_chunks(deduplicated, self.max_overlap) if self.merge_adjacent else deduplicated
+
+        relevance = [chunk.score for chunk in merged]
+        if self.reranker is not None and merged:
+            scores = self.reranker.score(query, [chunk.text for chunk in merged])
+            if scores is not None:
+                for chunk, score in zip(merged, scores):
+                    chunk.rerank_score = score
+                relevance = scores
+        selected = mmr_select(merged, relevance, limit, self.mmr_lambda)
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["input_hits"] += len(chunks)
+            self._stats["output_hits"] += len(selected)
+            self._stats["duplicates_dropped"] += len(chunks) - len(deduplicated)
+            self._stats["chunks_merged"] += len(deduplicated) - len(merged)
+            self._stats["seconds"] += time.perf_counter() - started
+        return selected
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_ms"] = round(stats["seconds"] / stats["calls"] * 1000, 3) if stats["calls"] else 0.0
+        stats["seconds"] = round(stats["seconds"], 3)
+        stats["reranker"] = self.reranker.model_name if self.reranker else None
+        return stats
+
+
+def create_result_postprocessor() -> Optional[ResultPostprocessor]:
+    if os.getenv("RAG_POSTPROCESS", "true").lower() != "true":
+        return None
+    rerank_model = os.getenv("RAG_RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+    reranker = CrossEncoderReranker(rerank_model) if os.getenv("RAG_RERANK", "false").lower() == "true" else None
+    return ResultPostprocessor(
+        dedup_threshold=float(os.getenv("RAG_DEDUP_THRESHOLD", 0.97)),
+        merge_adjacent=os.getenv("RAG_MERGE_ADJACENT", "true").lower() == "true",
+        mmr_lambda=float(os.getenv("RAG_MMR_LAMBDA", 1.0)),
+        reranker=reranker,
+    )
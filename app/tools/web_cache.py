@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from utils.lru_cache import LRUCache
+from utils.metrics import WEB_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+SEARCH = "search"
+PAGE = "page"
+REDIRECT_STATUS_CODES = {301, 302, 303, 307, 308}
+
+
+def normalize_query(query: Any) -> str:
+    # Ajanlar aynı aramayı farklı boşluk / büyük harf kullanımıyla tekrar üretebiliyor. Türkçe
+    # I/ı/İ/i dönüşümleri dile duyarsız casefold'da farklı sonuç verdiğinden hepsi "i" sayılır.
+    folded = " ".join(str(query or "").split()).casefold()
+    return folded.replace("i\u0307", "i").replace("ı", "i")
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _has_credentials(headers: Optional[Dict[str, str]], cookies: Optional[Dict[str, str]]) -> bool:
+    from crewai_tools.security.safe_requests import _is_sensitive_header
+
+    return bool(cookies) or any(_is_sensitive_header(str(name)) for name in (headers or {}))
+
+
+class WebCache:
+    # Web arama sonuçları ve okunan sayfalar için iki katmanlı önbellek: süreç içi LRU ve kalıcı
+    # depo. Kalıcı depo Redis (replikalar arasında paylaşılır) ya da yerel bir dizindir (tek
+    # sunucuda yeniden başlatmalardan sonra da korunur). Kayıtlar JSON'dur ve duvar saatiyle
+    # zaman damgalanır; tazelik kararı kaydı okuyan tarafından verilir.
+    REDIS_KEY_PREFIX = "web_cache"
+
+    def __init__(
+        self,
+        memory_size: int = int(os.getenv("WEB_CACHE_SIZE", 1024)),
+        use_redis: bool = os.getenv("WEB_CACHE_REDIS", "false").lower() == "true",
+        directory: str = os.getenv("WEB_CACHE_DIR", ""),
+    ):
+        self._memory = LRUCache(maxsize=memory_size)
+        self._use_redis = use_redis
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind: str, parts: List[Any]) -> str:
+        payload = json.dumps([kind, *parts], sort_keys=True, ensure_ascii=False, default=str)
+        return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def _get_redis(self):
+        if not self._use_redis:
+            return None
+        from utils.redis_client import create_redis_client
+        return create_redis_client(decode_responses=True)
+
+    def _path(self, key: str) -> str:
+        kind, digest = key.split(":", 1)
+        return os.path.join(self.directory, kind, digest[:2], f"{digest}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+        entry, ttl = self._load(key)
+        if entry is not None:
+            self._memory.set(key, entry, ttl=ttl)
+        return entry
+
+    def _load(self, key: str):
+        r = self._get_redis()
+        if r:
+            try:
+                raw = r.get(f"{self.REDIS_KEY_PREFIX}:{key}")
+                if raw is not None:
+                    return json.loads(raw), max(1, r.ttl(f"{self.REDIS_KEY_PREFIX}:{key}"))
+            except Exception as e:
+                from utils.redis_client import report_redis_error
+                report_redis_error(e, decode_responses=True)
+                logger.warning(f"Web önbelleği Redis'ten okunamadı: {e}")
+        if self.directory:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                remaining = stored["expires_at"] - time.time()
+                if remaining > 0:
+                    return stored["entry"], remaining
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Web önbelleği diskten okunamadı: {e}")
+        return None, None
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: int) -> None:
+        self._memory.set(key, entry, ttl=ttl)
+        r = self._get_redis()
+        if r:
+            try:
+                r.set(f"{self.REDIS_KEY_PREFIX}:{key}", json.dumps(entry, ensure_ascii=False), ex=ttl)
+            except Exception as e:
+                from utils.redis_client import report_redis_error
+                report_redis_error(e, decode_responses=True)
+                logger.warning(f"Web önbelleği Redis'e yazılamadı: {e}")
+        if self.directory:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Yarım yazılmış dosya okunmasın diye geçici dosyaya yazılıp yerine taşınır.
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump({"expires_at": time.time() + ttl, "entry": entry}, f, ensure_ascii=False)
+                os.replace(temp_path, path)
+            except Exception as e:
+                logger.warning(f"Web önbelleği diske yazılamadı: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        store = "redis" if self._use_redis else ("disk" if self.directory else "memory")
+        return {"store": store, "memory": self._memory.stats()}
+
+
+class WebFetcher:
+    # Web araçlarının dış istekleri (Serper API, sayfa okuma) süreç genelinde tek bir bağlantı
+    # havuzlu oturumdan ve eşzamanlılık sınırlı bir semafordan geçer; her istek ve her ekip için
+    # yeni TCP/TLS bağlantısı açılmaz. Oturum crewai_tools'un SSRF korumalı adaptörünü kullanır ve
+    # yönlendirmelerin her adımı ayrıca doğrulanır (safe_get ile aynı kurallar).
+    # - Arama sonuçları normalize sorgu + parametre anahtarıyla search_ttl boyunca saklanır.
+    # - Sayfalar URL anahtarıyla saklanır; page_ttl dolunca ETag / Last-Modified ile koşullu istek
+    #   atılır. 304 gelirse veya gövdenin özeti değişmediyse sayfa yeniden ayrıştırılmaz. Yeniden
+    #   doğrulama başarısız olursa eski kopya döner.
+    # - Aynı anahtar için eş zamanlı istekler tek dış isteğe indirgenir.
+    def __init__(
+        self,
+        cache: Optional[WebCache] = None,
+        search_ttl: int = int(os.getenv("WEB_SEARCH_CACHE_TTL", 21600)),
+        page_ttl: int = int(os.getenv("WEB_PAGE_CACHE_TTL", 3600)),
+        page_max_age: int = int(os.getenv("WEB_PAGE_CACHE_MAX_AGE", 604800)),
+        concurrency: int = int(os.getenv("WEB_FETCH_CONCURRENCY", 8)),
+        pool_size: int = int(os.getenv("WEB_FETCH_POOL_SIZE", 16)),
+        timeout: float = float(os.getenv("WEB_FETCH_TIMEOUT", 15)),
+        max_redirects: int = 10,
+    ):
+        self.cache = cache
+        self.search_ttl = search_ttl
+        self.page_ttl = page_ttl
+        self.page_max_age = max(page_max_age, page_ttl)
+        self.concurrency = max(1, concurrency)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+
+        self._semaphore = threading.BoundedSemaphore(self.concurrency)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._outcomes: Dict[str, Dict[str, int]] = {SEARCH: {}, PAGE: {}}
+        self._upstream = {"requests": 0, "active": 0, "max_active": 0, "wait_seconds": 0.0}
+
+    def _get_session(self):
+        # crewai_tools paketi ağır olduğundan oturum ilk dış istekte kurulur.
+        with self._session_lock:
+            if self._session is None:
+                from crewai_tools.security.safe_requests import create_safe_session
+                from crewai_tools.security.ssrf_adapter import SSRFProtectedAdapter
+
+                session = create_safe_session()
+                adapter = SSRFProtectedAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _request(self, method: str, url: str, **kwargs):
+        session = self._get_session()
+        started = time.perf_counter()
+        with self._semaphore:
+            with self._lock:
+                self._upstream["wait_seconds"] += time.perf_counter() - started
+                self._upstream["requests"] += 1
+                self._upstream["active"] += 1
+                self._upstream["max_active"] = max(self._upstream["max_active"], self._upstream["active"])
+            try:
+                return session.request(method, url, timeout=kwargs.pop("timeout", self.timeout), allow_redirects=False, **kwargs)
+            finally:
+                with self._lock:
+                    self._upstream["active"] -= 1
+
+    def _get(self, url: str, headers: Dict[str, str], cookies: Optional[Dict[str, str]]):
+        from crewai_tools.security.safe_path import validate_url
+        from crewai_tools.security.safe_requests import _strip_cross_origin_credentials
+
+        current_url = validate_url(url)
+        for _ in range(self.max_redirects + 1):
+            response = self._request("GET", current_url, headers=headers, cookies=cookies or {})
+            location = response.headers.get("Location")
+            if response.status_code not in REDIRECT_STATUS_CODES or not location:
+                return response
+            response.close()
+            next_url = validate_url(urljoin(current_url, location))
+            if urlsplit(next_url)[:2] != urlsplit(current_url)[:2]:
+                # Başka kaynağa geçen yönlendirmede çerezler ve Authorization vb. hassas başlıklar düşülür;
+                # sonraki adımlar da kimlik bilgisi olmadan devam eder.
+                stripped = _strip_cross_origin_credentials({"headers": headers, "cookies": cookies})
+                headers, cookies = stripped.get("headers") or {}, None
+            current_url = next_url
+        raise ValueError(f"Too many redirects while fetching URL: {url}")
+
+    def post_json(self, url: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        response = self._request("POST", url, json=payload, headers=headers)
+        try:
+            response.raise_for_status()
+            return response.json()
+        finally:
+            response.close()
+
+    def _single_flight(self, key: str, produce: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+        try:
+            result = produce()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _record(self, kind: str, outcome: str) -> None:
+        WEB_CACHE_REQUESTS.labels(kind=kind, outcome=outcome).inc()
+        with self._lock:
+            self._outcomes[kind][outcome] = self._outcomes[kind].get(outcome, 0) + 1
+
+    def cached_search(self, key_parts: List[Any], produce: Callable[[], Any]) -> Any:
+        if self.cache is None:
+            return produce()
+        key = WebCache.make_key(SEARCH, key_parts)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._record(SEARCH, "hit")
+            return entry["result"]
+
+        def _refresh():
+            result = produce()
+            self.cache.set(key, {"result": result, "fetched_at": time.time()}, self.search_ttl)
+            self._record(SEARCH, "miss")
+            return result
+
+        return self._single_flight(key, _refresh)
+
+    def fetch_page(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        cookies: Optional[Dict[str, str]],
+        extract: Callable[[Any], str],
+    ) -> str:
+        # Çerez ya da Authorization vb. hassas başlıklarla okunan sayfalar kullanıcıya özel
+        # olabileceğinden (önbellek anahtarı yalnızca URL'dir) önbelleğe alınmaz.
+        if self.cache is None or _has_credentials(headers, cookies):
+            response = self._get(url, dict(headers or {}), cookies)
+            try:
+                return extract(response)
+            finally:
+                response.close()
+
+        key = WebCache.make_key(PAGE, [normalize_url(url)])
+        entry = self.cache.get(key)
+        if entry is not None and time.time() - entry["validated_at"] < self.page_ttl:
+            self._record(PAGE, "hit")
+            return entry["text"]
+        return self._single_flight(key, lambda: self._refresh_page(key, url, entry, dict(headers or {}), extract))
+
+    def _refresh_page(self, key: str, url: str, entry: Optional[Dict[str, Any]], headers: Dict[str, str], extract: Callable[[Any], str]) -> str:
+        target = url
+        if entry is not None:
+            target = entry.get("final_url") or url
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = self._get(target, headers, None)
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning(f"Sayfa yeniden doğrulanamadı, önbellekteki kopya kullanılıyor: {url}, Hata: {e}")
+            self._record(PAGE, "stale")
+            return entry["text"]
+
+        now = time.time()
+        try:
+            if response.status_code == 304 and entry is not None:
+                entry = {**entry, "validated_at": now}
+                outcome = "revalidated"
+            elif response.status_code >= 400:
+                # Hata sayfaları önbelleğe alınmaz; araç bunları önceden olduğu gibi ajana döndürür.
+                self._record(PAGE, "error")
+                return extract(response)
+            else:
+                digest = content_hash(response.content)
+                if entry is not None and entry.get("content_hash") == digest:
+                    text, outcome = entry["text"], "unchanged"
+                else:
+                    text, outcome = extract(response), ("changed" if entry is not None else "miss")
+                entry = {
+                    "url": url,
+                    "final_url": response.url,
+                    "text": text,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "content_hash": digest,
+                    "fetched_at": now,
+                    "validated_at": now,
+                }
+        finally:
+            response.close()
+        self.cache.set(key, entry, self.page_max_age)
+        self._record(PAGE, outcome)
+        return entry["text"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            upstream = dict(self._upstream)
+            outcomes = {kind: dict(values) for kind, values in self._outcomes.items()}
+        upstream["wait_seconds"] = round(upstream["wait_seconds"], 3)
+        return {
+            "enabled": self.cache is not None,
+            "cache": self.cache.stats() if self.cache else None,
+            "outcomes": outcomes,
+            "upstream": upstream,
+            "concurrency": self.concurrency,
+            "pool_size": self.pool_size,
+        }
+
+
+def create_web_fetcher() -> WebFetcher:
+    enabled = os.getenv("WEB_CACHE_ENABLED", "true").lower() == "true"
+    return WebFetcher(cache=WebCache() if enabled else None)
+
+
+web_fetcher = create_web_fetcher()
@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel, PrivateAttr
+from crewai.tools import BaseTool
+
+from tools.web_cache import normalize_query, normalize_url, web_fetcher
+from utils.metrics import TOOL_CALL_SECONDS, timed
+
+# crewai_tools'un içe aktarılması (embedchain, chromadb vb.) saniyeler sürdüğünden sınıflar
+# modül import edilirken değil, ilk erişildiklerinde oluşturulur (PEP 562 modül __getattr__).
+_TOOL_METRIC_LABELS = {
+    "SerperDevTool": "serper_search",
+    "WebsiteSearchTool": "website_search",
+    "ScrapeWebsiteTool": "scrape_website",
+}
+_tool_classes: Dict[str, Type[BaseTool]] = {}
+_tool_classes_lock = threading.Lock()
+
+
+def _extract_page_text(response) -> str:
+    # ScrapeWebsiteTool._run ile aynı çıkarım; ajana giden metin önbellekli yolda da değişmez.
+    from bs4 import BeautifulSoup
+
+    response.encoding = response.apparent_encoding
+    parsed = BeautifulSoup(response.text, "html.parser")
+    text = "The following text is scraped website content:\n\n"
+    text += parsed.get_text(" ")
+    text = re.sub("[ \t]+", " ", text)
+    return re.sub("\\s+\n\\s+", "\n", text)
+
+
+class _CachedSerperSearch:
+    # Serper isteği ortak havuzlu oturumdan gider ve normalize sorgu + arama parametreleriyle
+    # önbelleklenir; geri bildirim iterasyonları ve farklı istekler aynı aramayı tekrar ödemez.
+    def _make_api_request(self, search_query: str, search_type: str) -> Dict[str, Any]:
+        search_url = self._get_search_url(search_type)
+        payload = {"q": search_query, "num": self.n_results}
+        if self.country:
+            payload["gl"] = self.country
+        if self.location:
+            payload["location"] = self.location
+        if self.locale:
+            payload["hl"] = self.locale
+        headers = {"X-API-KEY": os.environ["SERPER_API_KEY"], "content-type": "application/json"}
+
+        def _search():
+            results = web_fetcher.post_json(search_url, payload, headers)
+            if not results:
+                raise ValueError("Empty response from Serper API")
+            return dict(results)
+
+        parameters = {key: value for key, value in payload.items() if key != "q"}
+        return web_fetcher.cached_search([search_url, normalize_query(search_query), parameters], _search)
+
+
+class _CachedScrapeWebsite:
+    # Sayfalar URL'ye göre önbelleklenir ve ETag / Last-Modified ile yeniden doğrulanır (bkz. tools/web_cache.py).
+    def _run(self, **kwargs: Any) -> Any:
+        website_url = kwargs.get("website_url", self.website_url)
+        if website_url is None:
+            raise ValueError("Website URL must be provided.")
+        return web_fetcher.fetch_page(website_url, self.headers, self.cookies, _extract_page_text)
+
+
+class _CachedWebsiteSearch:
+    # Site içi anlamsal arama sonucu (site, sorgu) çiftiyle önbelleklenir; isabette site yeniden
+    # indirilip embedding'lenmez. Site verilmeyen aramalar aracın biriktirdiği içeriğe bağlı
+    # olduğundan önbelleğe alınmaz.
+    def _run(self, search_query: str, website: Optional[str] = None, similarity_threshold: Optional[float] = None, limit: Optional[int] = None) -> str:
+        base_run = super()._run
+        if website is None:
+            return base_run(search_query, website, similarity_threshold, limit)
+        key_parts = ["website_search", normalize_url(website), normalize_query(search_query), similarity_threshold, limit]
+        return web_fetcher.cached_search(key_parts, lambda: base_run(search_query, website, similarity_threshold, limit))
+
+
+_CACHED_MIXINS = {
+    "SerperDevTool": _CachedSerperSearch,
+    "WebsiteSearchTool": _CachedWebsiteSearch,
+    "ScrapeWebsiteTool": _CachedScrapeWebsite,
+}
+
+
+def _timed_tool_class(name: str) -> Type[BaseTool]:
+    # crewai_tools web araçlarının süre ölçümlü ve önbellekli sürümleri; ajanlara görünen ad ve şema değişmez.
+    with _tool_classes_lock:
+        if name not in _tool_classes:
+            import crewai_tools
+
+            base = getattr(crewai_tools, name)
+            metric_label = _TOOL_METRIC_LABELS[name]
+
+            def _run(self, *args, **kwargs):
+                with timed(TOOL_CALL_SECONDS, tool=metric_label):
+                    return super(tool_class, self)._run(*args, **kwargs)
+
+            tool_class = type(name, (_CACHED_MIXINS[name], base), {"__module__": __name__, "_run": _run})
+            _tool_classes[name] = tool_class
+        return _tool_classes[name]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _TOOL_METRIC_LABELS:
+        return _timed_tool_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazyTool(BaseTool):
+    # Asıl aracı ajan onu ilk kez çağırdığında kurar. WebsiteSearchTool gibi araçlar kurulurken
+    # kendi embedding/vektör yığınlarını hazırlar; ajan bu araçları hiç kullanmayabileceği için
+    # ekip kurulumunu (ve ekip havuzundaki her demeti) bu maliyetten kurtarır. Ajana görünen ad,
+    # açıklama ve argüman şeması asıl aracın sınıfından alınır.
+    _tool_class: Type[BaseTool] = PrivateAttr()
+    _tool_kwargs: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _tool: Optional[BaseTool] = PrivateAttr(default=None)
+    _tool_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def of(cls, tool_class: Type[BaseTool], **tool_kwargs) -> "LazyTool":
+        fields = tool_class.model_fields
+        metadata = {"name": fields["name"].default, "description": fields["description"].default}
+        args_schema = fields["args_schema"].default
+        if isinstance(args_schema, type) and issubclass(args_schema, BaseModel):
+            metadata["args_schema"] = args_schema
+        proxy = cls(**metadata)
+        proxy._tool_class = tool_class
+        proxy._tool_kwargs = tool_kwargs
+        return proxy
+
+    def _get_tool(self) -> BaseTool:
+        with self._tool_lock:
+            if self._tool is None:
+                self._tool = self._tool_class(**self._tool_kwargs)
+            return self._tool
+
+    def _run(self, *args, **kwargs):
+        return self._get_tool()._run(*args, **kwargs)
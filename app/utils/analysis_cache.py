@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from cryptography.fernet import Fernet, InvalidToken
+
+from utils.redis_client import create_redis_client, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+
+def build_config_fingerprint(parts: Sequence[Any], config_paths: Sequence[str]) -> str:
+    # Görev / ajan tanımları (prompt'lar) ya da model değiştiğinde eski analizler yeniden
+    # kullanılmasın diye yapılandırma dosyalarının içerik özeti de parmak izine katılır.
+    digest = hashlib.sha256()
+    for path in config_paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return ":".join(str(part) for part in parts) + f":{digest.hexdigest()[:16]}"
+
+
+class AnalysisResultCache:
+    # Netleştirilmiş vaka metni + pipeline/konfigürasyon sürümüne göre tam analiz sonuçlarını saklar.
+    # Varsayılan olarak kapalıdır (ANALYSIS_CACHE_ENABLED); aynı vakaya dönen rapor, prompt ya da
+    # araç verisi güncellense bile TTL boyunca eski kalır.
+    # Kayıtlar Redis'te şifreli tutulur; isteğe bağlı anlamsal katman, embedding benzerliği
+    # eşiği aşan daha önceki bir vakanın analizini yeniden kullanır.
+    KEY_PREFIX = "analysis_cache"
+    SEMANTIC_WINDOW_CHARS = 500
+
+    def __init__(
+        self,
+        config_fingerprint: str,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        enabled: bool = os.getenv("ANALYSIS_CACHE_ENABLED", "false").lower() == "true",
+        ttl: int = int(os.getenv("ANALYSIS_CACHE_TTL", 86400)),
+        max_entries: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 1000)),
+        semantic_enabled: bool = os.getenv("ANALYSIS_CACHE_SEMANTIC", "false").lower() == "true",
+        semantic_threshold: float = float(os.getenv("ANALYSIS_CACHE_SEMANTIC_THRESHOLD", 0.97)),
+    ):
+        self.config_fingerprint = config_fingerprint
+        self.embed_fn = embed_fn
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.semantic_enabled = semantic_enabled
+        self.semantic_threshold = semantic_threshold
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._redis = None
+        self._redis_checked = False
+        self._lock = threading.Lock()
+        self._fernet_instance: Optional[Fernet] = None
+
+    @property
+    def _fernet(self) -> Fernet:
+        # Anahtar ilk kullanımda (yalnızca önbellek açıkken) yüklenir; kapalıyken uyarı basılmaz.
+        if self._fernet_instance is None:
+            with self._lock:
+                if self._fernet_instance is None:
+                    self._fernet_instance = Fernet(self._load_encryption_key())
+        return self._fernet_instance
+
+    def _load_encryption_key(self) -> bytes:
+        key = os.getenv("ANALYSIS_CACHE_KEY")
+        if key:
+            return key.encode("utf-8")
+        logger.warning("ANALYSIS_CACHE_KEY ayarlanmamış. Süreç ömrüyle sınırlı geçici bir anahtar kullanılacak.")
+        return Fernet.generate_key()
+
+    def _get_redis(self):
+        if not self.enabled:
+            return None
+        # Ortak havuz, Redis erişilemezken bekleme süresi boyunca hızlıca None döner ve
+        # Redis geri geldiğinde yeniden bağlanır; önbellek o süre içinde devre dışı kalır.
+        self._redis = create_redis_client(decode_responses=False)
+        self._redis_checked = True
+        return self._redis
+
+    def _entry_key(self, digest: str) -> str:
+        return f"{self.KEY_PREFIX}:entry:{digest}"
+
+    def _embedding_key(self, digest: str) -> str:
+        return f"{self.KEY_PREFIX}:emb:{digest}"
+
+    @property
+    def _lru_key(self) -> str:
+        return f"{self.KEY_PREFIX}:lru:{self.config_fingerprint}"
+
+    def make_digest(self, clarified_text: str) -> str:
+        normalized = " ".join(clarified_text.lower().split())
+        return hashlib.sha256(f"{self.config_fingerprint}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, clarified_text: str) -> Optional[Dict[str, Any]]:
+        r = self._get_redis()
+        if not r or not clarified_text:
+            return None
+
+        try:
+            digest = self.make_digest(clarified_text)
+            report = self._load_entry(r, digest)
+            if report is not None:
+                self._record("exact_hits")
+                logger.info(f"[CACHE] Analiz önbelleğinde birebir eşleşme bulundu: {digest[:12]}")
+                return report
+
+            if self.semantic_enabled and self.embed_fn:
+                match = self._find_semantic_match(r, clarified_text)
+                if match:
+                    match_digest, similarity = match
+                    report = self._load_entry(r, match_digest)
+                    if report is not None:
+                        self._record("semantic_hits")
+                        logger.info(f"[CACHE] Analiz önbelleğinde anlamsal eşleşme bulundu: {match_digest[:12]} (benzerlik: {similarity:.4f})")
+                        return report
+        except Exception as e:
+            report_redis_error(e, decode_responses=False)
+            logger.warning(f"[CACHE] Analiz önbelleği okunamadı: {e}")
+
+        self._record("misses")
+        return None
+
+    def set(self, clarified_text: str, report: Dict[str, Any]) -> None:
+        r = self._get_redis()
+        if not r or not clarified_text:
+            return
+
+        try:
+            digest = self.make_digest(clarified_text)
+            token = self._fernet.encrypt(json.dumps(report, ensure_ascii=False, default=str).encode("utf-8"))
+
+            pipe = r.pipeline(transaction=False)
+            pipe.set(self._entry_key(digest), token, ex=self.ttl)
+            if self.semantic_enabled and self.embed_fn:
+                vector = self._embed_document(clarified_text)
+                pipe.set(self._embedding_key(digest), vector.tobytes(), ex=self.ttl)
+            pipe.zadd(self._lru_key, {digest: time.time()})
+            pipe.execute()
+
+            self._evict(r)
+        except Exception as e:
+            report_redis_error(e, decode_responses=False)
+            logger.warning(f"[CACHE] Analiz önbelleğe yazılamadı: {e}")
+
+    def _load_entry(self, r, digest: str) -> Optional[Dict[str, Any]]:
+        token = r.get(self._entry_key(digest))
+        if not token:
+            r.zrem(self._lru_key, digest)
+            return None
+        try:
+            report = json.loads(self._fernet.decrypt(token).decode("utf-8"))
+        except InvalidToken:
+            # Farklı bir anahtarla (ör. yeniden başlatma öncesi) yazılmış kayıt.
+            return None
+        r.zadd(self._lru_key, {digest: time.time()})
+        return report
+
+    def _evict(self, r) -> None:
+        overflow = r.zcard(self._lru_key) - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = [member for member, _ in r.zpopmin(self._lru_key, overflow)]
+        if evicted:
+            digests = [member.decode("utf-8") if isinstance(member, bytes) else member for member in evicted]
+            r.delete(*[self._entry_key(d) for d in digests], *[self._embedding_key(d) for d in digests])
+            logger.info(f"[CACHE] LRU tahliyesi: {len(digests)} analiz kaydı silindi.")
+
+    def _embed_document(self, text: str) -> np.ndarray:
+        # MiniLM yalnızca ilk ~128 token'ı kodlar; metnin tamamını temsil etmesi için
+        # pencerelerin ortalaması alınır.
+        windows = [
+            text[i:i + self.SEMANTIC_WINDOW_CHARS]
+            for i in range(0, len(text), self.SEMANTIC_WINDOW_CHARS)
+        ] or [text]
+        vectors = np.asarray(self.embed_fn(windows), dtype=np.float32)
+        mean = vectors.mean(axis=0)
+        norm = np.linalg.norm(mean)
+        return (mean / norm if norm else mean).astype(np.float32)
+
+    def _find_semantic_match(self, r, clarified_text: str):
+        digests = [d.decode("utf-8") if isinstance(d, bytes) else d for d in r.zrange(self._lru_key, 0, -1)]
+        if not digests:
+            return None
+
+        raw_vectors = r.mget([self._embedding_key(d) for d in digests])
+        candidates = [(d, raw) for d, raw in zip(digests, raw_vectors) if raw]
+        if not candidates:
+            return None
+
+        query = self._embed_document(clarified_text)
+        matrix = np.stack([np.frombuffer(raw, dtype=np.float32) for _, raw in candidates])
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.semantic_threshold:
+            return candidates[best][0], float(similarities[best])
+        return None
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        r = self._redis
+        if r:
+            try:
+                r.hincrby(f"{self.KEY_PREFIX}:stats", counter, 1)
+            except Exception as e:
+                report_redis_error(e, decode_responses=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "enabled": self.enabled and (self._redis is not None or not self._redis_checked),
+            "semantic": self.semantic_enabled,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,181 @@
+import time
+import json
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.metrics import get_request_id, request_id_context
+from utils.rate_limit import BATCH, RateLimitGate, llm_priority, openai_rate_limit
+
+logger = logging.getLogger(__name__)
+
+
+class BatchInputError(ValueError):
+    pass
+
+
+class BatchCase:
+    def __init__(self, index: int, case_id: str, text: str):
+        self.index = index
+        self.case_id = case_id
+        self.text = text
+
+
+def parse_batch_cases(items: Any, max_cases: int) -> List[BatchCase]:
+    # Her öğe ya vaka metnidir ya da {"id": ..., "legal_case": ...} nesnesidir; id verilmezse sıra numarası kullanılır.
+    if not isinstance(items, list) or not items:
+        raise BatchInputError("cases boş olmayan bir liste olmalıdır.")
+    if len(items) > max_cases:
+        raise BatchInputError(f"Tek seferde en fazla {max_cases} vaka gönderilebilir ({len(items)} gönderildi).")
+
+    cases = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            case_id, text = str(index), item
+        elif isinstance(item, dict):
+            case_id, text = str(item.get("id", index)), item.get("legal_case", "")
+        else:
+            raise BatchInputError(f"{index}. vaka metin veya nesne olmalıdır.")
+        if not isinstance(text, str) or not text.strip():
+            raise BatchInputError(f"{index}. vakada legal_case verisi zorunludur.")
+        cases.append(BatchCase(index, case_id, text))
+    return cases
+
+
+def parse_jsonl_cases(content: str, max_cases: int) -> List[BatchCase]:
+    items = []
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError:
+            raise BatchInputError(f"JSONL dosyasının {line_number}. satırı geçerli JSON değil.")
+    return parse_batch_cases(items, max_cases)
+
+
+class BatchAnalysisRunner:
+    # Toplu analiz vakalarını süreç genelinde ortak, eşzamanlılığı sınırlı bir havuzda çalıştırır.
+    # Aynı anda gelen birden fazla toplu istek de aynı havuzu paylaşır; böylece LLM eşzamanlılığı
+    # max_concurrency'yi aşmaz. Her vaka başlamadan önce ortak hız sınırı kapısı beklenir; vakaların
+    # LLM çağrıları "batch" önceliğiyle kotaya girer ve etkileşimli isteklerin önüne geçmez.
+    # Eş zamanlı vakaların embedding ve Qdrant aramaları EmbeddingService ve arama aracındaki
+    # mikro-batcher'larda birleştirilir.
+    def __init__(
+        self,
+        handler: Callable[[str], Any],
+        max_concurrency: int = 2,
+        max_cases: int = 500,
+        heartbeat_seconds: float = 15,
+        rate_limit: RateLimitGate = openai_rate_limit,
+    ):
+        self.handler = handler
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_cases = max_cases
+        self.heartbeat_seconds = heartbeat_seconds
+        self.rate_limit = rate_limit
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._active_batches = 0
+        self._totals = {"batches": 0, "cases": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Havuz ilk toplu istekte kurulur, import sırasında thread açılmaz.
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="batch-analysis")
+                logger.info(f"[BATCH] {self.max_concurrency} eşzamanlı toplu analiz worker'ı başlatıldı.")
+            return self._executor
+
+    def _run_case(self, case: BatchCase, request_id: str) -> Dict[str, Any]:
+        waited = self.rate_limit.wait()
+        started = time.perf_counter()
+        row: Dict[str, Any] = {"type": "case", "index": case.index, "id": case.case_id}
+        try:
+            with request_id_context(f"{request_id}:{case.index}"), llm_priority(BATCH):
+                result = self.handler(case.text)
+            row.update(status="completed", result=result)
+        except Exception as e:
+            logger.error(f"[BATCH] Vaka başarısız oldu: {case.case_id}, Hata: {str(e)}", exc_info=True)
+            row.update(status="failed", error="Analiz sırasında sunucuda beklenmedik bir hata oluştu.")
+        row["seconds"] = round(time.perf_counter() - started, 3)
+        if waited:
+            row["rate_limit_wait_seconds"] = round(waited, 3)
+        return row
+
+    def run(self, cases: List[BatchCase]) -> Iterator[Dict[str, Any]]:
+        # Vaka sonuçları bittikleri sırayla üretilir (index alanı gönderim sırasıdır); uzun süren
+        # vakalarda bağlantı boşta kalmasın diye heartbeat satırları, en sonda özet satırı gelir.
+        # Üreteç erken kapatılırsa (istemci bağlantıyı kesti) henüz başlamamış vakalar iptal edilir.
+        executor = self._get_executor()
+        request_id = get_request_id() or "batch"
+        started = time.perf_counter()
+        statuses: Dict[int, Dict[str, Any]] = {
+            case.index: {"index": case.index, "id": case.case_id, "status": "queued"} for case in cases
+        }
+        with self._stats_lock:
+            self._active_batches += 1
+            self._totals["batches"] += 1
+            self._totals["cases"] += len(cases)
+
+        pending: Dict[Future, BatchCase] = {executor.submit(self._run_case, case, request_id): case for case in cases}
+        logger.info(f"[BATCH] {len(cases)} vaka kuyruğa alındı (eşzamanlılık: {self.max_concurrency}).")
+        try:
+            while pending:
+                done, _ = wait(list(pending), timeout=self.heartbeat_seconds, return_when=FIRST_COMPLETED)
+                if not done:
+                    yield {"type": "heartbeat", "finished": len(cases) - len(pending), "total": len(cases)}
+                    continue
+                for future in done:
+                    case = pending.pop(future)
+                    row = future.result()
+                    statuses[case.index].update(status=row["status"], seconds=row["seconds"])
+                    self._count(row["status"])
+                    yield row
+        finally:
+            for future, case in pending.items():
+                if future.cancel():
+                    statuses[case.index]["status"] = "cancelled"
+                    self._count("cancelled")
+            with self._stats_lock:
+                self._active_batches -= 1
+
+        elapsed = time.perf_counter() - started
+        summary = self._summary(list(statuses.values()), elapsed)
+        logger.info(
+            f"[BATCH] Toplu analiz tamamlandı: {summary['completed']}/{summary['total']} başarılı, "
+            f"{summary['elapsed_seconds']}s, {summary['cases_per_minute']} vaka/dk."
+        )
+        yield summary
+
+    def _count(self, status: str) -> None:
+        with self._stats_lock:
+            self._totals[status] += 1
+
+    def _summary(self, statuses: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        completed = [row for row in statuses if row["status"] == "completed"]
+        case_seconds = [row["seconds"] for row in statuses if "seconds" in row]
+        return {
+            "type": "summary",
+            "total": len(statuses),
+            "completed": len(completed),
+            "failed": sum(1 for row in statuses if row["status"] == "failed"),
+            "elapsed_seconds": round(elapsed, 3),
+            "cases_per_minute": round(len(completed) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "avg_case_seconds": round(sum(case_seconds) / len(case_seconds), 3) if case_seconds else 0.0,
+            "concurrency": self.max_concurrency,
+            "rate_limit": self.rate_limit.stats(),
+            "cases": statuses,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "concurrency": self.max_concurrency,
+                "max_cases": self.max_cases,
+                "active_batches": self._active_batches,
+                **self._totals,
+            }
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.token_counter import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = " […]"
+# Bütçenin sonunda kalan bu kadar tokenden kısa bir parça ajana anlamlı bilgi taşımaz, eklenmez.
+MIN_HIT_TOKENS = 50
+_MARKDOWN_HEADER = re.compile(r"^#{1,4} .+$", re.MULTILINE)
+
+
+def allocate_budget(sizes: Sequence[int], budget: int, weights: Optional[Sequence[float]] = None) -> List[int]:
+    # Bütçe bölümlere ağırlıklarıyla orantılı dağıtılır; payından kısa kalan bölüm olduğu gibi
+    # tutulur ve artan bütçe kalan bölümlere yeniden dağıtılır (water-filling).
+    weights = list(weights or [1.0] * len(sizes))
+    allocation = [0] * len(sizes)
+    open_rows = [row for row, size in enumerate(sizes) if size > 0]
+    remaining = budget
+    while open_rows and remaining > 0:
+        total_weight = sum(weights[row] for row in open_rows) or 1.0
+        shares = {row: int(remaining * weights[row] / total_weight) for row in open_rows}
+        fitting = [row for row in open_rows if sizes[row] <= shares[row]]
+        if not fitting:
+            for row in open_rows:
+                allocation[row] = shares[row]
+            break
+        for row in fitting:
+            allocation[row] = sizes[row]
+            remaining -= sizes[row]
+            open_rows.remove(row)
+    return allocation
+
+
+def _split_markdown_sections(text: str) -> List[str]:
+    starts = [match.start() for match in _MARKDOWN_HEADER.finditer(text)]
+    if not starts:
+        return [text]
+    if starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+class ContextBudget:
+    # Ekipler arasında taşınan metinleri (arama çıktıları, geri bildirim önerileri, yeniden
+    # kullanılan dal çıktıları) tiktoken ile sayıp yapılandırılabilir token bütçelerine sığdırır.
+    # Sıkıştırma LLM çağrısı yapmaz: markdown başlıklı metinlerde her başlığın başı korunarak
+    # bölümler orantılı kırpılır, diğer metinler baştan kırpılır. Amaç her iterasyonda büyüyen
+    # prompt'ları sabit bir üst sınırda tutmaktır.
+    def __init__(
+        self,
+        feedback_tokens: int = int(os.getenv("CONTEXT_BUDGET_FEEDBACK_TOKENS", 3000)),
+        suggestion_tokens: int = int(os.getenv("CONTEXT_BUDGET_SUGGESTION_TOKENS", 600)),
+        reused_branch_tokens: int = int(os.getenv("CONTEXT_BUDGET_REUSED_BRANCH_TOKENS", 1200)),
+        model: str = "gpt-4o-mini",
+    ):
+        self.feedback_tokens = feedback_tokens
+        self.suggestion_tokens = suggestion_tokens
+        self.reused_branch_tokens = reused_branch_tokens
+        self.model = model
+        self._lock = threading.Lock()
+        self._stats = {"compactions": 0, "input_tokens": 0, "output_tokens": 0}
+
+    def _record(self, before: int, after: int) -> None:
+        with self._lock:
+            self._stats["compactions"] += 1
+            self._stats["input_tokens"] += before
+            self._stats["output_tokens"] += after
+
+    def compact_text(self, text: str, max_tokens: int) -> str:
+        text = text or ""
+        size = count_tokens(text, self.model)
+        if max_tokens <= 0 or size <= max_tokens:
+            return text
+        compacted = self._compact(text, max_tokens)
+        self._record(size, count_tokens(compacted, self.model))
+        return compacted
+
+    def _compact(self, text: str, max_tokens: int) -> str:
+        sections = _split_markdown_sections(text)
+        marker_tokens = count_tokens(TRUNCATION_MARKER, self.model)
+        sizes = [count_tokens(section, self.model) for section in sections]
+        allocation = allocate_budget(sizes, max_tokens - marker_tokens * len(sections))
+        parts = []
+        for section, section_size, section_budget in zip(sections, sizes, allocation):
+            if section_budget >= section_size:
+                parts.append(section)
+            elif section_budget > 0:
+                parts.append(truncate_tokens(section, section_budget, self.model).rstrip() + TRUNCATION_MARKER + "\n\n")
+        return "".join(parts).strip()
+
+    def compact_sections(self, sections: Sequence[Tuple[str, str, float]], max_tokens: int) -> str:
+        # sections: (başlık, metin, ağırlık). Başlıklar her zaman korunur, metinler bütçeye sığdırılır.
+        headers = [f"### {title}\n" for title, _, _ in sections]
+        texts = [text or "" for _, text, _ in sections]
+        sizes = [count_tokens(text, self.model) for text in texts]
+        before = sum(sizes)
+        if max_tokens <= 0 or before <= max_tokens:
+            return "\n\n".join(header + text for header, text in zip(headers, texts))
+        available = max_tokens - sum(count_tokens(header, self.model) for header in headers)
+        allocation = allocate_budget(sizes, available, [weight for _, _, weight in sections])
+        parts = [
+            header + (text if budget >= size else self._compact(text, budget))
+            for header, text, size, budget in zip(headers, texts, sizes, allocation)
+        ]
+        compacted = "\n\n".join(parts)
+        self._record(before, count_tokens(compacted, self.model))
+        return compacted
+
+    def compact_search_output(self, search_data: Any) -> str:
+        # Geri bildirim ekibine arama ekibinin tüm çıktı sözlüğü (token_usage, json_dict, tekrar
+        # eden raw alanları) yerine yalnızca görev çıktılarının metni verilir. Doğrulama görevinin
+        # çıktısı değerlendirilen asıl metin olduğu için kırpılmaz; bütçe yalnızca RAG / web dal
+        # çıktılarına uygulanır.
+        if not isinstance(search_data, dict):
+            return str(search_data)
+        task_outputs = search_data.get("tasks_output") or []
+        if not task_outputs:
+            return str(search_data.get("raw", ""))
+
+        sections = []
+        for position, task_output in enumerate(task_outputs):
+            if not isinstance(task_output, dict):
+                task_output = {"raw": str(task_output)}
+            title = task_output.get("name") or task_output.get("agent") or f"Görev {position + 1}"
+            raw = task_output.get("raw")
+            if not raw and task_output.get("json_dict"):
+                raw = json.dumps(task_output["json_dict"], ensure_ascii=False)
+            sections.append((str(title), str(raw or ""), 1.0))
+        *branch_sections, (validation_title, validation_text, _) = sections
+        parts = [self.compact_sections(branch_sections, self.feedback_tokens)] if branch_sections else []
+        parts.append(f"### {validation_title}\n{validation_text}")
+        return "\n\n".join(parts)
+
+    def compact_suggestions(self, text: str) -> str:
+        return self.compact_text(text, self.suggestion_tokens)
+
+    def compact_reused_branch(self, text: str) -> str:
+        return self.compact_text(text, self.reused_branch_tokens)
+
+    def fit_hits(self, hits: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+        # Sonuçlar aramanın sıralamasıyla (skor / hibrit sıra) gelir ve bütçe dolana kadar eklenir;
+        # bütçeyi aşan ilk sonucun metni kırpılır, kalanlar atılır. En az bir sonuç (kırpılmış da olsa) döner.
+        if max_tokens <= 0 or not hits:
+            return hits
+        ranked = list(hits)
+        sizes = [count_tokens(hit.get("text", ""), self.model) for hit in ranked]
+        if sum(sizes) <= max_tokens:
+            return ranked
+
+        fitted, remaining = [], max_tokens
+        for hit, size in zip(ranked, sizes):
+            if size <= remaining:
+                fitted.append(hit)
+                remaining -= size
+                continue
+            if remaining >= MIN_HIT_TOKENS or not fitted:
+                text = truncate_tokens(hit.get("text", ""), max(remaining, 1), self.model).rstrip()
+                fitted.append({**hit, "text": text + TRUNCATION_MARKER, "truncated": True})
+            break
+        self._record(sum(sizes), sum(count_tokens(hit.get("text", ""), self.model) for hit in fitted))
+        return fitted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["saved_tokens"] = stats["input_tokens"] - stats["output_tokens"]
+        stats["budgets"] = {
+            "feedback": self.feedback_tokens,
+            "suggestions": self.suggestion_tokens,
+            "reused_branch": self.reused_branch_tokens,
+        }
+        return stats
+
+
+context_budget = ContextBudget()
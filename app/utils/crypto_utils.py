@@ -6,49 +6,98 @@ import redis
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.backends import default_backend
+import time
 import logging
-from typing import Tuple, Any
+import threading
+from typing import Tuple, Any, Dict, Iterator, List, NamedTuple, Optional
+
+from utils.lru_cache import LRUCache
+from utils.redis_client import get_redis_manager
+from utils.metrics import CRYPTO_OPERATION_SECONDS, timed
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# v1: tek parça AES-CBC (oturum başına sabit IV). v2: oturum anahtarından HKDF ile türetilen
+# AES-256-GCM anahtarı, mesaj başına rastgele nonce öneki ve sabit boyutlu parçalar.
+LEGACY_PROTOCOL_VERSION = 1
+GCM_PROTOCOL_VERSION = 2
+GCM_KEY_INFO = b"legal-analysis/aes-256-gcm/v2"
+GCM_NONCE_PREFIX_BYTES = 8
+GCM_CHUNK_SIZE = int(os.getenv("CRYPTO_CHUNK_SIZE", 64 * 1024))
+
+
+class SessionCiphers(NamedTuple):
+    cbc: Cipher
+    gcm: AESGCM
+
+
+def encryption_protocol_version(encrypted_data: Any) -> int:
+    if isinstance(encrypted_data, dict) and encrypted_data.get('v') == GCM_PROTOCOL_VERSION:
+        return GCM_PROTOCOL_VERSION
+    return LEGACY_PROTOCOL_VERSION
+
+
 class RedisCryptoManager:
-    _redis_client: redis.Redis = None
-    
     RSA_PRIVATE_KEY_NAME = "crypto:rsa_private_key"
     RSA_PUBLIC_KEY_NAME = "crypto:rsa_public_key"
     AES_KEY_TTL = 3600
+    AES_KEY_PREFIX = "aes_key"
+    AES_IV_PREFIX = "aes_iv"
 
-    def __init__(self):
-        self._get_redis_client()
-        self._initialize_rsa_keys()
+    def __init__(
+        self,
+        key_cache_ttl: float = float(os.getenv("CRYPTO_KEY_CACHE_TTL", 300)),
+        session_cache_size: int = int(os.getenv("CRYPTO_SESSION_CACHE_SIZE", 1024)),
+        session_cache_ttl: float = float(os.getenv("CRYPTO_SESSION_CACHE_TTL", 300)),
+    ):
+        # Çözülmüş RSA private key süreç belleğinde tutulur; başka bir replika anahtarı
+        # döndürdüğünde en geç key_cache_ttl saniye sonra Redis'ten yeniden yüklenir.
+        self.key_cache_ttl = key_cache_ttl
+        self.session_cache_ttl = session_cache_ttl
+        self._private_key = None
+        self._private_key_loaded_at = 0.0
+        self._key_lock = threading.Lock()
+        self._session_ciphers = LRUCache(maxsize=session_cache_size, ttl=session_cache_ttl)
+
+        # Import sırasında Redis'e bağlanılmaz ve anahtar üretilmez; ikisi de ilk kullanımda yapılır.
+        self._redis = get_redis_manager(decode_responses=True)
+        self._rsa_keys_ready = False
 
     def _get_redis_client(self):
-        if not RedisCryptoManager._redis_client:
+        r = self._redis.get_client()
+        if r and not self._rsa_keys_ready:
             try:
-                redis_host = os.getenv("REDIS_HOST", "localhost")
-                redis_port = int(os.getenv("REDIS_PORT", 6379))
-                logger.info(f"Redis bağlantısı kuruluyor: {redis_host}:{redis_port}")
-                RedisCryptoManager._redis_client = redis.Redis(
-                    host=redis_host, 
-                    port=redis_port, 
-                    decode_responses=True
-                )
-                RedisCryptoManager._redis_client.ping()
-                logger.info("Redis bağlantısı başarılı.")
-            except redis.exceptions.ConnectionError as e:
-                logger.error(f"Redis bağlantısı kurulamadı: {e}", exc_info=True)
-                RedisCryptoManager._redis_client = None
-        return RedisCryptoManager._redis_client
+                self._initialize_rsa_keys()
+            except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+                self._redis.report_failure(e)
+                return None
+        return r
+
+    def _report_redis_error(self, error: Exception) -> None:
+        if isinstance(error, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            self._redis.report_failure(error)
+
+    def ensure_ready(self) -> bool:
+        return self._get_redis_client() is not None and self._rsa_keys_ready
 
+    @timed(CRYPTO_OPERATION_SECONDS, operation="rsa_key_init")
     def _initialize_rsa_keys(self, force_new=False):
-        r = self._get_redis_client()
+        r = self._redis.get_client()
         if not r:
             logger.error("RSA anahtarı oluşturulamadı çünkü Redis bağlantısı kurulamadı.")
             return
 
-        if force_new or not r.exists(self.RSA_PRIVATE_KEY_NAME):
+        with self._key_lock:
+            if self._rsa_keys_ready and not force_new:
+                return
+            if not force_new and r.exists(self.RSA_PRIVATE_KEY_NAME):
+                self._rsa_keys_ready = True
+                return
+
             private_key = rsa.generate_private_key(
                 public_exponent=65537,
                 key_size=2048,
@@ -67,15 +116,51 @@ class RedisCryptoManager:
                 format=serialization.PublicFormat.SubjectPublicKeyInfo
             ).decode('utf-8')
 
-            r.set(self.RSA_PRIVATE_KEY_NAME, private_pem)
-            r.set(self.RSA_PUBLIC_KEY_NAME, public_pem)
-            logger.info("Redis'e RSA anahtarı başarıyla kaydedildi.")
+            pipe = r.pipeline(transaction=True)
+            # Aynı anda açılan replikalardan yalnızca birinin anahtarı yazılır.
+            pipe.set(self.RSA_PRIVATE_KEY_NAME, private_pem, nx=not force_new)
+            pipe.set(self.RSA_PUBLIC_KEY_NAME, public_pem, nx=not force_new)
+            written, _ = pipe.execute()
+            self._rsa_keys_ready = True
+            self._private_key = None
+            self._private_key_loaded_at = 0.0
+            if written:
+                logger.info("Redis'e RSA anahtarı başarıyla kaydedildi.")
+
+    def reload_keys(self) -> None:
+        # Anahtar döndürüldüğünde çağrılır; bir sonraki anahtar değişiminde PEM yeniden yüklenir.
+        with self._key_lock:
+            self._private_key = None
+            self._private_key_loaded_at = 0.0
+
+    def _get_private_key(self, r):
+        with self._key_lock:
+            if self._private_key and time.monotonic() - self._private_key_loaded_at < self.key_cache_ttl:
+                return self._private_key
+
+            private_key_pem = r.get(self.RSA_PRIVATE_KEY_NAME)
+            if not private_key_pem:
+                logger.error("RSA private key Redis'te bulunamadı.")
+                return None
+
+            self._private_key = serialization.load_pem_private_key(
+                private_key_pem.encode('utf-8'),
+                password=None,
+                backend=default_backend()
+            )
+            self._private_key_loaded_at = time.monotonic()
+            return self._private_key
 
     def get_public_key_and_session(self) -> Tuple[str, str]:
         r = self._get_redis_client()
         if not r: return None, None
 
-        public_key_pem = r.get(self.RSA_PUBLIC_KEY_NAME)
+        try:
+            public_key_pem = r.get(self.RSA_PUBLIC_KEY_NAME)
+        except redis.exceptions.RedisError as e:
+            self._report_redis_error(e)
+            logger.error(f"RSA public key Redis'ten okunamadı: {e}")
+            return None, None
         if not public_key_pem:
             logger.error("RSA public key Redis'te bulunamadı.")
             return None, None
@@ -83,21 +168,15 @@ class RedisCryptoManager:
         session_id = str(uuid.uuid4())
         return public_key_pem, session_id
 
+    @timed(CRYPTO_OPERATION_SECONDS, operation="rsa_decrypt_session_key")
     def store_and_decrypt_aes_key(self, encrypted_key_base64: str, session_id: str) -> bool:
         r = self._get_redis_client()
         if not r: return False
 
         try:
-            private_key_pem = r.get(self.RSA_PRIVATE_KEY_NAME)
-            if not private_key_pem:
-                logger.error("RSA private key Redis'te bulunamadı.")
+            private_key = self._get_private_key(r)
+            if not private_key:
                 return False
-
-            private_key = serialization.load_pem_private_key(
-                private_key_pem.encode('utf-8'),
-                password=None,
-                backend=default_backend()
-            )
             
             encrypted_key = base64.b64decode(encrypted_key_base64)
             decrypted_bytes = private_key.decrypt(
@@ -111,35 +190,83 @@ class RedisCryptoManager:
             
             key_data = json.loads(decrypted_bytes.decode('utf-8'))
             
-            r.set(f"aes_key:{session_id}", key_data['key'], ex=self.AES_KEY_TTL)
-            r.set(f"aes_iv:{session_id}", key_data['iv'], ex=self.AES_KEY_TTL)
+            # Anahtar düzeni eski sürümle aynıdır (kademeli dağıtımda replikalar birbirinin
+            # oturumlarını okuyabilsin); iki yazma tek gidiş-dönüşte yapılır.
+            pipe = r.pipeline(transaction=False)
+            pipe.set(f"{self.AES_KEY_PREFIX}:{session_id}", key_data['key'], ex=self.AES_KEY_TTL)
+            pipe.set(f"{self.AES_IV_PREFIX}:{session_id}", key_data['iv'], ex=self.AES_KEY_TTL)
+            pipe.execute()
+            self._cache_cipher(session_id, key_data['key'], key_data['iv'], self.AES_KEY_TTL)
             
             logger.info(f"Başarıyla AES anahtarı çözüldü ve Redis'e kaydedildi: {session_id}")
             return True
         except Exception as e:
+            self._report_redis_error(e)
             logger.error(f"Hata: {session_id}: {e}", exc_info=True)
             return False
 
-    def _get_aes_cipher(self, session_id: str):
+    def _cache_cipher(self, session_id: str, key_b64: str, iv_b64: str, remaining_ttl: Optional[float]) -> SessionCiphers:
+        aes_key = base64.b64decode(key_b64)
+        gcm_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=GCM_KEY_INFO,
+            backend=default_backend()
+        ).derive(aes_key)
+        cipher = SessionCiphers(
+            cbc=Cipher(
+                algorithms.AES(aes_key),
+                modes.CBC(base64.b64decode(iv_b64)),
+                backend=default_backend()
+            ),
+            gcm=AESGCM(gcm_key),
+        )
+        # Önbellekteki kayıt, Redis'teki oturum anahtarından daha uzun yaşamaz.
+        ttl = self.session_cache_ttl
+        if remaining_ttl is not None and remaining_ttl > 0:
+            ttl = min(ttl, remaining_ttl)
+        if ttl > 0:
+            self._session_ciphers.set(session_id, cipher, ttl=ttl)
+        return cipher
+
+    def _get_aes_cipher(self, session_id: str) -> Optional[Cipher]:
+        ciphers = self._get_session_ciphers(session_id)
+        return ciphers.cbc if ciphers else None
+
+    def _get_session_ciphers(self, session_id: str) -> Optional[SessionCiphers]:
+        cipher = self._session_ciphers.get(session_id)
+        if cipher:
+            return cipher
+
         r = self._get_redis_client()
         if not r: return None
 
-        key_b64 = r.get(f"aes_key:{session_id}")
-        iv_b64 = r.get(f"aes_iv:{session_id}")
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.get(f"{self.AES_KEY_PREFIX}:{session_id}")
+            pipe.get(f"{self.AES_IV_PREFIX}:{session_id}")
+            pipe.pttl(f"{self.AES_KEY_PREFIX}:{session_id}")
+            key_b64, iv_b64, pttl = pipe.execute()
+        except redis.exceptions.RedisError as e:
+            self._report_redis_error(e)
+            logger.error(f"Oturum anahtarı Redis'ten okunamadı: {session_id}: {e}")
+            return None
         
         if not key_b64 or not iv_b64:
             logger.error(f"Redis for session: {session_id}")
             return None
             
-        aes_key = base64.b64decode(key_b64)
-        aes_iv = base64.b64decode(iv_b64)
-        
-        return Cipher(
-            algorithms.AES(aes_key),
-            modes.CBC(aes_iv),
-            backend=default_backend()
-        )
+        return self._cache_cipher(session_id, key_b64, iv_b64, pttl / 1000 if pttl and pttl > 0 else None)
 
+    def cache_stats(self):
+        return {
+            'rsa_keys_ready': self._rsa_keys_ready,
+            'private_key_cached': self._private_key is not None,
+            'sessions': self._session_ciphers.stats(),
+        }
+
+    @timed(CRYPTO_OPERATION_SECONDS, operation="aes_encrypt")
     def encrypt_data(self, data: Any, session_id: str) -> str:
         cipher = self._get_aes_cipher(session_id)
         if not cipher:
@@ -156,7 +283,93 @@ class RedisCryptoManager:
         
         return base64.b64encode(encrypted_data).decode('utf-8')
     
-    def decrypt_data(self, encrypted_data_base64: str, session_id: str) -> Any:
+    def iter_encrypted_chunks(self, data: Any, session_id: str, chunk_size: int = GCM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        # JSON üretildikçe sabit boyutlu parçalar şifrelenir; bellekte en fazla iki parça tutulur.
+        # İlk eleman başlıktır. Her parçanın AAD'si mesaj kimliği, sırası ve son parça bayrağını
+        # içerir; böylece parçaların yer değiştirmesi veya kesilmesi çözme sırasında fark edilir.
+        ciphers = self._get_session_ciphers(session_id)
+        if not ciphers:
+            raise ValueError(f"AES şifreleme cipher'ı {session_id}: {session_id}")
+
+        message_id = base64.urlsafe_b64encode(os.urandom(12)).decode('utf-8')
+        nonce_prefix = os.urandom(GCM_NONCE_PREFIX_BYTES)
+        yield {'v': GCM_PROTOCOL_VERSION, 'm': message_id, 'alg': 'AES-256-GCM', 'chunk_size': chunk_size}
+
+        index = 0
+        pending = None
+        buffer = bytearray()
+        for piece in json.JSONEncoder(ensure_ascii=False).iterencode(data):
+            # Tek bir uzun metin alanı da parça boyutunda dilimlenerek kodlanır.
+            for start in range(0, len(piece), chunk_size):
+                buffer += piece[start:start + chunk_size].encode('utf-8')
+                while len(buffer) >= chunk_size:
+                    if pending is not None:
+                        yield self._encrypt_chunk(ciphers.gcm, message_id, nonce_prefix, index, pending, final=False)
+                        index += 1
+                    pending = bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+
+        if buffer:
+            if pending is not None:
+                yield self._encrypt_chunk(ciphers.gcm, message_id, nonce_prefix, index, pending, final=False)
+                index += 1
+            pending = bytes(buffer)
+        yield self._encrypt_chunk(ciphers.gcm, message_id, nonce_prefix, index, pending or b'', final=True)
+
+    @timed(CRYPTO_OPERATION_SECONDS, operation="aes_gcm_encrypt")
+    def encrypt_data_v2(self, data: Any, session_id: str, chunk_size: int = GCM_CHUNK_SIZE) -> Dict[str, Any]:
+        header, *chunks = self.iter_encrypted_chunks(data, session_id, chunk_size)
+        return {**header, 'chunks': chunks}
+
+    def encrypt_for_protocol(self, data: Any, session_id: str, protocol_version: int) -> Any:
+        if protocol_version == GCM_PROTOCOL_VERSION:
+            return self.encrypt_data_v2(data, session_id)
+        return self.encrypt_data(data, session_id)
+
+    @staticmethod
+    def _chunk_aad(message_id: str, index: int, final: bool) -> bytes:
+        return f"{message_id}:{index}:{1 if final else 0}".encode('utf-8')
+
+    def _encrypt_chunk(self, gcm: AESGCM, message_id: str, nonce_prefix: bytes, index: int, plaintext: bytes, final: bool) -> Dict[str, Any]:
+        nonce = nonce_prefix + index.to_bytes(4, 'big')
+        ciphertext = gcm.encrypt(nonce, plaintext, self._chunk_aad(message_id, index, final))
+        return {
+            'i': index,
+            'n': base64.b64encode(nonce).decode('utf-8'),
+            'c': base64.b64encode(ciphertext).decode('utf-8'),
+            'f': final,
+        }
+
+    @timed(CRYPTO_OPERATION_SECONDS, operation="aes_gcm_decrypt")
+    def decrypt_data_v2(self, envelope: Dict[str, Any], session_id: str) -> Any:
+        ciphers = self._get_session_ciphers(session_id)
+        if not ciphers:
+            raise ValueError(f"AES cipher for session: {session_id}")
+
+        message_id = envelope['m']
+        chunks: List[Dict[str, Any]] = envelope.get('chunks') or []
+        if not chunks or not chunks[-1].get('f'):
+            raise ValueError("Şifreli mesaj eksik: son parça bulunamadı.")
+
+        plaintext = bytearray()
+        for index, chunk in enumerate(chunks):
+            final = index == len(chunks) - 1
+            if chunk.get('i') != index or bool(chunk.get('f')) != final:
+                raise ValueError("Şifreli mesaj parçaları sıralı değil.")
+            plaintext += ciphers.gcm.decrypt(
+                base64.b64decode(chunk['n']),
+                base64.b64decode(chunk['c']),
+                self._chunk_aad(message_id, index, final),
+            )
+        return json.loads(plaintext.decode('utf-8'))
+
+    def decrypt_data(self, encrypted_data: Any, session_id: str) -> Any:
+        if encryption_protocol_version(encrypted_data) == GCM_PROTOCOL_VERSION:
+            return self.decrypt_data_v2(encrypted_data, session_id)
+        return self._decrypt_data_v1(encrypted_data, session_id)
+
+    @timed(CRYPTO_OPERATION_SECONDS, operation="aes_decrypt")
+    def _decrypt_data_v1(self, encrypted_data_base64: str, session_id: str) -> Any:
         cipher = self._get_aes_cipher(session_id)
         if not cipher:
             raise ValueError(f"AES cipher for session: {session_id}")
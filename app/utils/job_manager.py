@@ -0,0 +1,197 @@
+import time
+import uuid
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.progress import progress_listener
+from utils.metrics import get_request_id, request_id_context
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class AnalysisJob:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, payload: Dict[str, Any], session_id: Optional[str] = None, encrypted: bool = False, encryption_version: int = 1):
+        self.job_id = str(uuid.uuid4())
+        self.payload = payload
+        self.session_id = session_id
+        self.encrypted = encrypted
+        # Yanıtlar, istemcinin isteği şifrelerken kullandığı protokol sürümüyle şifrelenir.
+        self.encryption_version = encryption_version
+        # Worker thread'inde logların gönderen HTTP isteğiyle eşleşebilmesi için taşınır.
+        self.request_id = get_request_id() or self.job_id
+        self.status = self.QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.COMPLETED, self.FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'request_id': self.request_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+
+class AnalysisJobManager:
+    def __init__(self, handler: Callable[[AnalysisJob], Any], max_workers: int = 2, max_queue_size: int = 20, job_ttl: int = 3600):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.job_ttl = job_ttl
+
+        self._queue: "queue.Queue[AnalysisJob]" = queue.Queue(maxsize=max_queue_size)
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._condition = threading.Condition()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+
+    def _ensure_workers(self) -> None:
+        # Worker thread'leri ilk iş geldiğinde başlatılır, import sırasında thread açılmaz.
+        with self._workers_lock:
+            if self._workers:
+                return
+            for index in range(self.max_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"analysis-worker-{index + 1}",
+                    daemon=True,
+                )
+                worker.start()
+                self._workers.append(worker)
+            logger.info(f"[JOBS] {self.max_workers} analiz worker'ı başlatıldı (kuyruk kapasitesi: {self.max_queue_size}).")
+
+    def submit(self, payload: Dict[str, Any], session_id: Optional[str] = None, encrypted: bool = False, encryption_version: int = 1) -> AnalysisJob:
+        self._ensure_workers()
+        self._purge_expired_jobs()
+
+        job = AnalysisJob(payload, session_id=session_id, encrypted=encrypted, encryption_version=encryption_version)
+        with self._condition:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFullError("Analiz kuyruğu dolu.")
+            self._jobs[job.job_id] = job
+
+        logger.info(f"[JOBS] İş kuyruğa alındı: {job.job_id} (kuyruktaki iş sayısı: {self._queue.qsize()})")
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[AnalysisJob]:
+        deadline = time.monotonic() + max(timeout, 0)
+        with self._condition:
+            job = self._jobs.get(job_id)
+            while job and not job.is_finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return job
+
+    def wait_for_events(self, job_id: str, cursor: int, timeout: float) -> Tuple[Optional[AnalysisJob], List[Dict[str, Any]]]:
+        deadline = time.monotonic() + max(timeout, 0)
+        with self._condition:
+            job = self._jobs.get(job_id)
+            while job and len(job.events) <= cursor:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if not job:
+                return None, []
+            return job, job.events[cursor:]
+
+    def _publish(self, job: AnalysisJob, event_type: str, data: Dict[str, Any]) -> None:
+        with self._condition:
+            job.events.append({
+                'id': len(job.events),
+                'type': event_type,
+                'timestamp': time.time(),
+                'data': data,
+            })
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            statuses: Dict[str, int] = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            'workers': self.max_workers,
+            'queue_capacity': self.max_queue_size,
+            'queued': self._queue.qsize(),
+            'jobs': statuses,
+        }
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: AnalysisJob) -> None:
+        with self._condition:
+            job.status = AnalysisJob.RUNNING
+            job.started_at = time.time()
+        self._publish(job, 'started', {'job_id': job.job_id})
+
+        try:
+            with request_id_context(job.request_id), progress_listener(lambda event_type, data: self._publish(job, event_type, data)):
+                result = self.handler(job)
+            with self._condition:
+                job.result = result
+                job.status = AnalysisJob.COMPLETED
+            self._publish(job, 'completed', {'result': result})
+        except Exception as e:
+            logger.error(f"[JOBS] İş başarısız oldu: {job.job_id}, Hata: {str(e)}", exc_info=True)
+            with self._condition:
+                job.error = 'Analiz sırasında sunucuda beklenmedik bir hata oluştu.'
+                job.status = AnalysisJob.FAILED
+            self._publish(job, 'failed', {'error': job.error})
+        finally:
+            with self._condition:
+                job.finished_at = time.time()
+                # Girdi metni iş tamamlandıktan sonra bellekte tutulmaz.
+                job.payload = None
+                self._condition.notify_all()
+
+        logger.info(f"[JOBS] İş tamamlandı: {job.job_id} (durum: {job.status}, süre: {job.finished_at - job.started_at:.1f}s)")
+
+    def _purge_expired_jobs(self) -> None:
+        now = time.time()
+        with self._condition:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.is_finished and now - job.finished_at > self.job_ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired:
+            logger.info(f"[JOBS] Süresi dolan {len(expired)} iş temizlendi.")
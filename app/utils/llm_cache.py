@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.lru_cache import LRUCache
+from utils.metrics import LLM_CALL_SECONDS, LLM_CALLS, LLM_TOKENS
+from utils.rate_limit import is_rate_limit_error, llm_scheduler, openai_rate_limit, retry_after_seconds
+from utils.token_counter import count_message_tokens, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tüm ekiplerin kullandığı sağlayıcı modeli (llms._create_gpt); analiz önbelleği parmak izine de girer.
+LLM_MODEL = "gpt-4o-mini"
+
+
+class LLMCallLayer:
+    # Tüm ekiplerin LLM çağrılarının geçtiği ortak katman:
+    # - cache=True olan görevler için (model, sıcaklık, mesajlar) anahtarıyla yanıtları saklar,
+    # - yine yalnızca cache=True olan görevlerde, aynı anda uçuşta olan birebir aynı çağrıları tek
+    #   çağrıya indirger (önbelleksiz görevlerin her çağrısı kendi örneklenmiş yanıtını alır),
+    # - her çağrıdan önce ortak LLMScheduler'dan istek/token kotası alır (bkz. utils/rate_limit.py),
+    #   buna rağmen 429 alınırsa ortak bekleme kapısını kapatır,
+    # - model bazında çağrı, token ve gecikme istatistiklerini tutar.
+    REDIS_KEY_PREFIX = "llm_cache"
+
+    def __init__(
+        self,
+        cache_size: int = int(os.getenv("LLM_CACHE_SIZE", 512)),
+        ttl: int = int(os.getenv("LLM_CACHE_TTL", 86400)),
+        use_redis: bool = os.getenv("LLM_CACHE_REDIS", "false").lower() == "true",
+    ):
+        self.ttl = ttl
+        self._cache = LRUCache(maxsize=cache_size, ttl=ttl)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._use_redis = use_redis
+        self._redis = None
+
+    @staticmethod
+    def tool_names(tools, available_functions) -> List[str]:
+        # Araçlar OpenAI fonksiyon şeması ({"function": {"name": ...}}) veya ad taşıyan nesneler olabilir.
+        names = set(available_functions or {})
+        for tool in tools or []:
+            if isinstance(tool, dict):
+                name = (tool.get("function") or tool).get("name")
+            else:
+                name = getattr(tool, "name", None)
+            if name:
+                names.add(str(name))
+        return sorted(names)
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], stop, messages, tools: Optional[List[str]] = None) -> str:
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "stop": sorted(stop or []), "messages": messages, "tools": tools or []},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def call(self, model: str, key: str, messages, cache_enabled: bool, invoke: Callable[[], Any], task: str = "unknown") -> Any:
+        if not cache_enabled:
+            return self._invoke(model, messages, invoke, task)
+
+        cached = self._get_cached(key)
+        if cached is not None:
+            self._record(model, "cache_hits", task)
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            self._record(model, "deduplicated", task)
+            return future.result()
+
+        try:
+            result = self._invoke(model, messages, invoke, task)
+            if isinstance(result, str):
+                self._set_cached(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _invoke(self, model: str, messages, invoke: Callable[[], Any], task: str) -> Any:
+        try:
+            prompt_tokens = count_message_tokens(messages, model)
+            estimated_tokens = prompt_tokens + llm_scheduler.completion_estimate
+            llm_scheduler.acquire(estimated_tokens)
+            started = time.perf_counter()
+            result = invoke()
+            elapsed = time.perf_counter() - started
+            openai_rate_limit.record_success()
+            completion_tokens = count_tokens(result, model) if isinstance(result, str) else 0
+            llm_scheduler.settle(estimated_tokens, prompt_tokens + completion_tokens)
+            self._record_call(model, prompt_tokens, completion_tokens, elapsed, task)
+            return result
+        except Exception as e:
+            if is_rate_limit_error(e):
+                openai_rate_limit.trip(retry_after_seconds(e))
+            raise
+
+    def _get_redis(self):
+        if not self._use_redis:
+            return None
+        from utils.redis_client import create_redis_client
+        self._redis = create_redis_client(decode_responses=True)
+        return self._redis
+
+    def _get_cached(self, key: str) -> Optional[str]:
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        r = self._get_redis()
+        if r:
+            try:
+                cached = r.get(f"{self.REDIS_KEY_PREFIX}:{key}")
+                if cached is not None:
+                    self._cache.set(key, cached)
+                return cached
+            except Exception as e:
+                from utils.redis_client import report_redis_error
+                report_redis_error(e, decode_responses=True)
+                logger.warning(f"LLM önbelleği Redis'ten okunamadı: {e}")
+        return None
+
+    def _set_cached(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+        r = self._get_redis()
+        if r:
+            try:
+                r.set(f"{self.REDIS_KEY_PREFIX}:{key}", value, ex=self.ttl)
+            except Exception as e:
+                from utils.redis_client import report_redis_error
+                report_redis_error(e, decode_responses=True)
+                logger.warning(f"LLM önbelleği Redis'e yazılamadı: {e}")
+
+    def _model_stats(self, model: str) -> Dict[str, float]:
+        return self._stats.setdefault(model, {
+            "calls": 0, "cache_hits": 0, "deduplicated": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "total_latency_seconds": 0.0,
+        })
+
+    def _record(self, model: str, counter: str, task: str) -> None:
+        LLM_CALLS.labels(model=model, task=task, outcome=counter).inc()
+        with self._lock:
+            self._model_stats(model)[counter] += 1
+
+    def _record_call(self, model: str, prompt_tokens: int, completion_tokens: int, elapsed: float, task: str) -> None:
+        LLM_CALLS.labels(model=model, task=task, outcome="invoked").inc()
+        LLM_CALL_SECONDS.labels(model=model, task=task).observe(elapsed)
+        LLM_TOKENS.labels(model=model, task=task, kind="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(model=model, task=task, kind="completion").inc(completion_tokens)
+        with self._lock:
+            stats = self._model_stats(model)
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["total_latency_seconds"] += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {model: dict(values) for model, values in self._stats.items()}
+        for values in snapshot.values():
+            values["avg_latency_seconds"] = round(values["total_latency_seconds"] / values["calls"], 3) if values["calls"] else 0.0
+            values["total_latency_seconds"] = round(values["total_latency_seconds"], 3)
+        return {"models": snapshot, "cache": self._cache.stats()}
+
+
+llm_call_layer = LLMCallLayer()
@@ -0,0 +1,146 @@
+import time
+import uuid
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s'
+
+# LLM ve ekip çağrıları dakikalar sürebildiği için kova aralığı geniş tutulur.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+CRYPTO_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'legal_http_request_seconds', 'HTTP isteklerinin süresi',
+    ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    'legal_pipeline_stage_seconds', 'Analiz pipeline aşamalarının süresi',
+    ['stage'], buckets=LATENCY_BUCKETS,
+)
+CREW_KICKOFF_SECONDS = Histogram(
+    'legal_crew_kickoff_seconds', 'Ekip kickoff çağrılarının süresi',
+    ['crew'], buckets=LATENCY_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    'legal_task_seconds', 'Ajan görevlerinin süresi',
+    ['task'], buckets=LATENCY_BUCKETS,
+)
+TOOL_CALL_SECONDS = Histogram(
+    'legal_tool_call_seconds', 'Araç çağrılarının süresi (Qdrant, embedding, web arama, scrape)',
+    ['tool'], buckets=LATENCY_BUCKETS,
+)
+OPERATION_ERRORS = Counter(
+    'legal_operation_errors_total', 'Hata ile sonuçlanan ölçülen işlemler',
+    ['operation'],
+)
+LLM_CALL_SECONDS = Histogram(
+    'legal_llm_call_seconds', 'Sağlayıcıya giden LLM çağrılarının süresi',
+    ['model', 'task'], buckets=LATENCY_BUCKETS,
+)
+LLM_CALLS = Counter(
+    'legal_llm_calls_total', 'LLM çağrıları (invoked, cache_hit, deduplicated)',
+    ['model', 'task', 'outcome'],
+)
+LLM_TOKENS = Counter(
+    'legal_llm_tokens_total', 'Görev bazında LLM token kullanımı',
+    ['model', 'task', 'kind'],
+)
+FEEDBACK_ITERATION_SECONDS = Histogram(
+    'legal_feedback_iteration_seconds', 'Geri bildirim döngüsü iterasyonlarının süresi',
+    ['mode'], buckets=LATENCY_BUCKETS,
+)
+FEEDBACK_ITERATIONS = Histogram(
+    'legal_feedback_iterations', 'Bir analizin tamamlanması için gereken iterasyon sayısı',
+    buckets=(1, 2, 3, 4, 5, 10),
+)
+WEB_CACHE_REQUESTS = Counter(
+    'legal_web_cache_requests_total', 'Web arama / sayfa önbelleği sonuçları (hit, miss, revalidated, unchanged, changed, stale)',
+    ['kind', 'outcome'],
+)
+CRYPTO_OPERATION_SECONDS = Histogram(
+    'legal_crypto_operation_seconds', 'Şifreleme işlemlerinin süresi',
+    ['operation'], buckets=CRYPTO_BUCKETS,
+)
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: Optional[str]) -> contextvars.Token:
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    _request_id.reset(token)
+
+
+@contextmanager
+def request_id_context(request_id: Optional[str]):
+    token = bind_request_id(request_id)
+    try:
+        yield request_id
+    finally:
+        reset_request_id(token)
+
+
+class RequestIdLogFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get() or '-'
+        return True
+
+
+def install_request_id_logging() -> None:
+    # Modüller basicConfig ile kök logger'ı yapılandırıyor; istek kimliği tüm handler'lara eklenir.
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdLogFilter) for f in handler.filters):
+            handler.addFilter(RequestIdLogFilter())
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OPERATION_ERRORS.labels(operation=f"{histogram._name}:{'/'.join(labels.values())}").inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        (histogram.labels(**labels) if labels else histogram).observe(elapsed)
+        logger.debug(f"[METRICS] {histogram._name} {labels} {elapsed:.4f}s")
+
+
+def kickoff_with_metrics(crew, inputs: Dict[str, Any]):
+    crew_name = getattr(crew, 'name', None) or type(crew).__name__
+    with timed(CREW_KICKOFF_SECONDS, crew=crew_name):
+        output = crew.kickoff(inputs=inputs)
+    observe_task_durations(crew)
+    return output
+
+
+def observe_task_durations(crew) -> None:
+    # CrewAI görev başlangıç/bitiş zamanlarını Task nesnesinde tutar; kickoff sonrasında okunur.
+    for task in getattr(crew, 'tasks', []) or []:
+        start_time = getattr(task, 'start_time', None)
+        end_time = getattr(task, 'end_time', None)
+        if start_time and end_time:
+            task_name = getattr(task, 'name', None) or (task.description or '')[:40]
+            TASK_SECONDS.labels(task=task_name).observe((end_time - start_time).total_seconds())
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
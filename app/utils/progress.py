@@ -0,0 +1,39 @@
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Analiz adımlarının ilerleme olaylarını, o an çalışan isteğin dinleyicisine iletir.
+# Dinleyici yoksa (ör. senkron /api/analyze) olaylar sessizce yok sayılır.
+_progress_sink: contextvars.ContextVar[Optional[Callable[[str, Dict[str, Any]], None]]] = contextvars.ContextVar(
+    "progress_sink", default=None
+)
+
+
+@contextmanager
+def progress_listener(sink: Callable[[str, Dict[str, Any]], None]):
+    token = _progress_sink.set(sink)
+    try:
+        yield
+    finally:
+        _progress_sink.reset(token)
+
+
+def emit_progress(event_type: str, data: Dict[str, Any]) -> None:
+    sink = _progress_sink.get()
+    if sink is None:
+        return
+    try:
+        sink(event_type, data)
+    except Exception as e:
+        logger.warning(f"İlerleme olayı iletilemedi ({event_type}): {str(e)}")
+
+
+def emit_task_output(task_output) -> None:
+    emit_progress("task_completed", {
+        "name": getattr(task_output, "name", None),
+        "agent": getattr(task_output, "agent", None),
+        "raw": getattr(task_output, "raw", str(task_output)),
+    })
@@ -0,0 +1,358 @@
+import os
+import time
+import heapq
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    # litellm yalnızca LLM çağrısı yapıldığında yüklüdür; içe aktarma burada, hata anında yapılır.
+    try:
+        from litellm.exceptions import RateLimitError
+    except ImportError:
+        return type(error).__name__ == "RateLimitError"
+    return isinstance(error, RateLimitError)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitGate:
+    # OpenAI hız sınırı süreç içindeki tüm analizler için ortaktır: bir çağrı 429 aldığında
+    # kapı bekleme süresi boyunca kapanır ve o süre içinde başlayacak LLM çağrıları (farklı
+    # istekler, toplu analiz vakaları ve Feedback._execute_with_retry tekrarları) birlikte bekler.
+    # Bekleme süresi Retry-After başlığından, yoksa ardışık 429 sayısına göre üstel olarak belirlenir.
+    def __init__(
+        self,
+        base_cooldown: float = float(os.getenv("OPENAI_RATE_LIMIT_COOLDOWN", 4)),
+        max_cooldown: float = float(os.getenv("OPENAI_RATE_LIMIT_MAX_COOLDOWN", 60)),
+    ):
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._blocked_until = 0.0
+        self._consecutive = 0
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def wait(self) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._blocked_until - time.monotonic()
+                if remaining <= 0:
+                    if waited:
+                        self.waits += 1
+                        self.waited_seconds += waited
+                    return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    def trip(self, retry_after: Optional[float] = None) -> float:
+        with self._lock:
+            cooldown = retry_after if retry_after else self.base_cooldown * (2 ** self._consecutive)
+            cooldown = min(cooldown, self.max_cooldown)
+            self._consecutive += 1
+            self.trips += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + cooldown)
+        logger.warning(f"OpenAI hız sınırına ulaşıldı, yeni LLM çağrıları {cooldown:.1f}s bekletilecek.")
+        return cooldown
+
+    def record_success(self) -> None:
+        if self._consecutive:
+            with self._lock:
+                self._consecutive = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "blocked_for_seconds": round(max(self._blocked_until - time.monotonic(), 0.0), 2),
+                "trips": self.trips,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 2),
+            }
+
+
+openai_rate_limit = RateLimitGate()
+
+
+# Öncelik sınıfları: küçük değer önce çalışır. Etkileşimli istekler (web arayüzü, /api/analyze,
+# iş kuyruğu) toplu analiz vakalarının önüne geçer.
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: str):
+    # crewai async görevleri bağlamı kopyaladığından öncelik paralel dallardaki LLM çağrılarına da taşınır.
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class TokenBucket:
+    # Dakikalık kotayı saniyelik dolum hızına çevirir; kova en fazla burst_seconds'lık kota biriktirir.
+    # Kovadan büyük bir istek (ör. çok uzun bir prompt) kova dolduğunda geçer ve kovayı borçlandırır.
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(per_minute * burst_seconds / 60.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, reserve: float = 0.0) -> float:
+        # reserve: kovanın bu oranı düşük öncelikli istekler için kullanılmaz, etkileşimli isteklere kalır.
+        self._refill(time.monotonic())
+        needed = min(amount, self.capacity) + reserve * self.capacity
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def level(self) -> float:
+        self._refill(time.monotonic())
+        return self.tokens
+
+
+# İki kova (istek/dk, token/dk) tek atomik adımda kontrol edilir; saat Redis'ten alınır ki
+# replikalar arasındaki saat farkı dolum hızını bozmasın. Dönüş: 0 (izin verildi) veya beklenecek saniye.
+_REDIS_RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local requested = {1, tonumber(ARGV[5])}
+local reserve = tonumber(ARGV[6])
+local ttl = tonumber(ARGV[7])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local capacity = tonumber(ARGV[i * 2])
+    if rate > 0 then
+        local tokens = tonumber(redis.call('HGET', KEYS[i], 'tokens') or capacity)
+        local updated = tonumber(redis.call('HGET', KEYS[i], 'updated') or now)
+        tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+        levels[i] = tokens
+        local needed = math.min(requested[i], capacity) + reserve * capacity
+        if tokens < needed then
+            wait = math.max(wait, (needed - tokens) / rate)
+        end
+    end
+end
+for i = 1, 2 do
+    if levels[i] then
+        local tokens = levels[i]
+        if wait == 0 then
+            tokens = tokens - requested[i]
+        end
+        redis.call('HSET', KEYS[i], 'tokens', tokens, 'updated', now)
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return tostring(wait)
+"""
+
+
+class LLMScheduler:
+    # Tüm ekiplerin LLM çağrıları (llm_call_layer üzerinden) çağrı yapılmadan önce buradan izin alır.
+    # İstek/dk ve token/dk kotaları token kovalarıyla önceden dağıtılır; böylece 429 alınıp geri
+    # çekilmek yerine çağrılar kotaya göre aralıklandırılır. Bekleyenler öncelik sırasına dizilir,
+    # kotayı yalnızca sıranın başındaki çağrı alır; sonradan gelen etkileşimli bir çağrı bekleyen
+    # toplu çağrıların önüne geçer. use_redis açıksa kovalar Redis'te tutulur ve kota replikalar
+    # arasında paylaşılır; Redis erişilemezse süreç içi kovalara dönülür.
+    REDIS_KEY_PREFIX = "llm_rate"
+
+    def __init__(
+        self,
+        requests_per_minute: float = float(os.getenv("OPENAI_RPM_LIMIT", 500)),
+        tokens_per_minute: float = float(os.getenv("OPENAI_TPM_LIMIT", 200000)),
+        burst_seconds: float = float(os.getenv("OPENAI_RATE_BURST_SECONDS", 10)),
+        batch_reserve: float = float(os.getenv("OPENAI_BATCH_RESERVE", 0.2)),
+        completion_estimate: int = int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", 800)),
+        use_redis: bool = os.getenv("OPENAI_RATE_LIMIT_REDIS", "false").lower() == "true",
+        gate: RateLimitGate = openai_rate_limit,
+    ):
+        self.burst_seconds = burst_seconds
+        self.batch_reserve = batch_reserve
+        self.completion_estimate = completion_estimate
+        self.use_redis = use_redis
+        self.gate = gate
+        self._requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute > 0 else None
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._bucket_lock = threading.Lock()
+        self._script = None
+        self._stats = {
+            priority: {"granted": 0, "waited": 0, "wait_seconds": 0.0}
+            for priority in PRIORITIES
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self._requests is not None or self._tokens is not None
+
+    def acquire(self, tokens: int, priority: Optional[str] = None) -> float:
+        if not self.enabled:
+            return self.gate.wait()
+        priority = priority if priority in PRIORITIES else current_priority()
+        reserve = self.batch_reserve if priority == BATCH else 0.0
+        started = time.monotonic()
+        with self._condition:
+            self._sequence += 1
+            ticket = (PRIORITIES[priority], self._sequence)
+            heapq.heappush(self._waiters, ticket)
+            # Sıranın başında bekleyen daha düşük öncelikli çağrı yeniden değerlendirilsin.
+            self._condition.notify_all()
+        try:
+            while True:
+                self.gate.wait()
+                with self._condition:
+                    if self._waiters[0] != ticket:
+                        self._condition.wait(1.0)
+                        continue
+                # Kota (Redis'te bir gidiş-dönüş olabilir) kilit dışında alınır ki yavaş bir Redis
+                # çağrısı sıraya girmek isteyen diğer thread'leri bekletmesin.
+                delay = self._reserve(tokens, reserve)
+                with self._condition:
+                    if delay <= 0:
+                        if self._waiters[0] == ticket:
+                            break
+                        # Rezervasyon sürerken daha öncelikli bir çağrı sıranın başına geçti; kota geri verilir.
+                        self._release(tokens)
+                        continue
+                    self._condition.wait(min(delay, 1.0))
+        finally:
+            with self._condition:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+        waited = time.monotonic() - started
+        with self._condition:
+            stats = self._stats[priority]
+            stats["granted"] += 1
+            if waited >= 0.01:
+                stats["waited"] += 1
+                stats["wait_seconds"] += waited
+        return waited
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        # Çağrı öncesi tahmin (prompt + completion_estimate) gerçek kullanımla düzeltilir.
+        difference = actual_tokens - estimated_tokens
+        if not difference or self._tokens is None:
+            return
+        self._adjust(0, difference)
+
+    def _release(self, tokens: int) -> None:
+        self._adjust(-1, -tokens)
+
+    def _adjust(self, requests: float, tokens: float) -> None:
+        # Alınmış kotayı düzeltir: pozitif değer kovadan düşer, negatif değer kovaya geri eklenir.
+        r = self._get_redis()
+        if r:
+            try:
+                pipe = r.pipeline()
+                if requests and self._requests is not None:
+                    pipe.hincrbyfloat(f"{self.REDIS_KEY_PREFIX}:requests", "tokens", -requests)
+                if tokens and self._tokens is not None:
+                    pipe.hincrbyfloat(f"{self.REDIS_KEY_PREFIX}:tokens", "tokens", -tokens)
+                pipe.execute()
+                return
+            except Exception as e:
+                from utils.redis_client import report_redis_error
+                report_redis_error(e, decode_responses=True)
+                logger.warning(f"LLM kota düzeltmesi Redis'e yazılamadı: {e}")
+        with self._bucket_lock:
+            if requests and self._requests is not None:
+                self._requests.take(requests)
+            if tokens and self._tokens is not None:
+                self._tokens.take(tokens)
+
+    def _get_redis(self):
+        if not self.use_redis:
+            return None
+        from utils.redis_client import create_redis_client
+        return create_redis_client(decode_responses=True)
+
+    def _reserve(self, tokens: int, reserve: float) -> float:
+        r = self._get_redis()
+        if r:
+            try:
+                if self._script is None:
+                    self._script = r.register_script(_REDIS_RESERVE_SCRIPT)
+                return float(self._script(
+                    keys=[f"{self.REDIS_KEY_PREFIX}:requests", f"{self.REDIS_KEY_PREFIX}:tokens"],
+                    args=[
+                        self._requests.rate if self._requests else 0, self._requests.capacity if self._requests else 0,
+                        self._tokens.rate if self._tokens else 0, self._tokens.capacity if self._tokens else 0,
+                        tokens, reserve, max(int(self.burst_seconds * 6), 60),
+                    ],
+                    client=r,
+                ))
+            except Exception as e:
+                from utils.redis_client import report_redis_error
+                report_redis_error(e, decode_responses=True)
+                logger.warning(f"LLM kotası Redis'ten alınamadı, süreç içi kota kullanılacak: {e}")
+
+        buckets = [(bucket, amount) for bucket, amount in ((self._requests, 1), (self._tokens, tokens)) if bucket]
+        with self._bucket_lock:
+            delay = max(bucket.delay(amount, reserve) for bucket, amount in buckets)
+            if delay <= 0:
+                for bucket, amount in buckets:
+                    bucket.take(amount)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            queued: Dict[str, int] = {}
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            for rank, _ in self._waiters:
+                queued[names[rank]] = queued.get(names[rank], 0) + 1
+            priorities = {
+                name: {**values, "wait_seconds": round(values["wait_seconds"], 2)}
+                for name, values in self._stats.items()
+            }
+        with self._bucket_lock:
+            available_requests = round(self._requests.level(), 1) if self._requests and not self.use_redis else None
+            available_tokens = round(self._tokens.level()) if self._tokens and not self.use_redis else None
+        return {
+            "enabled": self.enabled,
+            "mode": "redis" if self.use_redis else "local",
+            "requests_per_minute": self._requests.per_minute if self._requests else None,
+            "tokens_per_minute": self._tokens.per_minute if self._tokens else None,
+            "available_requests": available_requests,
+            "available_tokens": available_tokens,
+            "queued": queued,
+            "priorities": priorities,
+            "cooldown": self.gate.stats(),
+        }
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,166 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class RedisConnectionManager:
+    # Redis'e tek bir ConnectionPool üzerinden bağlanır. Bağlantı ilk kullanımda kurulur;
+    # Redis erişilemezse üstel artan bekleme süresi boyunca çağıranlara hemen None döner,
+    # süre dolunca yeniden denenir. Böylece Redis yeniden başlatıldığında istekler takılmaz
+    # ve Redis geri geldiğinde süreç yeniden başlatılmadan bağlantı toparlanır.
+    def __init__(
+        self,
+        decode_responses: bool = True,
+        host: str = os.getenv("REDIS_HOST", "localhost"),
+        port: int = int(os.getenv("REDIS_PORT", 6379)),
+        password: Optional[str] = os.getenv("REDIS_PASSWORD") or None,
+        max_connections: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 20)),
+        socket_timeout: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2.0)),
+        connect_timeout: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", 1.0)),
+        health_check_interval: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+        backoff_base: float = float(os.getenv("REDIS_RECONNECT_BACKOFF_BASE", 0.5)),
+        backoff_max: float = float(os.getenv("REDIS_RECONNECT_BACKOFF_MAX", 30)),
+    ):
+        self.decode_responses = decode_responses
+        self.host = host
+        self.port = port
+        self.password = password
+        self.max_connections = max_connections
+        self.socket_timeout = socket_timeout
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._pool: Optional[redis.ConnectionPool] = None
+        self._client: Optional[redis.Redis] = None
+        self._connected = False
+        self._consecutive_failures = 0
+        self._next_retry_at = 0.0
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _build_client(self) -> redis.Redis:
+        self._pool = redis.ConnectionPool(
+            host=self.host,
+            port=self.port,
+            password=self.password,
+            decode_responses=self.decode_responses,
+            max_connections=self.max_connections,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.connect_timeout,
+            health_check_interval=self.health_check_interval,
+            # Tek bir kopan bağlantı (ör. Redis yeniden başlatması) komut seviyesinde birkaç kez denenir.
+            retry=Retry(ExponentialBackoff(cap=1.0, base=0.05), 2),
+            retry_on_error=[redis.exceptions.ConnectionError, redis.exceptions.TimeoutError],
+        )
+        return redis.Redis(connection_pool=self._pool)
+
+    def get_client(self) -> Optional[redis.Redis]:
+        if self._connected:
+            return self._client
+
+        with self._lock:
+            if self._connected:
+                return self._client
+            if time.monotonic() < self._next_retry_at:
+                return None
+
+            if self._client is None:
+                self._client = self._build_client()
+            try:
+                logger.info(f"Redis bağlantısı kuruluyor: {self.host}:{self.port}")
+                self._client.ping()
+            except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+                self._register_failure(e)
+                return None
+
+            self._connected = True
+            self._consecutive_failures = 0
+            self._last_error = None
+            logger.info(f"Redis bağlantısı başarılı ({self.host}:{self.port}, havuz: {self.max_connections}).")
+            return self._client
+
+    def report_failure(self, error: Exception) -> None:
+        # Komut sırasında bağlantı hatası alan çağıranlar bildirir; sonraki istekler bekleme
+        # süresi dolana kadar Redis'i denemeden hızlıca başarısız olur.
+        with self._lock:
+            if self._connected:
+                self._connected = False
+                if self._pool:
+                    self._pool.disconnect()
+            self._register_failure(error)
+
+    def _register_failure(self, error: Exception) -> None:
+        self._consecutive_failures += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (self._consecutive_failures - 1)))
+        self._next_retry_at = time.monotonic() + delay
+        self._last_error = str(error)
+        logger.error(
+            f"Redis bağlantısı kurulamadı ({self.host}:{self.port}): {error}. "
+            f"{delay:.1f} sn sonra yeniden denenecek (ardışık hata: {self._consecutive_failures})."
+        )
+
+    def health(self) -> Dict[str, Any]:
+        # Durum, bağlantı bayrağından değil gerçek bir PING'den okunur; komut hatası bildirmeyen
+        # bir bileşen kopuk bağlantıyı sakladıysa bile sağlık yanıtı "up" kalmaz.
+        if self._connected:
+            try:
+                self._client.ping()
+            except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+                self.report_failure(e)
+        elif self._client is not None:
+            self.get_client()
+        status = "up" if self._connected else ("unknown" if self._client is None else "down")
+        pool = self._pool
+        return {
+            "status": status,
+            "host": f"{self.host}:{self.port}",
+            "max_connections": self.max_connections,
+            "connections_in_use": len(getattr(pool, "_in_use_connections", ())) if pool else 0,
+            "connections_idle": len(getattr(pool, "_available_connections", ())) if pool else 0,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_in_seconds": round(max(0.0, self._next_retry_at - time.monotonic()), 1) if not self._connected else 0.0,
+            "last_error": self._last_error,
+        }
+
+
+_managers: Dict[bool, RedisConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_redis_manager(decode_responses: bool = True) -> RedisConnectionManager:
+    # Metin (decode_responses=True) ve ikili veri kullanan bileşenler için birer havuz paylaşılır.
+    with _managers_lock:
+        manager = _managers.get(decode_responses)
+        if manager is None:
+            manager = _managers[decode_responses] = RedisConnectionManager(decode_responses=decode_responses)
+        return manager
+
+
+def create_redis_client(decode_responses: bool = True) -> Optional[redis.Redis]:
+    return get_redis_manager(decode_responses).get_client()
+
+
+def report_redis_error(error: Exception, decode_responses: bool = True) -> None:
+    # Önbellek / kota bileşenleri Redis komutu başarısız olduğunda çağırır; yalnızca bağlantı
+    # hataları ortak havuzu bekleme süresine sokar, veri / betik hataları bağlantıyı etkilemez.
+    if isinstance(error, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+        get_redis_manager(decode_responses).report_failure(error)
+
+
+def redis_health() -> Dict[str, Any]:
+    with _managers_lock:
+        managers = dict(_managers)
+    return {
+        ("text" if decode_responses else "binary"): manager.health()
+        for decode_responses, manager in managers.items()
+    }
@@ -0,0 +1,57 @@
+import logging
+from functools import lru_cache
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+
+class _ApproximateEncoding:
+    # tiktoken kodlama dosyası indirilemezse (çevrimdışı kurulum) ~4 karakter = 1 token yaklaşımı.
+    # Sayım ve kırpma çalışmaya devam eder; LLM çağrıları token sayacı yüzünden başarısız olmaz.
+    CHARS_PER_TOKEN = 4
+
+    def encode(self, text: str, disallowed_special=()):
+        return [text[i:i + self.CHARS_PER_TOKEN] for i in range(0, len(text), self.CHARS_PER_TOKEN)]
+
+    def decode(self, tokens) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        logger.warning(f"tiktoken kodlaması yüklenemedi, yaklaşık token sayımı kullanılacak: {e}")
+        return _ApproximateEncoding()
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken kodlaması yüklenemedi, yaklaşık token sayımı kullanılacak: {e}")
+        return _ApproximateEncoding()
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    if not text:
+        return 0
+    return len(_get_encoding(model).encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model: str = "gpt-4o-mini") -> int:
+    if isinstance(messages, str):
+        return count_tokens(messages, model)
+    # Mesaj başına rol/ayraç için sabit ek maliyet (OpenAI chat formatı).
+    return sum(count_tokens(str(message.get("content") or ""), model) + 4 for message in messages)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    if not text or max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
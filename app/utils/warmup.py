@@ -0,0 +1,115 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupStep:
+    # Zorunlu olmayan adımlar (ör. Qdrant, Redis) başarısız olsa da servis hazır sayılır;
+    # analiz bu bileşenler olmadan da (kısıtlı) çalışabildiği için yük dengeleyici trafiği kesmez.
+    def __init__(self, name: str, fn: Callable[[], Any], required: bool = True):
+        self.name = name
+        self.fn = fn
+        self.required = required
+        self.status = "pending"
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.detail: Any = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "seconds": self.seconds,
+            "error": self.error,
+            "detail": self.detail,
+        }
+
+
+class WarmupRunner:
+    # Sunucu açılışında ağır bileşenleri (model, ekipler, bağlantılar) arka planda hazırlar ve
+    # hazır olma durumunu raporlar. Zorunlu bir adım başarısız olursa retry_interval sonra yeniden denenir.
+    def __init__(
+        self,
+        steps: List[WarmupStep],
+        retry_interval: float = float(os.getenv("WARMUP_RETRY_SECONDS", 15)),
+        max_attempts: int = int(os.getenv("WARMUP_MAX_ATTEMPTS", 0)),
+    ):
+        self.steps = steps
+        self.retry_interval = retry_interval
+        self.max_attempts = max_attempts
+        self.state = "idle"
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> threading.Thread:
+        with self._lock:
+            if self._thread is None:
+                self.state = "running"
+                self.started_at = time.time()
+                self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def _run(self) -> None:
+        logger.info("[WARMUP] Ön ısıtma başlatıldı.")
+        while True:
+            self.attempts += 1
+            for step in self.steps:
+                if step.status == "ok":
+                    continue
+                self._run_step(step)
+                if step.status == "failed" and step.required:
+                    # Sonraki adımlar genellikle öncekine bağımlıdır (ör. ekipler olmadan model yoktur).
+                    break
+
+            if all(step.status == "ok" for step in self.steps if step.required):
+                self.state = "ready"
+                self.finished_at = time.time()
+                logger.info(f"[WARMUP] Ön ısıtma tamamlandı ({self.finished_at - self.started_at:.1f} sn).")
+                return
+            if self.max_attempts and self.attempts >= self.max_attempts:
+                self.state = "failed"
+                self.finished_at = time.time()
+                logger.error(f"[WARMUP] Ön ısıtma {self.attempts} denemede tamamlanamadı.")
+                return
+
+            logger.warning(f"[WARMUP] Ön ısıtma tamamlanamadı, {self.retry_interval:.0f} sn sonra yeniden denenecek.")
+            time.sleep(self.retry_interval)
+
+    def _run_step(self, step: WarmupStep) -> None:
+        step.status = "running"
+        started = time.perf_counter()
+        try:
+            step.detail = step.fn()
+            step.status = "ok"
+            step.error = None
+        except Exception as e:
+            step.status = "failed"
+            step.error = str(e)
+            log = logger.error if step.required else logger.warning
+            log(f"[WARMUP] '{step.name}' adımı başarısız: {e}")
+        finally:
+            step.seconds = round(time.perf_counter() - started, 3)
+        if step.status == "ok":
+            logger.info(f"[WARMUP] '{step.name}' hazır ({step.seconds:.2f} sn).")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "attempts": self.attempts,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": {step.name: step.to_dict() for step in self.steps},
+        }
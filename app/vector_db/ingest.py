@@ -0,0 +1,436 @@
+"""Hukuki doküman derlemini Qdrant koleksiyonuna aktaran artımlı ve kaldığı yerden devam edebilen içe aktarma hattı.
+
+Akış: PDF'ler bir süreç havuzunda ayrıştırılıp parçalanır -> parçalar batch'ler halinde
+embedding'e çevrilir -> batch'ler eş zamanlı olarak Qdrant'a upsert edilir. Parçalar bellekte
+toplanmaz; her doküman ayrıştırıldıkça hatta akar.
+
+- Nokta kimlikleri içerikten türetilir (dosya yolu + parça metninin SHA-256'sı), bu yüzden
+  yeniden çalıştırmak nokta çoğaltmaz; değişmeyen parçalar aynı kimlikle üzerine yazılır.
+- Manifest dosyası her dokümanın içerik özetini tutar; yalnızca yeni veya değişen dosyalar
+  işlenir. Değişen bir dosyanın artık üretilmeyen eski parçaları koleksiyondan silinir.
+- Bir doküman, tüm parçaları yazıldıktan sonra manifeste işlenir. Süreç yarıda kesilirse
+  sonraki çalıştırma tamamlanmamış dosyalardan devam eder.
+- Koleksiyon yoksa oluşturulur; --recreate verilmedikçe silinmez.
+
+Kullanım (app/ dizininden):
+    python -m vector_db.ingest --source /veri/hukuk_pdf --workers 4 --batch-size 64
+    python -m vector_db.ingest --source /veri/hukuk_pdf --prune     # diskten silinen dosyaların noktalarını da kaldır
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import logging
+import argparse
+import threading
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from dotenv import load_dotenv
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from vector_db import legal_metadata
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Nokta kimlikleri için sabit ad alanı; değiştirilirse tüm koleksiyon yeniden yazılır.
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2a4e-3b7d-5e8f-9a0b-1c2d3e4f5a6b")
+PAYLOAD_INDEX_FIELDS = ["dosya_adi", "ana_hukuk_alani", "dokuman_tipi", "madde_no"]
+MIN_CHUNK_LENGTH = 50
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", "! ", "? "]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def point_id(file_key: str, chunk_text: str, occurrence: int) -> str:
+    # Aynı dosyada birebir tekrarlanan parçalar (ör. sayfa başlıkları) occurrence ile ayrılır.
+    content_hash = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{file_key}\x00{content_hash}\x00{occurrence}"))
+
+
+def parse_document(path: str, file_key: str, file_hash: str, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    # Süreç havuzunda çalışır; yalnızca seçilebilir (pickle) veri döndürür.
+    import fitz
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    result: Dict[str, Any] = {"file_key": file_key, "file_hash": file_hash, "chunks": [], "pages": 0, "error": None}
+    try:
+        with fitz.open(path) as document:
+            page_texts = [page.get_text() for page in document]
+            metadata_title = (document.metadata or {}).get("title")
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    try:
+        # Maddeler sayfa sınırını aşabildiğinden metin bütün olarak parçalanır; her parçanın
+        # sayfası başlangıç konumundan bulunur.
+        page_starts, offset = [], 0
+        for text in page_texts:
+            page_starts.append(offset)
+            offset += len(text) + 1
+        full_text = "\n".join(page_texts)
+        result["pages"] = len(page_texts)
+        if not full_text.strip():
+            return result
+
+        document_fields = {
+            "dosya_adi": file_key,
+            "dokuman_tipi": legal_metadata.detect_document_type(file_key, full_text),
+            "ana_hukuk_alani": legal_metadata.detect_legal_area(full_text) or "genel",
+            "hakkinda_konu": legal_metadata.extract_title(full_text, metadata_title),
+            "dosya_hash": file_hash,
+        }
+        headers = legal_metadata.article_headers(full_text)
+        header_starts = [start for start, _ in headers]
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=CHUNK_SEPARATORS, add_start_index=True,
+        )
+        occurrences: Counter = Counter()
+        chunk_index = 0
+        for piece in splitter.create_documents([full_text]):
+            text = piece.page_content.strip()
+            if len(text) < MIN_CHUNK_LENGTH:
+                continue
+            start = piece.metadata.get("start_index", 0)
+            header_position = bisect_right(header_starts, start) - 1
+            current_article = headers[header_position][1] if header_position >= 0 else None
+            page = bisect_right(page_starts, max(start, 0))
+            occurrence = occurrences[text]
+            occurrences[text] += 1
+            result["chunks"].append({
+                "id": point_id(file_key, text, occurrence),
+                "payload": legal_metadata.chunk_payload(text, chunk_index, document_fields, current_article, page),
+            })
+            chunk_index += 1
+    except Exception as e:
+        # Ayırıcı ya da metadata çıkarımındaki bir hata yalnızca bu dokümanı başarısız sayar;
+        # yarım kalan parçaları yazılmaz ve içe aktarma diğer dosyalarla devam eder.
+        result["chunks"] = []
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _parsed_or_failure(future, file_key: str, file_hash: str) -> Dict[str, Any]:
+    # İşçi sürecin kendisi düşerse (ör. bellek yetersizliği, sonuç seçilemedi) doküman başarısız sayılır.
+    try:
+        return future.result()
+    except Exception as e:
+        return {"file_key": file_key, "file_hash": file_hash, "chunks": [], "pages": 0, "error": f"{type(e).__name__}: {e}"}
+
+
+class IngestManifest:
+    # Tamamlanan dokümanların özeti. Her güncellemede geçici dosyaya yazılıp yerine taşınır;
+    # yarıda kalan bir yazım önceki manifesti bozmaz.
+    def __init__(self, path: str, collection_name: str, model_name: str):
+        self.path = path
+        self.collection_name = collection_name
+        self.model_name = model_name
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("model") != model_name or data.get("collection") != collection_name:
+                raise SystemExit(
+                    f"Manifest farklı bir koleksiyon/model için oluşturulmuş ({data.get('collection')}, {data.get('model')}). "
+                    "--recreate ile baştan içe aktarın."
+                )
+            self.files = data.get("files", {})
+
+    def is_current(self, file_key: str, file_hash: str) -> bool:
+        entry = self.files.get(file_key)
+        return bool(entry) and entry.get("sha256") == file_hash
+
+    def mark_done(self, file_key: str, file_hash: str, chunks: int, pages: int) -> None:
+        with self._lock:
+            self.files[file_key] = {"sha256": file_hash, "chunks": chunks, "pages": pages, "ingested_at": time.time()}
+            self._save()
+
+    def remove(self, file_key: str) -> None:
+        with self._lock:
+            self.files.pop(file_key, None)
+            self._save()
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"collection": self.collection_name, "model": self.model_name, "files": self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(temporary, self.path)
+
+
+class _PendingDocument:
+    def __init__(self, parsed: Dict[str, Any]):
+        self.file_key = parsed["file_key"]
+        self.file_hash = parsed["file_hash"]
+        self.pages = parsed["pages"]
+        self.point_ids = [chunk["id"] for chunk in parsed["chunks"]]
+        self.unbatched = len(self.point_ids)
+        self.in_flight = 0
+        self.failed = False
+
+
+class IngestionPipeline:
+    # Ayrıştırılan dokümanların parçalarını batch'lere toplar, embedding'i ana süreçte üretir ve
+    # upsert'leri upload_workers kadar eş zamanlı gönderir. Bir dokümanın son batch'i yazıldığında
+    # eski parçaları silinir ve doküman manifeste işlenir.
+    def __init__(
+        self,
+        client: "QdrantClient",
+        embeddings,
+        collection_name: str,
+        manifest: IngestManifest,
+        batch_size: int = 64,
+        upload_workers: int = 4,
+    ):
+        self.client = client
+        self.embeddings = embeddings
+        self.collection_name = collection_name
+        self.manifest = manifest
+        self.batch_size = batch_size
+
+        self._buffer: List[Tuple[_PendingDocument, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._uploads = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="ingest-upsert")
+        # Embedding üretimi upsert'lerden hızlıysa bellekte biriken batch sayısını sınırlar.
+        self._slots = threading.BoundedSemaphore(upload_workers * 2)
+        self.stats = Counter()
+
+    def add_document(self, parsed: Dict[str, Any]) -> None:
+        if parsed["error"]:
+            self._count("files_failed")
+            logger.error(f"[INGEST] {parsed['file_key']} ayrıştırılamadı: {parsed['error']}")
+            return
+        document = _PendingDocument(parsed)
+        if not document.point_ids:
+            logger.warning(f"[INGEST] {document.file_key} içinde metin bulunamadı (taranmış PDF olabilir).")
+            self._finalize(document)
+            return
+        for chunk in parsed["chunks"]:
+            self._buffer.append((document, chunk))
+            if len(self._buffer) >= self.batch_size:
+                self._submit_batch()
+
+    def flush(self) -> None:
+        while self._buffer:
+            self._submit_batch()
+        self._uploads.shutdown(wait=True)
+
+    def _submit_batch(self) -> None:
+        batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+        from qdrant_client.http.models import PointStruct
+
+        vectors = self.embeddings.embed_documents([chunk["payload"]["text"] for _, chunk in batch])
+        points = [PointStruct(id=chunk["id"], vector=vector, payload=chunk["payload"]) for (_, chunk), vector in zip(batch, vectors)]
+        documents = Counter()
+        with self._lock:
+            for document, _ in batch:
+                document.unbatched -= 1
+                documents[document] += 1
+            for document in documents:
+                document.in_flight += 1
+            self.stats["chunks_embedded"] += len(points)
+
+        self._slots.acquire()
+        future = self._uploads.submit(self._upsert, points)
+        future.add_done_callback(lambda f: self._on_uploaded(f, list(documents)))
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=30), reraise=True)
+    def _upsert(self, points) -> None:
+        self.client.upsert(collection_name=self.collection_name, points=points, wait=True)
+
+    def _on_uploaded(self, future, documents: List[_PendingDocument]) -> None:
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            logger.error(f"[INGEST] Upsert başarısız: {error}")
+        ready = []
+        with self._lock:
+            if error is None:
+                self.stats["batches_uploaded"] += 1
+            for document in documents:
+                document.in_flight -= 1
+                document.failed = document.failed or error is not None
+                if document.unbatched == 0 and document.in_flight == 0:
+                    ready.append(document)
+        for document in ready:
+            if document.failed:
+                # Manifeste işlenmez; bir sonraki çalıştırmada yeniden denenir.
+                self._count("files_failed")
+            else:
+                self._finalize(document)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _finalize(self, document: _PendingDocument) -> None:
+        try:
+            delete_stale_points(self.client, self.collection_name, document.file_key, document.point_ids)
+        except Exception as e:
+            self._count("files_failed")
+            logger.error(f"[INGEST] {document.file_key} eski parçaları silinemedi: {e}")
+            return
+        self.manifest.mark_done(document.file_key, document.file_hash, len(document.point_ids), document.pages)
+        self._count("files_ingested")
+        logger.info(f"[INGEST] {document.file_key} tamamlandı ({len(document.point_ids)} parça).")
+
+
+def delete_stale_points(client: "QdrantClient", collection_name: str, file_key: str, keep_ids: List[str]) -> None:
+    from qdrant_client.http.models import FieldCondition, Filter, FilterSelector, HasIdCondition, MatchValue
+
+    stale = Filter(
+        must=[FieldCondition(key="dosya_adi", match=MatchValue(value=file_key))],
+        must_not=[HasIdCondition(has_id=keep_ids)] if keep_ids else None,
+    )
+    client.delete(collection_name=collection_name, points_selector=FilterSelector(filter=stale), wait=True)
+
+
+def ensure_collection(client: "QdrantClient", collection_name: str, vector_size: int, recreate: bool) -> None:
+    from qdrant_client.http.models import Distance, PayloadSchemaType, VectorParams
+
+    if recreate and client.collection_exists(collection_name):
+        logger.warning(f"[INGEST] '{collection_name}' koleksiyonu siliniyor (--recreate).")
+        client.delete_collection(collection_name)
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+        )
+        logger.info(f"[INGEST] '{collection_name}' koleksiyonu oluşturuldu (boyut: {vector_size}).")
+    for field in PAYLOAD_INDEX_FIELDS:
+        try:
+            client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=PayloadSchemaType.KEYWORD)
+        except Exception as e:
+            logger.debug(f"[INGEST] '{field}' payload indeksi oluşturulamadı: {e}")
+
+
+def discover_documents(source: str) -> Iterator[Tuple[str, str]]:
+    # (mutlak yol, dosya_adi olarak kullanılan kaynak dizine göreli yol) çiftleri.
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(root, name)
+                yield path, os.path.relpath(path, source).replace(os.sep, "/")
+
+
+def run_ingestion(
+    source: str,
+    client: "QdrantClient",
+    embeddings,
+    collection_name: str,
+    manifest: IngestManifest,
+    workers: int = os.cpu_count() or 2,
+    batch_size: int = 64,
+    upload_workers: int = 4,
+    chunk_size: int = 512,
+    chunk_overlap: int = 64,
+    prune: bool = False,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    pipeline = IngestionPipeline(client, embeddings, collection_name, manifest, batch_size, upload_workers)
+    seen = set()
+    skipped = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: Dict[Any, Tuple[str, str]] = {}
+        for path, file_key in discover_documents(source):
+            seen.add(file_key)
+            file_hash = file_sha256(path)
+            if manifest.is_current(file_key, file_hash):
+                skipped += 1
+                continue
+            # Ayrıştırılmış ama henüz embedding'e girmemiş dokümanlar bellekte birikmesin diye
+            # havuza en fazla workers * 2 iş verilir.
+            if len(in_flight) >= workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pipeline.add_document(_parsed_or_failure(future, *in_flight.pop(future)))
+            in_flight[pool.submit(parse_document, path, file_key, file_hash, chunk_size, chunk_overlap)] = (file_key, file_hash)
+        for future, (file_key, file_hash) in in_flight.items():
+            pipeline.add_document(_parsed_or_failure(future, file_key, file_hash))
+    pipeline.flush()
+
+    pruned = 0
+    if prune:
+        for file_key in sorted(set(manifest.files) - seen):
+            delete_stale_points(client, collection_name, file_key, [])
+            manifest.remove(file_key)
+            pruned += 1
+
+    return {
+        "collection": collection_name,
+        "files_seen": len(seen),
+        "files_skipped_unchanged": skipped,
+        "files_ingested": pipeline.stats["files_ingested"],
+        "files_failed": pipeline.stats["files_failed"],
+        "files_pruned": pruned,
+        "chunks_embedded": pipeline.stats["chunks_embedded"],
+        "batches_uploaded": pipeline.stats["batches_uploaded"],
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hukuki PDF derlemini Qdrant'a artımlı olarak aktarır")
+    parser.add_argument("--source", required=True, help="PDF dosyalarının bulunduğu dizin (alt dizinler dahil)")
+    parser.add_argument("--collection", default=os.getenv("QDRANT_COLLECTION_NAME", "turkiye_hukuk_dokumanlari_v3"))
+    parser.add_argument("--manifest", help="Manifest dosyası (varsayılan: db/ingest/<koleksiyon>.manifest.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="PDF ayrıştırma süreç sayısı")
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding/upsert batch boyutu")
+    parser.add_argument("--upload-workers", type=int, default=4, help="Eş zamanlı upsert sayısı")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=64)
+    parser.add_argument("--prune", action="store_true", help="Kaynak dizinde artık olmayan dosyaların noktalarını sil")
+    parser.add_argument("--recreate", action="store_true", help="Koleksiyonu ve manifesti silip baştan aktar")
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+    from tools.embedding_backends import EMBEDDING_MODEL_NAME, create_embeddings
+
+    if not os.getenv("QDRANT_URL"):
+        raise SystemExit("QDRANT_URL ortam değişkeni ayarlanmamış.")
+    manifest_path = args.manifest or os.path.join("db", "ingest", f"{args.collection}.manifest.json")
+    if args.recreate and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), prefer_grpc=True, timeout=60.0)
+    embeddings = create_embeddings(EMBEDDING_MODEL_NAME)
+    vector_size = len(embeddings.embed_query("boyut"))
+    ensure_collection(client, args.collection, vector_size, args.recreate)
+
+    manifest = IngestManifest(manifest_path, args.collection, EMBEDDING_MODEL_NAME)
+    summary = run_ingestion(
+        args.source, client, embeddings, args.collection, manifest,
+        workers=args.workers, batch_size=args.batch_size, upload_workers=args.upload_workers,
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, prune=args.prune,
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if summary["files_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
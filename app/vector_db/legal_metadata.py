@@ -0,0 +1,125 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from tools.legal_terms import LEGAL_AREA_KEYWORDS
+
+# Arama aracının (_format_hit) okuduğu payload alanları buradan üretilir:
+# dosya_adi, dokuman_tipi, ana_hukuk_alani, hakkinda_konu, etiket, madde_no, kanun_referanslari, chunk_index.
+
+_TURKISH_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+# Kanun metinlerindeki madde başlıkları: "MADDE 86-", "Madde 12 –", satır başında.
+ARTICLE_HEADER_PATTERN = re.compile(r"^\s*madde\s+(\d+)\b", re.MULTILINE)
+# Metin içi atıflar: "madde 506", "m. 506", "506. maddesi", "506'ncı madde".
+ARTICLE_REFERENCE_PATTERN = re.compile(r"\b(?:madde\w*|md\.?|m\.)\s*(\d+)|\b(\d+)\s*(?:[.'’]\w*)?\s*madde")
+NUMBERED_LAW_PATTERN = re.compile(r"\b(\d{3,4})\s+sayılı\b")
+STATUTE_ABBREVIATIONS = ["tck", "tmk", "tbk", "ttk", "hmk", "cmk", "iik", "iyuk", "vuk", "aym"]
+STATUTE_ABBREVIATION_PATTERN = re.compile(r"\b(" + "|".join(STATUTE_ABBREVIATIONS) + r")\b")
+
+# Sıra önemlidir: mahkeme kararları kanunlara atıf yaptığından önce kontrol edilir.
+DOCUMENT_TYPE_RULES = [
+    ("anayasa_mahkemesi_karari", ["anayasa mahkemesi"], ["karar"]),
+    ("yargitay_karari", ["yargıtay"], ["esas", "karar"]),
+    ("danistay_karari", ["danıştay"], ["esas", "karar"]),
+    ("yonetmelik", ["yönetmelik", "yonetmelik"], []),
+    ("teblig", ["tebliğ", "teblig"], []),
+    ("genelge", ["genelge"], []),
+    ("kanun", ["kanun"], ["madde"]),
+]
+TITLE_MAX_LENGTH = 200
+MAX_TAGS = 8
+
+
+def turkish_lower(text: str) -> str:
+    return text.translate(_TURKISH_LOWER).lower()
+
+
+def _keyword_pattern(keyword: str) -> re.Pattern:
+    # Kelime başından eşleşir: "iş" -> "işçi", "işveren" eşleşir ama "kişi" eşleşmez.
+    return re.compile(r"\b" + re.escape(keyword))
+
+
+_AREA_PATTERNS = {
+    area: [(keyword, _keyword_pattern(keyword)) for keyword in keywords]
+    for area, keywords in LEGAL_AREA_KEYWORDS.items()
+}
+
+
+def detect_document_type(file_name: str, text: str) -> str:
+    head = turkish_lower(f"{file_name}\n{text[:3000]}")
+    for document_type, markers, required in DOCUMENT_TYPE_RULES:
+        if any(marker in head for marker in markers) and all(word in head for word in required):
+            return document_type
+    return "diger"
+
+
+def detect_legal_area(text: str) -> Optional[str]:
+    lower = turkish_lower(text)
+    scores = {area: sum(len(pattern.findall(lower)) for _, pattern in patterns) for area, patterns in _AREA_PATTERNS.items()}
+    area, score = max(scores.items(), key=lambda item: item[1])
+    return area if score else None
+
+
+def extract_tags(text: str) -> List[str]:
+    lower = turkish_lower(text)
+    counts = {}
+    for patterns in _AREA_PATTERNS.values():
+        for keyword, pattern in patterns:
+            hits = len(pattern.findall(lower))
+            if hits:
+                counts[keyword] = counts.get(keyword, 0) + hits
+    return [keyword for keyword, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:MAX_TAGS]]
+
+
+def extract_title(text: str, metadata_title: Optional[str] = None) -> str:
+    if metadata_title and metadata_title.strip():
+        return metadata_title.strip()[:TITLE_MAX_LENGTH]
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) >= 5 and not line.isdigit():
+            return line[:TITLE_MAX_LENGTH]
+    return ""
+
+
+def extract_article_numbers(text: str) -> List[str]:
+    lower = turkish_lower(text)
+    numbers = [after or before for after, before in ARTICLE_REFERENCE_PATTERN.findall(lower)]
+    numbers += ARTICLE_HEADER_PATTERN.findall(lower)
+    return sorted(set(numbers), key=int)
+
+
+def extract_statute_references(text: str) -> List[str]:
+    lower = turkish_lower(text)
+    references = {f"{number} sayılı" for number in NUMBERED_LAW_PATTERN.findall(lower)}
+    references.update(abbreviation.upper() for abbreviation in STATUTE_ABBREVIATION_PATTERN.findall(lower))
+    return sorted(references)
+
+
+def article_headers(text: str) -> List[tuple]:
+    # (başlangıç konumu, madde numarası) listesi; bir chunk'ın hangi maddenin içinde kaldığını bulmak için.
+    return [(match.start(), match.group(1)) for match in ARTICLE_HEADER_PATTERN.finditer(turkish_lower(text))]
+
+
+def chunk_payload(
+    chunk_text: str,
+    chunk_index: int,
+    document: Dict[str, Any],
+    current_article: Optional[str],
+    page: int,
+) -> Dict[str, Any]:
+    # document: dokümanın tamamından bir kez çıkarılan alanlar (dosya_adi, dokuman_tipi, ana_hukuk_alani, hakkinda_konu).
+    article_numbers = extract_article_numbers(chunk_text)
+    if current_article and current_article not in article_numbers:
+        article_numbers.insert(0, current_article)
+    return {
+        "text": chunk_text,
+        "dosya_adi": document["dosya_adi"],
+        "dokuman_tipi": document["dokuman_tipi"],
+        "ana_hukuk_alani": document["ana_hukuk_alani"],
+        "hakkinda_konu": document["hakkinda_konu"],
+        "etiket": extract_tags(chunk_text),
+        "madde_no": article_numbers,
+        "kanun_referanslari": extract_statute_references(chunk_text),
+        "chunk_index": chunk_index,
+        "sayfa": page,
+        "dosya_hash": document["dosya_hash"],
+    }
@@ -1,3 +1,9 @@
+// v1: AES-CBC (eski istemciler). v2: HKDF ile türetilen AES-256-GCM anahtarı, parça bazlı şifreleme.
+const LEGACY_PROTOCOL_VERSION = 1;
+const GCM_PROTOCOL_VERSION = 2;
+const GCM_KEY_INFO = 'legal-analysis/aes-256-gcm/v2';
+const GCM_NONCE_PREFIX_BYTES = 8;
+
 function arrayBufferToBase64(buffer) {
     const bytes = new Uint8Array(buffer);
     let binary = '';
@@ -36,9 +42,15 @@ class SecureCommunication {
         this.sessionId = null;
         this.aesKey = null;
         this.aesIv = null;
+        this.gcmKey = null;
+        this.protocolVersion = GCM_PROTOCOL_VERSION;
         this.isInitialized = false;
     }
 
+    chunkAad(messageId, index, isFinal) {
+        return new TextEncoder().encode(`${messageId}:${index}:${isFinal ? 1 : 0}`);
+    }
+
     async initialize() {
         try {
             const response = await fetch('/api/get_public_key');
@@ -60,6 +72,23 @@ class SecureCommunication {
             );
             
             const rawKey = await window.crypto.subtle.exportKey("raw", aesKey);
+
+            const hkdfKey = await window.crypto.subtle.importKey("raw", rawKey, "HKDF", false, ["deriveKey"]);
+            this.gcmKey = await window.crypto.subtle.deriveKey(
+                {
+                    name: "HKDF",
+                    hash: "SHA-256",
+                    salt: new Uint8Array(0),
+                    info: new TextEncoder().encode(GCM_KEY_INFO)
+                },
+                hkdfKey,
+                {
+                    name: "AES-GCM",
+                    length: 256
+                },
+                false,
+                ["encrypt", "decrypt"]
+            );
             
             this.aesIv = window.crypto.getRandomValues(new Uint8Array(16));
             
@@ -123,6 +152,10 @@ class SecureCommunication {
 
         try {
             const dataString = typeof data === 'object' ? JSON.stringify(data) : data;
+
+            if (this.protocolVersion === GCM_PROTOCOL_VERSION) {
+                return await this.encryptGcm(dataString);
+            }
             
             const encryptedData = await window.crypto.subtle.encrypt(
                 {
@@ -140,11 +173,98 @@ class SecureCommunication {
         }
     }
 
+    async encryptGcm(dataString) {
+        // İstek gövdeleri küçük olduğu için tek (ve son) parça olarak gönderilir.
+        const messageId = arrayBufferToBase64(window.crypto.getRandomValues(new Uint8Array(12)));
+        const nonce = new Uint8Array(GCM_NONCE_PREFIX_BYTES + 4);
+        nonce.set(window.crypto.getRandomValues(new Uint8Array(GCM_NONCE_PREFIX_BYTES)));
+
+        const ciphertext = await window.crypto.subtle.encrypt(
+            {
+                name: "AES-GCM",
+                iv: nonce,
+                additionalData: this.chunkAad(messageId, 0, true)
+            },
+            this.gcmKey,
+            new TextEncoder().encode(dataString)
+        );
+
+        return {
+            v: GCM_PROTOCOL_VERSION,
+            m: messageId,
+            alg: 'AES-256-GCM',
+            chunks: [{ i: 0, n: arrayBufferToBase64(nonce), c: arrayBufferToBase64(ciphertext), f: true }]
+        };
+    }
+
+    async decryptGcm(envelope) {
+        const chunks = envelope.chunks || [];
+        if (!chunks.length || !chunks[chunks.length - 1].f) {
+            throw new Error('Encrypted message is incomplete');
+        }
+
+        const decoder = new TextDecoder();
+        let text = '';
+        for (let index = 0; index < chunks.length; index++) {
+            const chunk = chunks[index];
+            const isFinal = index === chunks.length - 1;
+            if (chunk.i !== index || Boolean(chunk.f) !== isFinal) {
+                throw new Error('Encrypted message chunks are out of order');
+            }
+            const plaintext = await window.crypto.subtle.decrypt(
+                {
+                    name: "AES-GCM",
+                    iv: base64ToArrayBuffer(chunk.n),
+                    additionalData: this.chunkAad(envelope.m, index, isFinal)
+                },
+                this.gcmKey,
+                base64ToArrayBuffer(chunk.c)
+            );
+            text += decoder.decode(plaintext, { stream: !isFinal });
+        }
+        return JSON.parse(text);
+    }
+
+    async decryptNdjsonResponse(response) {
+        // /api/analyze v2 yanıtı: ilk satır başlık, diğer satırlar şifreli parçalar.
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let header = null;
+        const chunks = [];
+
+        const handleLine = (line) => {
+            if (!line.trim()) return;
+            const item = JSON.parse(line);
+            if (header === null) {
+                header = item;
+            } else {
+                chunks.push(item);
+            }
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.forEach(handleLine);
+        }
+        handleLine(buffer);
+
+        return this.decryptGcm({ ...header, chunks });
+    }
+
     async decryptData(encryptedBase64) {
         if (!this.isInitialized) {
             throw new Error('Secure communication not initialized');
         }
 
+        if (encryptedBase64 && typeof encryptedBase64 === 'object' && encryptedBase64.v === GCM_PROTOCOL_VERSION) {
+            return this.decryptGcm(encryptedBase64);
+        }
+
         try {
             const encryptedData = base64ToArrayBuffer(encryptedBase64);
             
@@ -41,57 +41,25 @@ document.addEventListener('DOMContentLoaded', function() {
         resultDiv.style.display = 'none';
         
         try {
-            let response;
-            let data;
+            let requestBody;
             
             if (secureCommunication.isInitialized) {
                 const encryptedData = await secureCommunication.encryptData({ legal_case: legalCase });
-                
-                response = await fetch('/api/analyze', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({ 
-                        encrypted_data: encryptedData,
-                        session_id: secureCommunication.sessionId
-                    })
-                });
-                
-                if (!response.ok) {
-                    throw new Error('Analiz sırasında bir hata oluştu');
-                }
-                
-                const encryptedResponse = await response.json();
-                
-                if (encryptedResponse.encrypted_data) {
-                    data = await secureCommunication.decryptData(encryptedResponse.encrypted_data);
-                    console.log("Decrypted data received:", data);
-                } else {
-                    throw new Error('Sunucudan şifrelenmiş yanıt alınamadı');
-                }
+                requestBody = { 
+                    encrypted_data: encryptedData,
+                    session_id: secureCommunication.sessionId
+                };
             } else {
                 console.warn('Using unencrypted communication');
                 securityStatus.innerHTML = '<i>⚠️</i> Şifrelenmemiş iletişim kullanılıyor';
                 securityStatus.classList.remove('secure');
                 securityStatus.classList.add('insecure');
-                
-                response = await fetch('/api/analyze', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({ legal_case: legalCase })
-                });
-
-                if (!response.ok) {
-                    throw new Error('Analiz sırasında bir hata oluştu');
-                }
-
-                data = await response.json();
-                console.log("Regular data received:", data);
+                requestBody = { legal_case: legalCase };
             }
             
+            const data = await streamAnalysis(requestBody, updateProgress);
+            console.log("Analysis data received:", data);
+            
             if (data && data.tasks_output) {
                 const conflictAgent = data.tasks_output.find(agent => 
                     agent.agent === "Hukuki Çelişki Tespit ve Entegrasyon Uzmanı"
@@ -120,9 +88,88 @@ document.addEventListener('DOMContentLoaded', function() {
             resultDiv.style.display = 'block';
         } finally {
             loadingDiv.style.display = 'none';
+            loadingDiv.textContent = '';
         }
     });
     
+    const stageMessages = {
+        input_processing: 'Vaka metni netleştiriliyor...',
+        analysis: 'Emsal kararlar ve güncel kaynaklar analiz ediliyor...',
+        report: 'Rapor hazırlanıyor...'
+    };
+    
+    function updateProgress(eventType, data) {
+        if (eventType === 'stage' && stageMessages[data.stage]) {
+            loadingDiv.textContent = stageMessages[data.stage];
+        } else if (eventType === 'cache_hit') {
+            loadingDiv.textContent = 'Benzer bir vakanın analizi bulundu, rapor hazırlanıyor...';
+        } else if (eventType === 'task_completed' && data.agent) {
+            loadingDiv.textContent = `${data.agent} görevini tamamladı.`;
+        } else if (eventType === 'feedback_iteration') {
+            loadingDiv.textContent = data.needs_reanalysis
+                ? `İterasyon ${data.iteration}/${data.max_iterations}: geri bildirimle yeniden analiz ediliyor...`
+                : `İterasyon ${data.iteration}: analiz yeterli bulundu.`;
+        }
+    }
+    
+    async function streamAnalysis(requestBody, onProgress) {
+        const response = await fetch('/api/analyze/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(requestBody)
+        });
+        
+        if (!response.ok) {
+            throw new Error(response.status === 429
+                ? 'Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin'
+                : 'Analiz sırasında bir hata oluştu');
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let separatorIndex;
+            while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, separatorIndex);
+                buffer = buffer.slice(separatorIndex + 2);
+                
+                let eventType = 'message';
+                let eventData = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        eventType = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        eventData += line.slice(5).trim();
+                    }
+                });
+                if (!eventData) continue;
+                
+                let payload = JSON.parse(eventData);
+                if (payload.encrypted_data) {
+                    payload = await secureCommunication.decryptData(payload.encrypted_data);
+                }
+                
+                if (eventType === 'completed') {
+                    return payload.result;
+                }
+                if (eventType === 'failed' || eventType === 'error') {
+                    throw new Error(payload.error || 'Analiz sırasında bir hata oluştu');
+                }
+                onProgress(eventType, payload);
+            }
+        }
+        
+        throw new Error('Analiz akışı beklenmedik şekilde sonlandı');
+    }
+    
     clearButton.addEventListener('click', function(e) {
         e.preventDefault();
         
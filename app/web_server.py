@@ -2,68 +2,150 @@ import sys
 import os
 import traceback
 import logging
-from flask import Flask, request, jsonify, send_from_directory
+import json
+import time
+import threading
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.crypto_utils import crypto_manager
+from utils.crypto_utils import GCM_PROTOCOL_VERSION, crypto_manager, encryption_protocol_version
+from utils.job_manager import AnalysisJobManager, JobQueueFullError
+from utils.batch_runner import BatchAnalysisRunner, BatchInputError, parse_batch_cases, parse_jsonl_cases
+from utils.rate_limit import llm_scheduler
+from utils.context_budget import context_budget
+from tools.web_cache import web_fetcher
+from crews.crew_pool import DEFAULT_POOL_SIZE, RESERVED_INTERACTIVE, CrewPoolExhaustedError
+from utils.progress import emit_progress
+from utils.analysis_cache import AnalysisResultCache, build_config_fingerprint
+from utils.llm_cache import LLM_MODEL, llm_call_layer
+from utils.redis_client import redis_health
+from utils.warmup import WarmupRunner, WarmupStep
+from utils.metrics import (
+    HTTP_REQUEST_SECONDS, PIPELINE_STAGE_SECONDS, bind_request_id, install_request_id_logging,
+    kickoff_with_metrics, new_request_id, render_metrics, reset_request_id, timed,
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
+install_request_id_logging()
 
 app = Flask(__name__, static_folder='web', static_url_path='')
 CORS(app)
 
+@app.before_request
+def _start_request_tracking():
+    g.request_id = request.headers.get('X-Request-ID') or new_request_id()
+    g.request_id_token = bind_request_id(g.request_id)
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _finish_request_tracking(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUEST_SECONDS.labels(
+        endpoint=endpoint,
+        method=request.method,
+        status=str(response.status_code),
+    ).observe(time.perf_counter() - g.request_started)
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def _reset_request_tracking(exc=None):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        reset_request_id(token)
+
+PIPELINE_VERSION = '3.0.0'
+
 confidence_threshold = 0.80
 max_iterations = 3
 
-legal_input_processor = None
-legal_analysis_processor = None
-legal_feedback_processor = None
-feedback = None
+JOB_MAX_LONG_POLL_SECONDS = float(os.getenv('ANALYSIS_JOB_MAX_WAIT', 30))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv('ANALYSIS_JOB_RETRY_AFTER', 30))
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', 15))
+
+crew_pool = None
 report_generator = None
 llm_crews_initialized = False
+_llm_crews_lock = threading.Lock()
+
+EAGER_WARMUP = os.getenv('EAGER_WARMUP', 'false').lower() == 'true'
 
 def initialize_llm_crews():
-    from crews.legal_input_processing_crew import LegalInputProcessingCrew
-    from crews.legal_analysis_crew import LegalAnalysisProcessingCrew
-    from crews.legal_feedback_crew import LegalFeedbackCrew
-    from crews.feedback import Feedback
+    from crews.crew_pool import CrewPool, build_crew_bundle
     from utils.advanced_report_generator import AdvancedLegalReportGenerator
 
     try:
-        local_legal_input_processor = LegalInputProcessingCrew().crew()
-        local_legal_analysis_processor = LegalAnalysisProcessingCrew().crew()
-        local_legal_feedback_processor = LegalFeedbackCrew().crew()
-        local_feedback = Feedback(local_legal_analysis_processor, local_legal_feedback_processor, max_iterations)
+        # Her istek havuzdan kendi ekip demetini alır; ekipler istekler arasında paylaşılmaz.
+        local_crew_pool = CrewPool(lambda: build_crew_bundle(max_iterations))
+        local_crew_pool.prefill()
         local_report_generator = AdvancedLegalReportGenerator(confidence_threshold, max_iterations)
         
-        logger.info("[SYSTEM] LLM ekipleri başarıyla başlatıldı.")
+        logger.info(f"[SYSTEM] LLM ekipleri başarıyla başlatıldı (havuz: {local_crew_pool.size} demet).")
 
-        return local_legal_input_processor, local_legal_analysis_processor, local_legal_feedback_processor, local_feedback, local_report_generator
+        return local_crew_pool, local_report_generator
     except Exception as e:
         logger.error(f"[SYSTEM] LLM ekipleri başlatılırken hata: {str(e)}", exc_info=True)
         raise e
 
 def lazy_initialize_llm_crews():
-    global legal_input_processor, legal_analysis_processor, legal_feedback_processor, feedback, report_generator, llm_crews_initialized
+    global crew_pool, report_generator, llm_crews_initialized
     
     if llm_crews_initialized:
         return
 
-    logger.info("[SYSTEM] LLM ekipleri başlatılıyor...")
-    try:
-        (
-            legal_input_processor,
-            legal_analysis_processor,
-            legal_feedback_processor,
-            feedback,
-            report_generator,
-        ) = initialize_llm_crews()
-        llm_crews_initialized = True
-    except Exception as e:
-        logger.error(f"[SYSTEM] Tembel başlatma sırasında LLMler yüklenemedi: {str(e)}", exc_info=True)
+    # Aynı anda gelen ilk istekler (veya ön ısıtma) ekipleri birden fazla kez kurmasın diye kilitlenir;
+    # bekleyenler kurulum bitince hazır nesneleri kullanır.
+    with _llm_crews_lock:
+        if llm_crews_initialized:
+            return
+
+        logger.info("[SYSTEM] LLM ekipleri başlatılıyor...")
+        try:
+            crew_pool, report_generator = initialize_llm_crews()
+            llm_crews_initialized = True
+        except Exception as e:
+            logger.error(f"[SYSTEM] Tembel başlatma sırasında LLMler yüklenemedi: {str(e)}", exc_info=True)
+
+def _warmup_crews():
+    lazy_initialize_llm_crews()
+    if not llm_crews_initialized:
+        raise RuntimeError("LLM ekipleri başlatılamadı.")
+
+def _warmup_embedding():
+    # Ekipler kurulurken model yüklenir; ilk çıkarım (tokenizer, ağırlıkların belleğe alınması) burada yapılır.
+    from tools.qdrant_vector_search_tool import get_shared_embedding_service
+    service = get_shared_embedding_service()
+    if service is None:
+        raise RuntimeError("Embedding modeli yüklenmedi.")
+    return {'dimension': len(service.embed_query("ön ısıtma sorgusu"))}
+
+def _warmup_qdrant():
+    from tools.qdrant_vector_search_tool import get_shared_qdrant_client, get_shared_local_index
+    local_index = get_shared_local_index()
+    if local_index is not None and local_index.ready:
+        return {'local_index': local_index.stats()}
+    client = get_shared_qdrant_client()
+    if client is None:
+        raise RuntimeError("Qdrant bağlantısı kurulamadı.")
+    return {'collections': len(client.get_collections().collections)}
+
+def _warmup_crypto():
+    if not crypto_manager.ensure_ready():
+        raise RuntimeError("Redis'e bağlanılamadı; şifreli oturumlar kullanılamaz.")
+
+warmup_runner = WarmupRunner([
+    WarmupStep('llm_crews', _warmup_crews),
+    WarmupStep('embedding_model', _warmup_embedding),
+    WarmupStep('qdrant', _warmup_qdrant, required=False),
+    WarmupStep('crypto', _warmup_crypto, required=False),
+])
+
+def start_background_warmup():
+    if EAGER_WARMUP:
+        warmup_runner.start()
 
 @app.route('/')
 def index():
@@ -101,55 +183,156 @@ def exchange_key():
         logger.error(f"Anahtar değişimi sırasında hata: {str(e)}", exc_info=True)
         return jsonify({'error': "Sunucuda bir hata oluştu."}), 500
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze_legal_case():
-    lazy_initialize_llm_crews()
+def _parse_analysis_request():
+    # Şifreli isteklerde üçüncü değer istemcinin kullandığı protokol sürümüdür (1: CBC, 2: GCM),
+    # şifresiz isteklerde 0'dır; yanıt aynı sürümle şifrelenir.
+    data = request.get_json(silent=True) or {}
+    encrypted_data = data.get('encrypted_data')
+    session_id = data.get('session_id')
+    encryption_version = encryption_protocol_version(encrypted_data) if encrypted_data else 0
 
-    if not legal_input_processor:
-        return jsonify({'error': 'Analiz servisi şu anda mevcut değil. Lütfen daha sonra tekrar deneyin.'}), 503
+    if encrypted_data:
+        if not session_id:
+            return None, session_id, encryption_version, (jsonify({'error': 'Şifreli istekler için session_id zorunludur.'}), 400)
+        try:
+            decrypted_data = crypto_manager.decrypt_data(encrypted_data, session_id)
+            legal_case_input = decrypted_data.get('legal_case', '')
+        except Exception as e:
+            logger.error(f"Şifre çözme hatası. Oturum: {session_id}, Hata: {str(e)}", exc_info=True)
+            return None, session_id, encryption_version, (jsonify({'error': 'Veri şifresi çözülemedi. Oturum zaman aşımına uğramış olabilir.'}), 400)
+    else:
+        legal_case_input = data.get('legal_case', '')
 
-    try:
-        data = request.get_json()
-        encrypted_data = data.get('encrypted_data')
-        session_id = data.get('session_id')
+    if not legal_case_input:
+        return None, session_id, encryption_version, (jsonify({'error': 'legal_case verisi zorunludur.'}), 400)
 
-        if encrypted_data:
-            if not session_id:
-                return jsonify({'error': 'Şifreli istekler için session_id zorunludur.'}), 400
-            try:
-                decrypted_data = crypto_manager.decrypt_data(encrypted_data, session_id)
-                legal_case_input = decrypted_data.get('legal_case', '')
-            except Exception as e:
-                logger.error(f"Şifre çözme hatası. Oturum: {session_id}, Hata: {str(e)}", exc_info=True)
-                return jsonify({'error': 'Veri şifresi çözülemedi. Oturum zaman aşımına uğramış olabilir.'}), 400
-        else:
-            legal_case_input = data.get('legal_case', '')
-        
-        if not legal_case_input:
-            return jsonify({'error': 'legal_case verisi zorunludur.'}), 400
+    return legal_case_input, session_id, encryption_version, None
 
-        logger.info(f"[SERVER] LLM analizi başlatılıyor. Oturum: {session_id}")
-        logger.info(f"[SERVER] Analiz edilen vaka (ilk 100 karakter): {legal_case_input[:100]}...")
+def _embed_for_analysis_cache(texts):
+    from tools.qdrant_vector_search_tool import get_shared_embedding_service
+    embedding_service = get_shared_embedding_service()
+    if not embedding_service:
+        raise RuntimeError("Embedding servisi henüz başlatılmadı.")
+    return embedding_service.embed_queries(texts)
 
-        processed_legal_data = legal_input_processor.kickoff(
-            inputs={'topic': legal_case_input}
-        )
+analysis_cache = AnalysisResultCache(
+    config_fingerprint=build_config_fingerprint(
+        [PIPELINE_VERSION, confidence_threshold, max_iterations, LLM_MODEL],
+        [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', name) for name in ('tasks.yaml', 'agents.yaml')],
+    ),
+    embed_fn=_embed_for_analysis_cache,
+)
+
+def _extract_clarified_text(processed_legal_data):
+    if not isinstance(processed_legal_data, dict):
+        return str(processed_legal_data or '')
+
+    raw_content = processed_legal_data.get('raw') or ''
+    cleaned = raw_content.strip()
+    if cleaned.startswith("```json"):
+        cleaned = cleaned.replace("```json", "").replace("```", "").strip()
+    try:
+        parsed = json.loads(cleaned)
+        if isinstance(parsed, dict) and parsed.get('açık_hukuki_metin'):
+            return str(parsed['açık_hukuki_metin'])
+    except json.JSONDecodeError:
+        pass
+    return raw_content
+
+def run_analysis_pipeline(legal_case_input, session_id=None):
+    logger.info(f"[SERVER] LLM analizi başlatılıyor. Oturum: {session_id}")
+    logger.info(f"[SERVER] Analiz edilen vaka (ilk 100 karakter): {legal_case_input[:100]}...")
+
+    with crew_pool.acquire() as crews:
+        emit_progress('stage', {'stage': 'input_processing'})
+        with timed(PIPELINE_STAGE_SECONDS, stage='input_processing'):
+            processed_legal_data = kickoff_with_metrics(
+                crews.input_processor,
+                {'topic': legal_case_input}
+            )
         
         if hasattr(processed_legal_data, "model_dump"):
             processed_legal_data = processed_legal_data.model_dump()
           
-        legal_analysis_data = feedback.process_feedback(processed_legal_data, confidence_threshold)
-        
+        clarified_text = _extract_clarified_text(processed_legal_data)
+        with timed(PIPELINE_STAGE_SECONDS, stage='cache_lookup'):
+            cached_report = analysis_cache.get(clarified_text)
+        if cached_report is not None:
+            emit_progress('cache_hit', {'stage': 'analysis'})
+        else:
+            emit_progress('stage', {'stage': 'analysis'})
+            with timed(PIPELINE_STAGE_SECONDS, stage='analysis'):
+                legal_analysis_data = crews.feedback.process_feedback(processed_legal_data, confidence_threshold)
+
+    # Rapor üretimi ekip kullanmaz; demet bu aşamadan önce havuza geri bırakılır.
+    if cached_report is not None:
+        optimized_report = cached_report
+    else:
         if hasattr(legal_analysis_data, "model_dump"):
             legal_analysis_data = legal_analysis_data.model_dump()
 
-        optimized_report = report_generator.generate_optimized_report(legal_analysis_data)
-        optimized_report["input_text"] = legal_case_input
-        
-        json_filename = report_generator.save_report(optimized_report)
-        logger.info(f"[SERVER] Rapor kaydedildi: {json_filename}")
+        emit_progress('stage', {'stage': 'report'})
+        with timed(PIPELINE_STAGE_SECONDS, stage='report'):
+            optimized_report = report_generator.generate_optimized_report(legal_analysis_data)
+        analysis_cache.set(clarified_text, optimized_report)
+
+    optimized_report["input_text"] = legal_case_input
+    
+    json_filename = report_generator.save_report(optimized_report)
+    logger.info(f"[SERVER] Rapor kaydedildi: {json_filename}")
+
+    return optimized_report
+
+def _run_analysis_job(job):
+    lazy_initialize_llm_crews()
+    if not crew_pool:
+        raise RuntimeError("Analiz servisi başlatılamadı.")
+    return run_analysis_pipeline(job.payload['legal_case'], job.session_id)
+
+job_manager = AnalysisJobManager(
+    _run_analysis_job,
+    max_workers=int(os.getenv('ANALYSIS_WORKERS', 2)),
+    max_queue_size=int(os.getenv('ANALYSIS_QUEUE_SIZE', 20)),
+    job_ttl=int(os.getenv('ANALYSIS_JOB_TTL', 3600)),
+)
+
+def _run_batch_case(legal_case_input):
+    lazy_initialize_llm_crews()
+    if not crew_pool:
+        raise RuntimeError("Analiz servisi başlatılamadı.")
+    return run_analysis_pipeline(legal_case_input)
+
+batch_runner = BatchAnalysisRunner(
+    _run_batch_case,
+    # Varsayılan, havuzun etkileşimli isteklere ayrılmayan kısmıdır; toplu vakalar havuz kapısında beklemez.
+    max_concurrency=int(os.getenv('BATCH_CONCURRENCY', max(1, DEFAULT_POOL_SIZE - RESERVED_INTERACTIVE))),
+    max_cases=int(os.getenv('BATCH_MAX_CASES', 500)),
+    heartbeat_seconds=SSE_KEEPALIVE_SECONDS,
+)
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_legal_case():
+    lazy_initialize_llm_crews()
+
+    if not crew_pool:
+        return jsonify({'error': 'Analiz servisi şu anda mevcut değil. Lütfen daha sonra tekrar deneyin.'}), 503
+
+    try:
+        legal_case_input, session_id, encryption_version, error_response = _parse_analysis_request()
+        if error_response:
+            return error_response
+
+        try:
+            optimized_report = run_analysis_pipeline(legal_case_input, session_id)
+        except CrewPoolExhaustedError:
+            logger.warning("[SERVER] Boşta ekip bulunamadı, istek reddedildi.")
+            response = jsonify({'error': 'Sunucu şu anda yoğun. Lütfen daha sonra tekrar deneyin.'})
+            response.headers['Retry-After'] = str(JOB_RETRY_AFTER_SECONDS)
+            return response, 503
         
-        if encrypted_data:
+        if encryption_version == GCM_PROTOCOL_VERSION:
+            return _stream_encrypted_report(optimized_report, session_id)
+        if encryption_version:
             try:
                 encrypted_response = crypto_manager.encrypt_data(optimized_report, session_id)
                 return jsonify({'encrypted_data': encrypted_response})
@@ -164,14 +347,236 @@ def analyze_legal_case():
         traceback.print_exc()
         return jsonify({'error': 'Analiz sırasında sunucuda beklenmedik bir hata oluştu.'}), 500
 
+def _stream_encrypted_report(report, session_id):
+    # v2 yanıtı NDJSON olarak akıtılır: ilk satır başlık, sonraki her satır şifreli bir parça.
+    # Parçalar rapor JSON'a dönüştürülürken üretildiği için yanıt belleği parça boyutuyla sınırlıdır.
+    chunks = crypto_manager.iter_encrypted_chunks(report, session_id)
+    try:
+        header = next(chunks)
+    except Exception as e:
+        logger.error(f"Yanıt şifreleme hatası. Oturum: {session_id}, Hata: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Yanıt şifrelenirken bir hata oluştu.'}), 500
+
+    def generate():
+        yield json.dumps(header) + "\n"
+        for chunk in chunks:
+            yield json.dumps(chunk) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _submit_job_from_request():
+    legal_case_input, session_id, encryption_version, error_response = _parse_analysis_request()
+    if error_response:
+        return None, error_response
+
+    try:
+        job = job_manager.submit(
+            {'legal_case': legal_case_input},
+            session_id=session_id,
+            encrypted=bool(encryption_version),
+            encryption_version=encryption_version or 1,
+        )
+    except JobQueueFullError:
+        logger.warning("[SERVER] Analiz kuyruğu dolu, istek reddedildi.")
+        response = jsonify({'error': 'Sunucu şu anda yoğun. Lütfen daha sonra tekrar deneyin.'})
+        response.headers['Retry-After'] = str(JOB_RETRY_AFTER_SECONDS)
+        return None, (response, 429)
+
+    return job, None
+
+def _format_sse_event(job, event):
+    if job.encrypted:
+        payload = {'encrypted_data': crypto_manager.encrypt_for_protocol(event['data'], job.session_id, job.encryption_version)}
+    else:
+        payload = event['data']
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def _stream_job_events(job, cursor=0):
+    def generate():
+        position = cursor
+        while True:
+            current_job, events = job_manager.wait_for_events(job.job_id, position, SSE_KEEPALIVE_SECONDS)
+            if not current_job:
+                return
+            if not events:
+                # Proxy'lerin bağlantıyı kapatmaması için yorum satırı gönderilir.
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                position = event['id'] + 1
+                try:
+                    yield _format_sse_event(current_job, event)
+                except Exception as e:
+                    logger.error(f"Olay şifreleme hatası. Oturum: {current_job.session_id}, Hata: {str(e)}", exc_info=True)
+                    yield f"event: error\ndata: {json.dumps({'error': 'Yanıt şifrelenirken bir hata oluştu.'})}\n\n"
+                    return
+                if event['type'] in ('completed', 'failed'):
+                    return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+def _parse_batch_request():
+    # Vakalar üç biçimde gelebilir: JSON {"cases": [...]}, multipart "file" alanında JSONL dosyası
+    # veya application/x-ndjson gövde. Şifreli isteklerde çözülen veri {"cases": [...]} içerir.
+    if 'file' in request.files:
+        content = request.files['file'].read().decode('utf-8-sig')
+        return parse_jsonl_cases(content, batch_runner.max_cases), None, 0
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return parse_jsonl_cases(request.get_data(as_text=True), batch_runner.max_cases), None, 0
+
+    data = request.get_json(silent=True) or {}
+    encrypted_data = data.get('encrypted_data')
+    session_id = data.get('session_id')
+    if not encrypted_data:
+        return parse_batch_cases(data.get('cases'), batch_runner.max_cases), session_id, 0
+    if not session_id:
+        raise BatchInputError('Şifreli istekler için session_id zorunludur.')
+    encryption_version = encryption_protocol_version(encrypted_data)
+    try:
+        decrypted_data = crypto_manager.decrypt_data(encrypted_data, session_id)
+    except Exception as e:
+        logger.error(f"Şifre çözme hatası. Oturum: {session_id}, Hata: {str(e)}", exc_info=True)
+        raise BatchInputError('Veri şifresi çözülemedi. Oturum zaman aşımına uğramış olabilir.')
+    return parse_batch_cases(decrypted_data.get('cases'), batch_runner.max_cases), session_id, encryption_version
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_legal_case_batch():
+    # Yanıt application/x-ndjson olarak akıtılır: her vaka bittiğinde bir "case" satırı, uzun
+    # aralıklarda "heartbeat" satırları ve en sonda toplam verim ile vaka durumlarını içeren "summary" satırı.
+    try:
+        cases, session_id, encryption_version = _parse_batch_request()
+    except BatchInputError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'JSONL dosyası UTF-8 olmalıdır.'}), 400
+
+    lazy_initialize_llm_crews()
+    if not crew_pool:
+        return jsonify({'error': 'Analiz servisi şu anda mevcut değil. Lütfen daha sonra tekrar deneyin.'}), 503
+
+    def generate():
+        for row in batch_runner.run(cases):
+            if encryption_version:
+                try:
+                    row = {'type': row['type'], 'encrypted_data': crypto_manager.encrypt_for_protocol(row, session_id, encryption_version)}
+                except Exception as e:
+                    logger.error(f"Yanıt şifreleme hatası. Oturum: {session_id}, Hata: {str(e)}", exc_info=True)
+                    yield json.dumps({'type': 'error', 'error': 'Yanıt şifrelenirken bir hata oluştu.'}) + "\n"
+                    return
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def stream_legal_analysis():
+    job, error_response = _submit_job_from_request()
+    if error_response:
+        return error_response
+    return _stream_job_events(job)
+
+@app.route('/api/analyze/jobs/<job_id>/events')
+def stream_analysis_job_events(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'İş bulunamadı veya süresi doldu.'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        cursor = int(last_event_id) + 1 if last_event_id is not None else 0
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID sayısal olmalıdır.'}), 400
+
+    return _stream_job_events(job, cursor)
+
+@app.route('/api/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    job, error_response = _submit_job_from_request()
+    if error_response:
+        return error_response
+
+    return jsonify({
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_url': f"/api/analyze/jobs/{job.job_id}",
+    }), 202
+
+@app.route('/api/analyze/jobs/<job_id>')
+def get_analysis_job(job_id):
+    try:
+        wait_seconds = min(float(request.args.get('wait', 0)), JOB_MAX_LONG_POLL_SECONDS)
+    except ValueError:
+        return jsonify({'error': 'wait parametresi sayısal olmalıdır.'}), 400
+
+    job = job_manager.wait(job_id, wait_seconds) if wait_seconds > 0 else job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'İş bulunamadı veya süresi doldu.'}), 404
+
+    response = job.to_dict()
+    if job.status == job.COMPLETED:
+        if job.encrypted:
+            try:
+                response['encrypted_data'] = crypto_manager.encrypt_for_protocol(job.result, job.session_id, job.encryption_version)
+            except Exception as e:
+                logger.error(f"Yanıt şifreleme hatası. Oturum: {job.session_id}, Hata: {str(e)}", exc_info=True)
+                return jsonify({'error': 'Yanıt şifrelenirken bir hata oluştu.'}), 500
+        else:
+            response['result'] = job.result
+
+    return jsonify(response)
+
+@app.route('/metrics')
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/api/ready')
+def readiness_check():
+    # Yük dengeleyici için: ön ısıtma açıksa zorunlu adımlar bitene kadar 503 döner.
+    # Ön ısıtma kapalıysa bileşenler ilk istekte yükleneceğinden servis her zaman hazır sayılır.
+    if not EAGER_WARMUP:
+        return jsonify({'ready': True, 'warmup': 'disabled', 'llm_crews_initialized': llm_crews_initialized})
+    status = warmup_runner.status()
+    status['warmup'] = 'enabled'
+    return jsonify(status), (200 if status['ready'] else 503)
+
+def _result_postprocess_stats():
+    # Arama aracı ekipler kurulurken yüklenir; sağlık kontrolü bu ağır importu kendisi tetiklemez.
+    tool_module = sys.modules.get('tools.qdrant_vector_search_tool')
+    postprocessor = tool_module.get_result_postprocessor() if tool_module else None
+    return postprocessor.stats() if postprocessor else None
+
 @app.route('/api/health')
 def health_check():
+    # Redis yokken analiz (şifresiz) çalışmaya devam eder; şifreli oturumlar ve önbellekler devre dışıdır.
+    redis_status = redis_health()
+    degraded = any(pool['status'] == 'down' for pool in redis_status.values())
     return jsonify({
-        'status': 'healthy',
+        'status': 'degraded' if degraded else 'healthy',
         'message': 'Hukuki Analiz Sistemi çalışıyor',
-        'version': '3.0.0'
+        'version': PIPELINE_VERSION,
+        'analysis_jobs': job_manager.stats(),
+        'batch_analysis': batch_runner.stats(),
+        'llm_rate_limit': llm_scheduler.stats(),
+        'context_budget': context_budget.stats(),
+        'result_postprocess': _result_postprocess_stats(),
+        'web_cache': web_fetcher.stats(),
+        'crew_pool': crew_pool.stats() if crew_pool else None,
+        'analysis_cache': analysis_cache.stats(),
+        'llm': llm_call_layer.stats(),
+        'crypto': crypto_manager.cache_stats(),
+        'redis': redis_status,
+        'warmup': warmup_runner.status() if EAGER_WARMUP else None
     })
 
 if __name__ == "__main__":
     logger.info("Flask geliştirme sunucusu başlatılıyor...")
+    start_background_warmup()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file